@@ -10,6 +10,15 @@ macro(_spl_get_absolute_path out in)
     endif()
 endmacro()
 
+# Quotes the string as JSON value, e.g. for string(JSON ... SET ...). Backslashes and quotes are escaped.
+function(_spl_json_string out in)
+    string(REPLACE "\\" "\\\\" _json_string "${in}")
+    string(REPLACE "\"" "\\\"" _json_string "${_json_string}")
+    string(REPLACE "\n" "\\n" _json_string "${_json_string}")
+    string(REPLACE "\t" "\\t" _json_string "${_json_string}")
+    set(${out} "\"${_json_string}\"" PARENT_SCOPE)
+endfunction()
+
 macro(spl_add_component component_path)
     message(DEBUG "spl_add_component: component_path=${component_path}")
     _spl_slash_to_underscore(component_name ${component_path})
@@ -208,6 +217,9 @@ macro(spl_create_component)
             _spl_add_test_suite(${component_name} "${SOURCES}" ${TEST_SOURCES})
         endif()
 
+        # Output directories of the component coverage html report
+        set(_component_coverage_html_dirs reports/coverage)
+
         set(_component_dir ${CMAKE_CURRENT_LIST_DIR})
         set(_component_doc_dir ${_component_dir}/doc)
         set(_component_doc_file ${_component_doc_dir}/index.rst)
@@ -240,10 +252,8 @@ macro(spl_create_component)
                 ${component_name}_docs
                 COMMAND ${CMAKE_COMMAND} -E make_directory ${_component_docs_out_dir}
 
-                # We do not know all dependencies for generating the docs (apart from the rst files).
-                # This might cause incremental builds to not update parts of the documentation.
-                # To avoid this we are using the -E option to make sphinx-build writing all files new.
-                COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_docs_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- sphinx-build -E -b html ${_sphinx_source_dir} ${_component_docs_html_out_dir}
+                # The incremental build reads the documents again if the configuration or the data files they use changed
+                COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_docs_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- ${SPL_SPHINX_BUILD} ${_sphinx_source_dir} ${_component_docs_html_out_dir}
                 BYPRODUCTS ${_component_docs_html_out_dir}/index.html
             )
 
@@ -313,17 +323,11 @@ Code Coverage
                 # add the generated files as dependency to cmake configure step
                 set_property(DIRECTORY APPEND PROPERTY CMAKE_CONFIGURE_DEPENDS ${_reports_config_json} ${_unit_test_spec_rst} ${_unit_test_results_rst} ${_component_doxyfile})
 
-                set(_cov_out_html reports/html/${_rel_component_reports_out_dir}/coverage/index.html)
-                file(RELATIVE_PATH _cov_out_json ${CMAKE_CURRENT_BINARY_DIR} ${_component_coverage_json})
-
                 # For the component report, one needs to generate the coverage/index.html inside the component report sphinx output directory.
                 # This will avoid the need to copy the coverage/** directory inside the component report sphinx output directory.
-                add_custom_command(
-                    OUTPUT ${_cov_out_html}
-                    COMMAND gcovr --root ${PROJECT_SOURCE_DIR} --add-tracefile ${_cov_out_json} --html --html-details --output ${_cov_out_html} ${GCOVR_ADDITIONAL_OPTIONS}
-                    DEPENDS ${_cov_out_json}
-                    COMMENT "Generating component coverage html report ${_cov_out_html} ..."
-                )
+                # It is rendered together with the component coverage report, see below.
+                set(_cov_out_html reports/html/${_rel_component_reports_out_dir}/coverage/index.html)
+                list(APPEND _component_coverage_html_dirs reports/html/${_rel_component_reports_out_dir}/coverage)
 
                 # We need to have a separate component doxygen generation target because it is required
                 # by both the component and variant reports.
@@ -337,22 +341,52 @@ Code Coverage
                     COMMAND doxygen ${_rel_component_doxyfile}
                 )
 
-                # No OUTPUT is defined to force execution of this target every time
+                # Inputs of the component report, also required by the component_reports target of the variant
                 # TODO: list of dependencies is not complete
+                add_custom_target(
+                    ${component_name}_report_inputs
+                    DEPENDS ${TEST_OUT_JUNIT} ${component_name}_doxygen ${_cov_out_html}
+                )
+
+                # No OUTPUT is defined to force execution of this target every time
                 add_custom_target(
                     ${component_name}_report
                     COMMAND ${CMAKE_COMMAND} -E make_directory ${_component_reports_out_dir}
                     COMMAND doxysphinx build ${_sphinx_source_dir} ${_component_reports_html_out_dir} ${_rel_component_doxyfile}
-                    COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_reports_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- sphinx-build -E -b html ${_sphinx_source_dir} ${_component_reports_html_out_dir}
+                    COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_reports_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- ${SPL_SPHINX_BUILD} ${_sphinx_source_dir} ${_component_reports_html_out_dir}
                     BYPRODUCTS ${_component_reports_html_out_dir}/index.html
-                    DEPENDS ${TEST_OUT_JUNIT} ${component_name}_doxygen ${_cov_out_html}
+                    DEPENDS ${component_name}_report_inputs
                 )
+
+                # Collect the component reports to build them all with one Sphinx process (component_reports target)
+                _spl_json_string(_json_config_file "${_reports_config_json}")
+                _spl_json_string(_json_output_dir "${_component_reports_html_out_dir}")
+                set(_component_sphinx_report "{}")
+                string(JSON _component_sphinx_report SET "${_component_sphinx_report}" config_file "${_json_config_file}")
+                string(JSON _component_sphinx_report SET "${_component_sphinx_report}" output_dir "${_json_output_dir}")
+                list(APPEND COMPONENTS_SPHINX_REPORTS "${_component_sphinx_report}")
+                set(COMPONENTS_SPHINX_REPORTS ${COMPONENTS_SPHINX_REPORTS} PARENT_SCOPE)
+                list(APPEND COMPONENTS_DOXYSPHINX_COMMANDS COMMAND doxysphinx build ${_sphinx_source_dir} ${_component_reports_html_out_dir} ${_component_doxyfile})
+                set(COMPONENTS_DOXYSPHINX_COMMANDS ${COMPONENTS_DOXYSPHINX_COMMANDS} PARENT_SCOPE)
+                list(APPEND COMPONENTS_REPORT_INPUTS_TARGETS ${component_name}_report_inputs)
+                set(COMPONENTS_REPORT_INPUTS_TARGETS ${COMPONENTS_REPORT_INPUTS_TARGETS} PARENT_SCOPE)
             endif(TEST_SOURCES)
 
             # Collect all component sphinx include pattern to be used in the variant targets (docs, reports)
             list(APPEND COMPONENTS_SPHINX_INCLUDE_PATTERNS "${_rel_component_doc_dir}/**" "${_rel_component_docs_out_dir}/**" "${_rel_component_reports_out_dir}/**")
             set(COMPONENTS_SPHINX_INCLUDE_PATTERNS ${COMPONENTS_SPHINX_INCLUDE_PATTERNS} PARENT_SCOPE)
         endif(EXISTS ${_component_doc_file})
+
+        if(TEST_SOURCES)
+            # Render the component coverage reports with gcovr in one process
+            list(TRANSFORM _component_coverage_html_dirs APPEND /index.html OUTPUT_VARIABLE _component_coverage_html_files)
+            add_custom_command(
+                OUTPUT ${_component_coverage_html_files}
+                COMMAND ${SPL_COVERAGE_REPORT} --component ${COV_OUT_JSON} ${_component_coverage_html_dirs} -- ${GCOVR_ADDITIONAL_OPTIONS}
+                DEPENDS ${COV_OUT_JSON}
+                COMMENT "Generating component ${component_name} code coverage html reports ${_component_coverage_html_files} ..."
+            )
+        endif(TEST_SOURCES)
     endif(BUILD_KIT STREQUAL prod)
 
     # Collect all component info for later usage (e.g., in an extension)
@@ -381,7 +415,7 @@ macro(_spl_create_docs_target)
     add_custom_target(
         docs
         COMMAND ${CMAKE_COMMAND} -E make_directory ${_docs_out_dir}
-        COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_docs_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- sphinx-build -E -b html ${PROJECT_SOURCE_DIR} ${_docs_html_out_dir}
+        COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_docs_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- ${SPL_SPHINX_BUILD} ${PROJECT_SOURCE_DIR} ${_docs_html_out_dir}
         BYPRODUCTS ${_docs_html_out_dir}/index.html
     )
 endmacro()
@@ -427,17 +461,8 @@ Code Coverage
         string(JSON component_reports_output_dir GET ${component_info} reports_output_dir)
 
         if(component_reports_output_dir)
+            # The coverage html of the component is copied with the overall coverage report, see _spl_coverage_create_overall_report
             set(_variant_component_reports_out_dir reports/html/${component_reports_output_dir})
-            set(_cov_out_html ${_variant_component_reports_out_dir}/coverage/index.html)
-            set(_cov_out_json ${component_path}/coverage.json)
-            add_custom_command(
-                OUTPUT ${_cov_out_html}
-                COMMAND gcovr --root ${PROJECT_SOURCE_DIR} --add-tracefile ${_cov_out_json} --html --html-details --output ${_cov_out_html} ${GCOVR_ADDITIONAL_OPTIONS}
-                DEPENDS ${_cov_out_json}
-                COMMENT "Generating variant component coverage html report ${_cov_out_html} ..."
-            )
-            list(APPEND _components_coverage_html ${_cov_out_html})
-
             set(_rel_component_doxyfile ${component_path}/reports/Doxyfile)
             add_custom_target(
                 ${component_name}_doxysphinx
@@ -450,17 +475,9 @@ Code Coverage
         endif()
     endforeach()
 
-    set(_cov_out_variant_html reports/html/${_rel_reports_output_dir}/coverage/index.html)
-    add_custom_command(
-        OUTPUT ${_cov_out_variant_html}
-        COMMAND gcovr --root ${CMAKE_SOURCE_DIR} --add-tracefile \"${CMAKE_CURRENT_BINARY_DIR}/**/${COV_OUT_JSON}\" --html --html-details --output ${_cov_out_variant_html}
-        DEPENDS ${GLOBAL_COMPONENTS_COVERAGE_JSON_LIST}
-        COMMENT "Generating overall code coverage report ${_cov_out_variant_html} ..."
-    )
-
     add_custom_target(
         _components_variant_coverage_html_target
-        DEPENDS ${_components_coverage_html} ${_cov_out_variant_html}
+        DEPENDS ${VARIANT_COVERAGE_HTML_FILES}
     )
 
     # add the generated files as dependency to cmake configure step
@@ -470,13 +487,36 @@ Code Coverage
         ALL
         COMMAND ${CMAKE_COMMAND} -E make_directory ${_reports_output_dir}
 
-        # We need to call sphinx-build with -E to make sure all files are regenerated.
-        COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_reports_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- sphinx-build -E -b html ${PROJECT_SOURCE_DIR} ${_reports_html_output_dir}
+        COMMAND ${CMAKE_COMMAND} -E env SPHINX_BUILD_CONFIGURATION_FILE=${_reports_config_json} AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- ${SPL_SPHINX_BUILD} ${PROJECT_SOURCE_DIR} ${_reports_html_output_dir}
         BYPRODUCTS ${_reports_html_output_dir}/index.html
         DEPENDS _components_variant_coverage_html_target ${_components_variant_doxysphinx_targets}
     )
 endmacro()
 
+macro(_spl_create_component_reports_target)
+    # The reports of all components are built by one Sphinx process, which imports Sphinx and the extensions only once.
+    # Every component report still has its own configuration (include patterns, component info) and output directory.
+    set(_component_reports_targets_json ${CMAKE_CURRENT_BINARY_DIR}/reports/component_reports.json)
+    set(_components_sphinx_reports_json "[]")
+    foreach(_component_sphinx_report IN LISTS COMPONENTS_SPHINX_REPORTS)
+        # An index beyond the end of the array appends the value
+        string(JSON _components_sphinx_reports_length LENGTH "${_components_sphinx_reports_json}")
+        string(JSON _components_sphinx_reports_json SET "${_components_sphinx_reports_json}" ${_components_sphinx_reports_length} "${_component_sphinx_report}")
+    endforeach()
+    file(WRITE ${_component_reports_targets_json} "${_components_sphinx_reports_json}")
+
+    # add the generated files as dependency to cmake configure step
+    set_property(DIRECTORY APPEND PROPERTY CMAKE_CONFIGURE_DEPENDS ${_component_reports_targets_json})
+    add_custom_target(
+        component_reports
+        ${COMPONENTS_DOXYSPHINX_COMMANDS}
+        COMMAND ${CMAKE_COMMAND} -E env AUTOCONF_JSON_FILE=${AUTOCONF_JSON} VARIANT=${VARIANT} -- ${SPL_SPHINX_BUILD} ${PROJECT_SOURCE_DIR} --targets ${_component_reports_targets_json}
+        DEPENDS ${COMPONENTS_REPORT_INPUTS_TARGETS}
+        COMMENT "Generating the reports of all components ..."
+    )
+
+endmacro()
+
 macro(_spl_set_coverage_create_overall_report_is_necessary)
     set(_SPL_COVERAGE_CREATE_OVERALL_REPORT_IS_NECESSARY TRUE PARENT_SCOPE)
 endmacro(_spl_set_coverage_create_overall_report_is_necessary)
@@ -486,12 +526,36 @@ set(COV_OUT_JSON coverage.json)
 function(_spl_coverage_create_overall_report)
     if(_SPL_COVERAGE_CREATE_OVERALL_REPORT_IS_NECESSARY)
         set(COV_OUT_VARIANT_HTML reports/coverage/index.html)
+        set(_components_coverage_json ${GLOBAL_COMPONENTS_COVERAGE_JSON_LIST})
+        list(REMOVE_DUPLICATES _components_coverage_json)
+        list(TRANSFORM _components_coverage_json PREPEND "--tracefile;" OUTPUT_VARIABLE _coverage_report_tracefiles)
+
+        # The variant reports contain the coverage html of every component and the overall coverage html
+        file(RELATIVE_PATH _rel_reports_output_dir ${PROJECT_SOURCE_DIR} ${CMAKE_CURRENT_BINARY_DIR}/reports)
+        set(_variant_reports_coverage_dir reports/html/${_rel_reports_output_dir}/coverage)
+        set(_variant_coverage_html_files ${COV_OUT_VARIANT_HTML} ${_variant_reports_coverage_dir}/index.html)
+        # The coverage html of the components is already rendered in the component directories, it is only copied
+        set(_copy_components_coverage_html)
+        set(_components_coverage_html)
+        foreach(component_info ${COMPONENTS_INFO})
+            string(JSON component_path GET ${component_info} path)
+            string(JSON component_reports_output_dir GET ${component_info} reports_output_dir)
+            if(component_reports_output_dir)
+                list(APPEND _copy_components_coverage_html COMMAND ${CMAKE_COMMAND} -E copy_directory ${component_path}/reports/coverage reports/html/${component_reports_output_dir}/coverage)
+                list(APPEND _components_coverage_html ${component_path}/reports/coverage/index.html)
+                list(APPEND _variant_coverage_html_files reports/html/${component_reports_output_dir}/coverage/index.html)
+            endif()
+        endforeach()
+
+        # The overall report of all tracefiles is rendered with gcovr in one process
         add_custom_command(
-            OUTPUT ${COV_OUT_VARIANT_HTML}
-            COMMAND gcovr --root ${CMAKE_SOURCE_DIR} --add-tracefile \"${CMAKE_CURRENT_BINARY_DIR}/**/${COV_OUT_JSON}\" --html --html-details --output ${COV_OUT_VARIANT_HTML}
-            DEPENDS ${GLOBAL_COMPONENTS_COVERAGE_JSON_LIST}
+            OUTPUT ${_variant_coverage_html_files}
+            ${_copy_components_coverage_html}
+            COMMAND ${SPL_COVERAGE_REPORT} ${_coverage_report_tracefiles} --variant reports/coverage --variant ${_variant_reports_coverage_dir} -- ${GCOVR_ADDITIONAL_OPTIONS}
+            DEPENDS ${_components_coverage_json} ${_components_coverage_html}
             COMMENT "Generating overall code coverage report ${COV_OUT_VARIANT_HTML} ..."
         )
+        set(VARIANT_COVERAGE_HTML_FILES ${_variant_coverage_html_files} PARENT_SCOPE)
         add_custom_target(
             unittests
             DEPENDS coverage ${COV_OUT_VARIANT_HTML}
@@ -586,27 +650,29 @@ macro(_spl_add_test_suite COMPONENT_NAME PROD_SRC TEST_SOURCES)
 
     set(GLOBAL_COMPONENTS_COVERAGE_JSON_LIST "${GLOBAL_COMPONENTS_COVERAGE_JSON_LIST};${CMAKE_CURRENT_BINARY_DIR}/${COV_OUT_JSON}" CACHE INTERNAL "List of all ${COV_OUT_JSON} files")
 
+    # The gcov of GCC writes json, which the gcov collector parses in parallel. Other toolchains (e.g. llvm-cov gcov) need gcovr.
+    # The collector hands over to gcovr if there are GCOVR_ADDITIONAL_OPTIONS (e.g. --exclude), it does not support them.
+    if(CMAKE_C_COMPILER_ID STREQUAL "GNU")
+        set(_coverage_json_command ${SPL_GCOV_COLLECTOR} ${CMAKE_CURRENT_BINARY_DIR} --output ${COV_OUT_JSON} -- ${GCOVR_ADDITIONAL_OPTIONS})
+    else()
+        set(_coverage_json_command gcovr --root ${CMAKE_SOURCE_DIR} --json --output ${COV_OUT_JSON} ${GCOVR_ADDITIONAL_OPTIONS} ${CMAKE_CURRENT_BINARY_DIR})
+    endif()
+
     # Create coverage results (coverage.json)
     add_custom_command(
         OUTPUT ${COV_OUT_JSON}
 
-        # Wipe orphaned gcno files before gcovr searches for them
-        COMMAND python ${SPL_CORE_PYTHON_DIRECTORY}/gcov_maid/gcov_maid.py --working-dir . --wipe-orphaned-gcno
+        # Wipe the gcno and gcda files without object file in the current build graph before gcov searches for them
+        COMMAND python ${SPL_CORE_PYTHON_DIRECTORY}/gcov_maid/gcov_maid.py --working-dir . --wipe-orphaned-gcno --wipe-orphaned-gcda --build-dir ${CMAKE_BINARY_DIR}
 
-        # Run gcovr to generate coverage json for the component
-        COMMAND gcovr --root ${CMAKE_SOURCE_DIR} --json --output ${COV_OUT_JSON} ${GCOVR_ADDITIONAL_OPTIONS} ${CMAKE_CURRENT_BINARY_DIR}
+        # Generate coverage json for the component
+        COMMAND ${_coverage_json_command}
         DEPENDS ${TEST_OUT_JUNIT}
         COMMENT "Generating component ${COMPONENT_NAME} code coverage json report ${COV_OUT_JSON} ..."
     )
 
-    # Create coverage html report
+    # Coverage html report, created by spl_create_component together with the coverage html of the component report
     set(COV_OUT_HTML reports/coverage/index.html)
-    add_custom_command(
-        OUTPUT ${COV_OUT_HTML}
-        COMMAND gcovr --root ${CMAKE_SOURCE_DIR} --add-tracefile ${COV_OUT_JSON} --html --html-details --output ${COV_OUT_HTML} ${GCOVR_ADDITIONAL_OPTIONS}
-        DEPENDS ${COV_OUT_JSON}
-        COMMENT "Generating component ${COMPONENT_NAME} code coverage html report ${COV_OUT_HTML} ..."
-    )
 
     add_custom_target(
         ${COMPONENT_NAME}_coverage
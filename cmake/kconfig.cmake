@@ -3,6 +3,8 @@ set(KCONFIG_OUT_DIR ${PROJECT_BINARY_DIR}/kconfig)
 set(AUTOCONF_H ${KCONFIG_OUT_DIR}/autoconf.h)
 set(AUTOCONF_JSON ${KCONFIG_OUT_DIR}/autoconf.json)
 set(AUTOCONF_CMAKE ${KCONFIG_OUT_DIR}/autoconf.cmake)
+set(KCONFIG_CACHE_FILE ${KCONFIG_OUT_DIR}/kconfig_cache.json)
+set(KCONFIG_SPLIT_HEADER_DIR ${KCONFIG_OUT_DIR}/config)
 set(KCONFIG_MODEL_FILE ${PROJECT_SOURCE_DIR}/KConfig)
 set(KCONFIG_CONFIG_FILE ${PROJECT_SOURCE_DIR}/variants/${VARIANT}/config.txt)
 
@@ -16,16 +18,31 @@ if(EXISTS ${KCONFIG_MODEL_FILE})
         message(STATUS "No variant configuration found, using defaults.")
     endif()
 
-    # TODO: kconfig.py should not update its outputs when the inputs did not change.
-    # So an incremental build with configure is not possible. autoconf.h gets updated
-    # every time (although the content did not change). Therefore stuff gets compiled.
+    # With KCONFIG_SPLIT_HEADERS enabled, every configuration element gets its own header.
+    # The compiler launcher fixdep.py replaces the autoconf.h dependency of every object file
+    # by the headers of the elements it references. Requires a compiler writing make style
+    # dependency files (-MF), e.g. gcc or clang.
+    if(KCONFIG_SPLIT_HEADERS)
+        set(_KCONFIG_SPLIT_HEADERS_option --out_split_header_dir ${KCONFIG_SPLIT_HEADER_DIR})
+        set(_KCONFIG_FIXDEP python ${SPL_CORE_PYTHON_DIRECTORY}/kconfig/fixdep.py --autoconf_header ${AUTOCONF_H} --config_dir ${KCONFIG_SPLIT_HEADER_DIR} --)
+        set(CMAKE_C_COMPILER_LAUNCHER ${_KCONFIG_FIXDEP} ${CMAKE_C_COMPILER_LAUNCHER})
+        set(CMAKE_CXX_COMPILER_LAUNCHER ${_KCONFIG_FIXDEP} ${CMAKE_CXX_COMPILER_LAUNCHER})
+    endif()
+
+    # kconfig.py keeps a fingerprint of all its inputs in the cache file.
+    # If none of the inputs changed, the feature model is not parsed again
+    # and the generated files are not touched.
+    # client.py forwards the arguments to a running KConfig server (python -m spl_core.kconfig.server),
+    # which keeps the parsed models in memory. Without server it runs kconfig.py in-process.
     execute_process(
         WORKING_DIRECTORY ${SPL_CORE_ROOT_DIRECTORY} # TODO: is there a better way to let kconfig.py find other modules?
-        COMMAND python ${SPL_CORE_PYTHON_DIRECTORY}/kconfig/kconfig.py
+        COMMAND python ${SPL_CORE_PYTHON_DIRECTORY}/kconfig/client.py
         --kconfig_model_file ${KCONFIG_MODEL_FILE} ${_KCONFIG_CONFIG_FILE_option}
         --out_header_file ${AUTOCONF_H}
         --out_json_file ${AUTOCONF_JSON}
         --out_cmake_file ${AUTOCONF_CMAKE}
+        --cache_file ${KCONFIG_CACHE_FILE}
+        ${_KCONFIG_SPLIT_HEADERS_option}
         COMMAND_ECHO STDOUT
         RESULT_VARIABLE ret
     )
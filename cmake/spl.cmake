@@ -4,6 +4,26 @@ set(SPL_CORE_ROOT_DIRECTORY ${CMAKE_CURRENT_LIST_DIR}/..)
 set(SPL_CORE_CMAKE_DIRECTORY ${CMAKE_CURRENT_LIST_DIR})
 set(SPL_CORE_PYTHON_DIRECTORY ${SPL_CORE_ROOT_DIRECTORY}/src/spl_core)
 
+# Number of parallel Sphinx processes of the docs and reports targets ("auto" for the number of CPUs).
+# Sphinx falls back to a serial build if an extension does not support parallel builds.
+if(NOT DEFINED SPL_SPHINX_JOBS)
+    set(SPL_SPHINX_JOBS 1)
+endif()
+
+# Incremental Sphinx build, only the documents affected by a change are read and written again
+set(SPL_SPHINX_BUILD python ${SPL_CORE_PYTHON_DIRECTORY}/sphinx_builder/sphinx_builder.py -j ${SPL_SPHINX_JOBS})
+
+# Number of parallel gcov processes collecting the coverage of a component ("auto" for the number of CPUs).
+if(NOT DEFINED SPL_GCOV_JOBS)
+    set(SPL_GCOV_JOBS auto)
+endif()
+
+# Collects the coverage of a component build directory into a gcovr json tracefile (GCC toolchains)
+set(SPL_GCOV_COLLECTOR python ${SPL_CORE_PYTHON_DIRECTORY}/coverage/gcov_collector.py --root ${CMAKE_SOURCE_DIR} -j ${SPL_GCOV_JOBS})
+
+# Coverage html reports of the gcovr json tracefiles, all reports of a target are rendered by gcovr in one process
+set(SPL_COVERAGE_REPORT python ${SPL_CORE_PYTHON_DIRECTORY}/coverage/coverage_report.py --root ${CMAKE_SOURCE_DIR})
+
 # Always create a compile_commands.json file for C/C++ intellisense / CMake Tools extension
 set(CMAKE_EXPORT_COMPILE_COMMANDS ON)
 
@@ -102,6 +122,7 @@ function(_spl_hook_end_of_configure)
         _spl_coverage_create_overall_report()
         _spl_create_docs_target()
         _spl_create_reports_target()
+        _spl_create_component_reports_target()
     endif(BUILD_KIT STREQUAL test)
     _spl_create_build_info_file()
 endfunction(_spl_hook_end_of_configure)
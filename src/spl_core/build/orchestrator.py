@@ -0,0 +1,116 @@
+"""
+Build several variants and build kits in parallel.
+
+The builds share a global Ninja job budget, so running variants in parallel does not oversubscribe the machine:
+every build gets ``ninja_jobs / max_parallel`` jobs through the ``CMAKE_BUILD_PARALLEL_LEVEL`` environment variable.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from spl_core.common.async_command_line_executor import AsyncCommandLineExecutor
+from spl_core.common.retry_policy import RetryPolicy
+from spl_core.common.variants import MIN_JOBS_PER_BUILD, find_variants
+from spl_core.test_utils.spl_build import SplBuild
+
+
+@dataclass
+class BuildResult:
+    variant: str
+    build_kit: str
+    returncode: int
+    #: Duration in seconds
+    duration: float
+    log_file: Path
+    #: Number of retries because of license issues
+    retries: int = 0
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0
+
+
+class BuildOrchestrator:
+    def __init__(
+        self,
+        project_dir: Path,
+        variants: Optional[List[str]] = None,
+        build_kits: Optional[List[str]] = None,
+        target: str = "all",
+        ninja_jobs: Optional[int] = None,
+        max_parallel: Optional[int] = None,
+        echo: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
+        """
+        Schedules the builds of all variant and build kit combinations.
+
+        Args:
+            project_dir: The SPL project directory containing build.bat and the variants directory.
+            variants: Variants to build. Defaults to all variants with a config.cmake file.
+            build_kits: Build kits to use. Defaults to ["prod"].
+            target: The build target.
+            ninja_jobs: Total number of Ninja jobs of all builds running at the same time. Defaults to the number of CPUs.
+            max_parallel: Number of builds running at the same time. Defaults to one build per MIN_JOBS_PER_BUILD Ninja jobs.
+                At most ninja_jobs builds run at the same time, every build gets at least one job.
+            echo: Print the build output prefixed with variant and build kit. Otherwise only the progress is printed.
+            retry_policy: When and how often to retry a build failing because of a license issue.
+        """
+        self.project_dir = project_dir.absolute()
+        self.variants = variants or find_variants(self.project_dir / "variants")
+        self.build_kits = build_kits or ["prod"]
+        self.target = target
+        self.builds = [SplBuild(variant, build_kit, self.project_dir, retry_policy) for build_kit in self.build_kits for variant in self.variants]
+        self.ninja_jobs = ninja_jobs or os.cpu_count() or 1
+        self.max_parallel = max(1, min(max_parallel or self.ninja_jobs // MIN_JOBS_PER_BUILD, self.ninja_jobs, len(self.builds) or 1))
+        self.echo = echo
+
+    @property
+    def jobs_per_build(self) -> int:
+        return max(1, self.ninja_jobs // self.max_parallel)
+
+    def get_env(self) -> Dict[str, str]:
+        # cmake --build passes the number of jobs to Ninja. Ninja arguments like -j4 would be taken as parameter names by build.ps1.
+        return {**os.environ, "CMAKE_BUILD_PARALLEL_LEVEL": str(self.jobs_per_build)}
+
+    def get_log_file(self, build: SplBuild) -> Path:
+        return self.project_dir / build.build_dir / "build.log"
+
+    async def _build(self, build: SplBuild, executor: AsyncCommandLineExecutor) -> BuildResult:
+        log_file = self.get_log_file(build)
+        start = time.perf_counter()
+        returncode = await build.execute_async(self.target, executor=executor, log_file=log_file, env=self.get_env())
+        return BuildResult(build.variant, build.build_kit, returncode, time.perf_counter() - start, log_file, build.retry_report.retries)
+
+    async def run_async(self) -> List[BuildResult]:
+        executor = AsyncCommandLineExecutor(max_parallel=self.max_parallel, echo=self.echo)
+        print(f"Building {len(self.builds)} variant(s) with target '{self.target}': {self.max_parallel} in parallel with {self.jobs_per_build} Ninja jobs each", flush=True)
+        results: List[BuildResult] = []
+        # Tasks start in creation order, as_completed alone would start the builds in random order
+        tasks = [asyncio.ensure_future(self._build(build, executor)) for build in self.builds]
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            results.append(result)
+            status = "succeeded" if result.success else f"FAILED (see {result.log_file})"
+            print(f"[{len(results)}/{len(self.builds)}] {result.variant}/{result.build_kit} {status} in {result.duration:.1f}s", flush=True)
+        # Summary in the order of the requested builds
+        order = {(build.variant, build.build_kit): index for index, build in enumerate(self.builds)}
+        return sorted(results, key=lambda result: order[(result.variant, result.build_kit)])
+
+    def run(self) -> List[BuildResult]:
+        return asyncio.run(self.run_async())
+
+
+def format_summary(results: List[BuildResult]) -> str:
+    """Table with the outcome and duration of every build."""
+    rows = [("Variant", "Build kit", "Result", "Duration", "Retries")] + [
+        (result.variant, result.build_kit, "success" if result.success else f"failed ({result.returncode})", f"{result.duration:.1f}s", str(result.retries)) for result in results
+    ]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    lines = [" | ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "-+-".join("-" * width for width in widths))
+    return "\n".join(lines)
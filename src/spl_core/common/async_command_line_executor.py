@@ -0,0 +1,142 @@
+import asyncio
+import os
+import subprocess
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from spl_core.common.command_line_executor import STDERR, STDOUT, ConsoleSink, OutputSink, RingBufferSink, get_encoding
+
+#: Maximum length of one output line, longer lines are skipped
+LINE_LIMIT = 1024 * 1024
+
+
+@dataclass
+class Command:
+    """A command to be executed by the AsyncCommandLineExecutor."""
+
+    #: A string (executed by the shell) or a list of strings (executed directly)
+    cmd: str | List[str]
+    cwd: Optional[Path] = None
+    env: Optional[Dict[str, str]] = None
+    #: Prefix of every echoed output line, e.g. the variant name
+    prefix: str = ""
+    #: Kill the command after this many seconds
+    timeout: Optional[float] = None
+
+
+class AsyncCommandLineExecutor:
+    def __init__(
+        self,
+        max_parallel: Optional[int] = None,
+        echo: bool = True,
+        separate_stderr: bool = False,
+        max_output_lines: Optional[int] = 1000,
+    ):
+        """
+        Executes many command line commands concurrently.
+
+        Args:
+        - max_parallel: Maximum number of commands running at the same time. Defaults to the number of CPUs.
+        - echo: Print the output of all commands to the console, every line prefixed with the command prefix.
+        - separate_stderr: Capture stderr separately instead of redirecting it to stdout.
+        - max_output_lines: Only keep the last lines of each stream in the returned CompletedProcess. None keeps all lines.
+        """
+        self.max_parallel = max_parallel or os.cpu_count() or 1
+        self.echo = echo
+        self.separate_stderr = separate_stderr
+        self.max_output_lines = max_output_lines
+        self._semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore is bound to one event loop, the executor can be used by several asyncio.run() calls
+        return self._semaphores.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(self.max_parallel))
+
+    async def _create_process(self, command: Command) -> asyncio.subprocess.Process:
+        options = {
+            "cwd": str(command.cwd or Path.cwd()),
+            "env": command.env,
+            "stdout": asyncio.subprocess.PIPE,
+            "stderr": asyncio.subprocess.PIPE if self.separate_stderr else asyncio.subprocess.STDOUT,
+            "limit": LINE_LIMIT,
+        }
+        if isinstance(command.cmd, str):
+            return await asyncio.create_subprocess_shell(command.cmd, **options)  # type: ignore[arg-type]
+        return await asyncio.create_subprocess_exec(*command.cmd, **options)  # type: ignore[arg-type]
+
+    @staticmethod
+    async def _read_lines(reader: Optional[asyncio.StreamReader], stream: str, sinks: List[OutputSink]) -> None:
+        if reader is None:
+            return
+        encoding = get_encoding()
+        while True:
+            try:
+                data = await reader.readline()
+            except ValueError:
+                # readline drops lines longer than the limit
+                data = b"<line too long>\n"
+            if not data:
+                return
+            line = data.decode(encoding, errors="replace").replace("\r\n", "\n")
+            for sink in sinks:
+                sink.write(line, stream)
+
+    async def execute(self, command: Command, sinks: Optional[List[OutputSink]] = None) -> subprocess.CompletedProcess[str]:
+        """
+        Executes one command and returns a CompletedProcess object once it finished.
+
+        At most max_parallel commands of this executor run at the same time, the other ones wait.
+
+        If the command times out it is killed and the returncode is the one of the killed process (not 0).
+
+        Args:
+        - command: the command to be executed
+        - sinks: additional sinks receiving the output lines of this command, e.g. a LogFileSink. The caller closes them.
+        """
+        command_text = command.cmd if isinstance(command.cmd, str) else " ".join(command.cmd)
+        retained = RingBufferSink(self.max_output_lines)
+        own_sinks: List[OutputSink] = [retained]
+        if self.echo:
+            own_sinks.append(ConsoleSink(command.prefix))
+        try:
+            async with self._get_semaphore():
+                return await self._execute(command, command_text, retained, [*own_sinks, *(sinks or [])])
+        finally:
+            for sink in own_sinks:
+                sink.close()
+
+    async def _execute(self, command: Command, command_text: str, retained: RingBufferSink, all_sinks: List[OutputSink]) -> subprocess.CompletedProcess[str]:
+        try:
+            if self.echo:
+                print(f"{command.prefix}= Running command: {command_text}")
+            process = await self._create_process(command)
+            readers = asyncio.gather(self._read_lines(process.stdout, STDOUT, all_sinks), self._read_lines(process.stderr, STDERR, all_sinks))
+            try:
+                await asyncio.wait_for(asyncio.shield(readers), command.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                try:
+                    # Child processes of the killed process might still hold the pipes open
+                    await asyncio.wait_for(readers, 5)
+                except asyncio.TimeoutError:
+                    pass
+                for sink in all_sinks:
+                    sink.write(f"Command '{command_text}' timed out after {command.timeout}s.\n", STDERR if self.separate_stderr else STDOUT)
+            await process.wait()
+        except Exception as e:
+            raise RuntimeError(f"Command '{command_text}' failed.") from e
+        return subprocess.CompletedProcess(
+            args=command_text,
+            returncode=process.returncode if process.returncode is not None else -1,
+            stdout=retained.get_text(STDOUT),
+            stderr=retained.get_text(STDERR) if self.separate_stderr else None,
+        )
+
+    async def execute_all(self, commands: List[Command]) -> List[subprocess.CompletedProcess[str]]:
+        """Executes the commands with at most max_parallel running at the same time. The results have the order of the commands."""
+        return list(await asyncio.gather(*[self.execute(command) for command in commands]))
+
+    def run(self, commands: List[Command]) -> List[subprocess.CompletedProcess[str]]:
+        """Synchronous entry point for callers without an event loop."""
+        return asyncio.run(self.execute_all(commands))
@@ -1,8 +1,86 @@
 import locale
+import queue
 import subprocess
 import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import IO, Deque, Dict, List, Optional, TextIO, Tuple
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+
+class OutputSink(ABC):
+    """Receives the output lines of a command while it is running."""
+
+    @abstractmethod
+    def write(self, line: str, stream: str) -> None:
+        """
+        Called for every output line (including the line ending).
+
+        Args:
+        - line: the output line
+        - stream: STDOUT or STDERR. If stderr is redirected to stdout, all lines are STDOUT.
+        """
+
+    def close(self) -> None:  # noqa: B027
+        """Called once the command finished."""
+
+
+class ConsoleSink(OutputSink):
+    """Echoes the output to the console. The prefix tells apart the output of commands running in parallel."""
+
+    def __init__(self, prefix: str = "") -> None:
+        self.prefix = prefix
+
+    def write(self, line: str, stream: str) -> None:
+        print(f"{self.prefix}{line}", end="", file=sys.stderr if stream == STDERR else sys.stdout, flush=stream == STDERR)
+
+
+class LogFileSink(OutputSink):
+    """Tees the output to a log file. Stderr lines are prefixed if stderr is captured separately."""
+
+    def __init__(self, log_file: Path, append: bool = False) -> None:
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        self.log_file = log_file
+        self._file: TextIO = log_file.open("a" if append else "w", encoding="utf-8")
+
+    def write(self, line: str, stream: str) -> None:
+        self._file.write(f"[stderr] {line}" if stream == STDERR else line)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class RingBufferSink(OutputSink):
+    """
+    Keeps the last lines of each stream, e.g. to inspect the error of a failed command.
+
+    Args:
+    - max_lines: number of lines kept per stream. None keeps all lines.
+    """
+
+    def __init__(self, max_lines: Optional[int] = 1000) -> None:
+        self.lines: Dict[str, Deque[str]] = {STDOUT: deque(maxlen=max_lines), STDERR: deque(maxlen=max_lines)}
+
+    def write(self, line: str, stream: str) -> None:
+        self.lines[stream].append(line)
+
+    def get_text(self, stream: str = STDOUT) -> str:
+        return "".join(self.lines[stream])
+
+
+def get_encoding() -> str:
+    return "cp850" if (locale.getlocale()[0] == "de_DE" and sys.platform == "win32") else "utf-8"
+
+
+def _read_lines(pipe: IO[str], stream: str, lines: queue.Queue[Tuple[str, Optional[str]]]) -> None:
+    with pipe:
+        for line in pipe:
+            lines.put((stream, line))
+    lines.put((stream, None))
 
 
 class CommandLineExecutor:
@@ -10,6 +88,10 @@ class CommandLineExecutor:
         self,
         cwd: Optional[Path] = None,
         env: Optional[Dict[str, str]] = None,
+        sinks: Optional[List[OutputSink]] = None,
+        echo: bool = True,
+        separate_stderr: bool = False,
+        max_output_lines: Optional[int] = 1000,
     ):
         """
         A class for executing command line commands.
@@ -18,40 +100,85 @@ class CommandLineExecutor:
         - cmd: A string or list of strings representing the command to be executed.
         - cwd: An optional Path object representing the current working directory.
         - env: An optional dictionary of environment variables to be used in the command execution.
+        - sinks: Additional sinks receiving the output lines while the command is running, e.g. a LogFileSink.
+          The sinks are not closed, so the executor can be reused. The caller closes them.
+        - echo: Print the output to the console. Disable it for CI runs which only need the log file.
+        - separate_stderr: Capture stderr separately instead of redirecting it to stdout.
+        - max_output_lines: Only keep the last lines of each stream in the returned CompletedProcess. None keeps all lines.
         """
         self.current_working_directory = cwd
         self.env = env
+        self.sinks = sinks or []
+        self.echo = echo
+        self.separate_stderr = separate_stderr
+        self.max_output_lines = max_output_lines
 
     def execute(self, cmd: str | List[str]) -> subprocess.CompletedProcess[str]:
         """
         Executes the command and returns a CompletedProcess object.
 
+        The output is streamed line by line to the sinks, only the retained tail is kept in memory.
+
         Returns:
         - A subprocess.CompletedProcess object representing the result of the command execution.
+          stderr is None unless it is captured separately.
         """
         command = " ".join([cmd] if isinstance(cmd, str) else cmd)
-        output = ""
+        retained = RingBufferSink(self.max_output_lines)
+        own_sinks: List[OutputSink] = [retained]
+        if self.echo:
+            own_sinks.append(ConsoleSink())
+        sinks = [*own_sinks, *self.sinks]
         try:
-            print("=" * 120)
-            print(f"= Running command: {command}")
-            print("=" * 120)
+            if self.echo:
+                print("=" * 120)
+                print(f"= Running command: {command}")
+                print("=" * 120)
             with subprocess.Popen(
                 command,
                 cwd=str(self.current_working_directory or Path.cwd()),
                 stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
+                stderr=subprocess.PIPE if self.separate_stderr else subprocess.STDOUT,
                 bufsize=1,
                 text=True,
                 env=self.env,
                 universal_newlines=True,
-                encoding="cp850" if (locale.getlocale()[0] == "de_DE" and sys.platform == "win32") else "utf-8",
+                encoding=get_encoding(),
             ) as process:
-                if process.stdout:
-                    for line in process.stdout:
-                        print(line, end="")
-                        # We have to store the stdout content.
-                        # This is necessary because the stdout object is closed after we printed its content
-                        output += line
+                self._dispatch(process, sinks)
         except Exception:
             raise RuntimeError(f"Command '{command}' failed.")  # noqa: B904
-        return subprocess.CompletedProcess(args=command, returncode=process.returncode, stdout=output, stderr=None)
+        finally:
+            for sink in own_sinks:
+                sink.close()
+        return subprocess.CompletedProcess(
+            args=command,
+            returncode=process.returncode,
+            stdout=retained.get_text(STDOUT),
+            stderr=retained.get_text(STDERR) if self.separate_stderr else None,
+        )
+
+    @staticmethod
+    def _dispatch(process: subprocess.Popen[str], sinks: List[OutputSink]) -> None:
+        if process.stderr is None:
+            if process.stdout:
+                for line in process.stdout:
+                    for sink in sinks:
+                        sink.write(line, STDOUT)
+            return
+        # Reading both pipes in the calling thread could block on one pipe while the other one is full.
+        # Reader threads work on every platform; the sinks are still only called from this thread.
+        lines: queue.Queue[Tuple[str, Optional[str]]] = queue.Queue()
+        readers = [threading.Thread(target=_read_lines, args=(pipe, stream, lines), daemon=True) for pipe, stream in ((process.stdout, STDOUT), (process.stderr, STDERR)) if pipe]
+        for reader in readers:
+            reader.start()
+        open_streams = len(readers)
+        while open_streams:
+            stream, next_line = lines.get()
+            if next_line is None:
+                open_streams -= 1
+                continue
+            for sink in sinks:
+                sink.write(next_line, stream)
+        for reader in readers:
+            reader.join()
@@ -0,0 +1,130 @@
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from spl_core.common.command_line_executor import OutputSink
+
+
+class ErrorMatcher(ABC):
+    """Decides if an output line reports an error which is worth a retry, e.g. a missing floating license."""
+
+    @abstractmethod
+    def matches(self, line: str) -> bool:
+        pass
+
+
+class SubstringMatcher(ErrorMatcher):
+    def __init__(self, *substrings: str) -> None:
+        self.substrings = substrings
+
+    def matches(self, line: str) -> bool:
+        return any(substring in line for substring in self.substrings)
+
+
+class RegexMatcher(ErrorMatcher):
+    def __init__(self, pattern: str) -> None:
+        self.pattern = re.compile(pattern)
+
+    def matches(self, line: str) -> bool:
+        return self.pattern.search(line) is not None
+
+
+#: Errors of the floating license server of the compiler
+LICENSE_ERROR_MATCHERS: List[ErrorMatcher] = [SubstringMatcher("No valid floating license", "No valid license", "GHS_LMHOST = N/A")]
+
+
+class ErrorMatcherSink(OutputSink):
+    """Evaluates the matchers on the streamed output lines, the output does not need to be kept."""
+
+    def __init__(self, matchers: List[ErrorMatcher]) -> None:
+        self.matchers = matchers
+        self.matched_line: Optional[str] = None
+
+    def write(self, line: str, stream: str) -> None:
+        if self.matched_line is None and any(matcher.matches(line) for matcher in self.matchers):
+            self.matched_line = line.rstrip()
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with jitter, so parallel jobs do not hit the license server in lockstep.
+
+    The delay before retry n (starting with 1) is ``min(max_delay, initial_delay * backoff_factor ** (n - 1))``,
+    reduced by a random part of up to ``jitter`` (0..1) of it.
+    """
+
+    #: Maximum number of executions including the first one
+    max_attempts: int = 10
+    initial_delay: float = 10.0
+    max_delay: float = 300.0
+    backoff_factor: float = 2.0
+    jitter: float = 0.5
+    #: No retry is started after this many seconds since the first execution
+    deadline: Optional[float] = 3600.0
+    matchers: List[ErrorMatcher] = field(default_factory=lambda: list(LICENSE_ERROR_MATCHERS))
+
+    def get_delay(self, retry: int) -> float:
+        delay = min(self.max_delay, self.initial_delay * self.backoff_factor ** (retry - 1))
+        return delay * (1 - self.jitter * random.random())  # noqa: S311
+
+    def matches(self, output: str) -> Optional[str]:
+        """Returns the first output line matching one of the matchers."""
+        for line in output.splitlines():
+            if any(matcher.matches(line) for matcher in self.matchers):
+                return line
+        return None
+
+    def create_sink(self) -> ErrorMatcherSink:
+        return ErrorMatcherSink(self.matchers)
+
+
+@dataclass
+class RetryReport:
+    """Machine-readable record of the executions of one command."""
+
+    attempts: int = 0
+    #: Total wait time between the attempts in seconds
+    wait_time: float = 0.0
+    #: The output line which caused each retry
+    retry_reasons: List[str] = field(default_factory=list)
+    #: True if the last attempt failed with a retryable error, but the attempts or the deadline were exhausted
+    gave_up: bool = False
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "retries": self.retries}
+
+
+class RetryScheduler:
+    """Keeps track of the attempts of one command and decides if and when to retry."""
+
+    def __init__(self, policy: RetryPolicy) -> None:
+        self.policy = policy
+        self.report = RetryReport()
+        self.start = time.monotonic()
+
+    def next_delay(self, returncode: int, matched_line: Optional[str]) -> Optional[float]:
+        """
+        Register a finished attempt.
+
+        Returns:
+            Optional[float]: the seconds to wait before the next attempt, or None if there shall be no retry.
+        """
+        self.report.attempts += 1
+        if not returncode or matched_line is None:
+            return None
+        delay = self.policy.get_delay(self.report.attempts)
+        deadline_exceeded = self.policy.deadline is not None and time.monotonic() - self.start + delay > self.policy.deadline
+        if self.report.attempts >= self.policy.max_attempts or deadline_exceeded:
+            self.report.gave_up = True
+            return None
+        self.report.retry_reasons.append(matched_line)
+        self.report.wait_time += delay
+        return delay
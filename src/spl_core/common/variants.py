@@ -0,0 +1,12 @@
+"""Variant handling shared by the KConfig batch mode, the build orchestrator and the pytest plugins."""
+
+from pathlib import Path
+from typing import List
+
+#: Minimum number of Ninja jobs per build when the number of parallel builds is calculated
+MIN_JOBS_PER_BUILD = 4
+
+
+def find_variants(variants_dir: Path) -> List[str]:
+    """Every directory containing a ``config.cmake`` file is a variant, e.g. ``Flavor/Subsystem``."""
+    return sorted(config_file.parent.relative_to(variants_dir).as_posix() for config_file in variants_dir.glob("**/config.cmake"))
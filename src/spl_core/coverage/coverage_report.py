@@ -0,0 +1,99 @@
+"""
+Coverage html reports of the component and variant targets, rendered by gcovr from the JSON tracefiles.
+
+All reports of a target are rendered by gcovr in this process, so Python and gcovr are only started once:
+
+* ``--component TRACEFILE OUTPUT_DIR [OUTPUT_DIR ...]`` renders the report of one tracefile.
+* ``--variant OUTPUT_DIR`` renders the merged report of all tracefiles (``--component`` and ``--tracefile``).
+
+Every report is rendered once and copied to its other output directories.
+The arguments after ``--`` are passed to every gcovr call, e.g. the ``GCOVR_ADDITIONAL_OPTIONS``
+with the title (``--html-title``), the thresholds or the excludes.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+#: The html report of gcovr, the pages of the source files are written next to it
+INDEX_FILE = "index.html"
+
+
+def run_gcovr(args: List[str]) -> int:
+    """Runs gcovr in this process and returns its exit code."""
+    from gcovr.__main__ import main as gcovr_main
+
+    # Older gcovr versions exit instead of returning the exit code
+    try:
+        return int(gcovr_main(args) or 0)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else int(e.code is not None)
+
+
+class CoverageReports:
+    def __init__(self, root: Path, gcovr_options: Sequence[str] = ()) -> None:
+        """
+        Renders the coverage reports of the components and the variant with gcovr.
+
+        Args:
+            root: The root directory of the source files in the tracefiles (``gcovr --root``).
+            gcovr_options: Additional options of every gcovr call.
+        """
+        self.root = root
+        self.gcovr_options = list(gcovr_options)
+        self.tracefiles: List[Path] = []
+
+    def add_tracefile(self, tracefile: Path) -> None:
+        """Adds the tracefile to the variant report. Every tracefile is added only once."""
+        key = os.path.normcase(os.path.abspath(tracefile))
+        if key not in (os.path.normcase(os.path.abspath(known)) for known in self.tracefiles):
+            self.tracefiles.append(tracefile)
+
+    def render(self, tracefiles: List[Path], output_dirs: List[Path]) -> int:
+        """Renders the report of the tracefiles into the first output directory and copies it to the other ones."""
+        output_dirs[0].mkdir(parents=True, exist_ok=True)
+        args = ["--root", str(self.root)]
+        for tracefile in tracefiles:
+            args += ["--add-tracefile", str(tracefile)]
+        exit_code = run_gcovr([*args, "--html", "--html-details", "--output", str(output_dirs[0] / INDEX_FILE), *self.gcovr_options])
+        for output_dir in output_dirs[1:]:
+            shutil.copytree(output_dirs[0], output_dir, dirs_exist_ok=True)
+        return exit_code
+
+    def render_components(self, components: List[Tuple[Path, List[Path]]]) -> int:
+        exit_code = 0
+        for tracefile, output_dirs in components:
+            self.add_tracefile(tracefile)
+            exit_code = max(exit_code, self.render([tracefile], output_dirs))
+        return exit_code
+
+    def render_variant(self, output_dirs: List[Path]) -> int:
+        return self.render(self.tracefiles, output_dirs)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Render the coverage reports of gcovr JSON tracefiles with gcovr in one process.",
+        epilog="The arguments after '--' are passed to gcovr.",
+    )
+    parser.add_argument("--root", required=True, help="Root directory of the source files (gcovr --root)")
+    parser.add_argument("--component", nargs="+", action="append", default=[], metavar=("TRACEFILE", "OUTPUT_DIR"), help="Render the report of the tracefile into the output directories")
+    parser.add_argument("--tracefile", action="append", default=[], help="Additional tracefile of the variant report")
+    parser.add_argument("--variant", action="append", default=[], metavar="OUTPUT_DIR", help="Render the merged report of all tracefiles into the output directories")
+    args = sys.argv[1:] if args is None else args
+    separator = args.index("--") if "--" in args else len(args)
+    arguments = parser.parse_args(args[:separator])
+    reports = CoverageReports(Path(arguments.root), args[separator + 1 :])
+    exit_code = reports.render_components([(Path(component[0]), [Path(output_dir) for output_dir in component[1:]]) for component in arguments.component])
+    if arguments.variant:
+        for tracefile in arguments.tracefile:
+            reports.add_tracefile(Path(tracefile))
+        exit_code = max(exit_code, reports.render_variant([Path(output_dir) for output_dir in arguments.variant]))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
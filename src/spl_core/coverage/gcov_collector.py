@@ -0,0 +1,273 @@
+"""
+Collects the coverage of a component build directory into a gcovr JSON tracefile.
+
+Replaces ``gcovr --json`` for the GCC toolchains: all ``.gcda`` files are passed in batches to
+``gcov --json-format --stdout`` and the batches run in a process pool, which also parses the gcov output.
+The tracefile can be read by the coverage_report.py script and by ``gcovr --add-tracefile``.
+It has the format version of the installed gcovr, which only reads tracefiles of its own version.
+The entries contain the keys required by gcovr 7 and 8.
+
+The gcovr exclusion markers (``GCOVR_EXCL_LINE``, ``GCOVR_EXCL_START`` and ``GCOVR_EXCL_STOP``
+and the ``LCOV_EXCL_`` equivalents) are supported.
+The other gcovr options (e.g. ``--exclude``, ``--filter`` or ``--exclude-unreachable-branches``) are not,
+if they are passed after ``--`` (the ``GCOVR_ADDITIONAL_OPTIONS``) the tracefile is written by gcovr instead.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+#: Maximum number of gcda files passed to one gcov call
+DEFAULT_BATCH_SIZE = 32
+#: The tracefile format version if gcovr is not installed
+GCOVR_FORMAT_VERSION = "0.14"
+EXCLUDE_LINE_MARKERS = ("GCOVR_EXCL_LINE", "LCOV_EXCL_LINE")
+EXCLUDE_START_MARKERS = ("GCOVR_EXCL_START", "LCOV_EXCL_START")
+EXCLUDE_STOP_MARKERS = ("GCOVR_EXCL_STOP", "LCOV_EXCL_STOP")
+
+
+class FileCounts:
+    """The counts of one source file, merged from all gcda files."""
+
+    def __init__(self) -> None:
+        self.lines: Dict[int, int] = {}
+        self.line_functions: Dict[int, str] = {}
+        self.branches: Dict[int, List[int]] = {}
+        #: The fallthrough and throw flags of the branches
+        self.branch_flags: Dict[int, List[Tuple[bool, bool]]] = {}
+        #: (function name, line number) -> execution count
+        self.functions: Dict[Tuple[str, int], int] = {}
+        #: (function name, line number) -> percentage of the executed blocks
+        self.function_blocks: Dict[Tuple[str, int], float] = {}
+
+    def add_line(self, line_number: int, count: int, function_name: Optional[str], branches: List[int], branch_flags: List[Tuple[bool, bool]]) -> None:
+        self.lines[line_number] = self.lines.get(line_number, 0) + count
+        if function_name:
+            self.line_functions.setdefault(line_number, function_name)
+        if branches:
+            merged = self.branches.setdefault(line_number, [])
+            # Headers might have different branches in different translation units
+            if len(branches) > len(merged):
+                merged.extend([0] * (len(branches) - len(merged)))
+                self.branch_flags[line_number] = branch_flags
+            for index, branch_count in enumerate(branches):
+                merged[index] += branch_count
+
+    def add_function(self, name: str, line_number: int, count: int, blocks_percent: float = 0.0) -> None:
+        key = (name, line_number)
+        self.functions[key] = self.functions.get(key, 0) + count
+        self.function_blocks[key] = max(self.function_blocks.get(key, 0.0), blocks_percent)
+
+    def merge(self, other: "FileCounts") -> None:
+        for line_number, count in other.lines.items():
+            self.add_line(line_number, count, other.line_functions.get(line_number), other.branches.get(line_number, []), other.branch_flags.get(line_number, []))
+        for (name, line_number), count in other.functions.items():
+            self.add_function(name, line_number, count, other.function_blocks.get((name, line_number), 0.0))
+
+    def remove_lines(self, excluded_lines: Set[int]) -> None:
+        for line_number in excluded_lines:
+            self.lines.pop(line_number, None)
+            self.branches.pop(line_number, None)
+        self.functions = {key: count for key, count in self.functions.items() if key[1] not in excluded_lines}
+
+    def to_gcovr(self, file: str) -> Dict[str, Any]:
+        lines = []
+        for line_number in sorted(self.lines):
+            line: Dict[str, Any] = {"line_number": line_number, "count": self.lines[line_number]}
+            if line_number in self.line_functions:
+                line["function_name"] = self.line_functions[line_number]
+            branches = zip(self.branches.get(line_number, []), self.branch_flags.get(line_number, []))
+            # gcov --json-format has no block numbers, gcovr 7 requires the key
+            line["branches"] = [{"branchno": index, "blockno": 0, "count": count, "fallthrough": fallthrough, "throw": throw} for index, (count, (fallthrough, throw)) in enumerate(branches)]
+            lines.append(line)
+        functions = []
+        for (name, line_number), count in sorted(self.functions.items(), key=lambda item: item[0][1]):
+            # gcov --json-format does not count the returns, gcovr 7 requires the key
+            functions.append({"name": name, "lineno": line_number, "execution_count": count, "returned_count": count, "blocks_percent": self.function_blocks.get((name, line_number), 0.0)})
+        return {"file": file, "lines": lines, "functions": functions}
+
+
+#: Source file path relative to the root directory -> counts
+Coverage = Dict[str, FileCounts]
+
+
+def find_gcda_files(build_dir: Path) -> List[str]:
+    """All gcda files in the build directory and its subdirectories, sorted."""
+    gcda_files = []
+    directories = [str(build_dir)]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.name.endswith(".gcda"):
+                    gcda_files.append(entry.path)
+    return sorted(gcda_files)
+
+
+def get_batches(files: List[str], jobs: int, batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[str]]:
+    """Splits the files evenly into batches for the jobs, with at most batch_size files per batch."""
+    if not files:
+        return []
+    size = max(1, min(batch_size, -(-len(files) // max(1, jobs))))
+    return [files[start : start + size] for start in range(0, len(files), size)]
+
+
+def get_relative_path(file: str, working_dir: str, root: str) -> Optional[str]:
+    """The path of the source file relative to the root or None if it is not below the root."""
+    path = os.path.normpath(os.path.join(working_dir, file))
+    try:
+        relative = os.path.relpath(path, root)
+    except ValueError:  # another drive on Windows
+        return None
+    return None if relative == os.pardir or relative.startswith(os.pardir + os.sep) else Path(relative).as_posix()
+
+
+def parse_gcov_output(output: str, root: str) -> Coverage:
+    """Converts the JSON documents written by ``gcov --json-format --stdout`` (one per gcda file) to the counts."""
+    coverage: Coverage = {}
+    for document in output.splitlines():
+        if not document.startswith("{"):
+            continue
+        report = json.loads(document)
+        working_dir = report.get("current_working_directory", "")
+        for file_report in report["files"]:
+            file = get_relative_path(file_report["file"], working_dir, root)
+            if file is None:
+                continue
+            counts = coverage.setdefault(file, FileCounts())
+            for line in file_report["lines"]:
+                branches = line["branches"]
+                counts.add_line(line["line_number"], line["count"], line.get("function_name"), [branch["count"] for branch in branches], [(branch["fallthrough"], branch["throw"]) for branch in branches])
+            for function in file_report["functions"]:
+                blocks = function.get("blocks", 0)
+                blocks_percent = 100.0 * function.get("blocks_executed", 0) / blocks if blocks else 0.0
+                counts.add_function(function.get("demangled_name") or function["name"], function["start_line"], function["execution_count"], blocks_percent)
+    return coverage
+
+
+def run_gcov(gcda_files: List[str], root: str, gcov_executable: str = "gcov") -> Coverage:
+    """Runs gcov for a batch of gcda files. Runs in the worker processes."""
+    result = subprocess.run([gcov_executable, "--json-format", "--stdout", "--branch-probabilities", *gcda_files], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{gcov_executable} failed with exit code {result.returncode}:\n{result.stderr}")
+    return parse_gcov_output(result.stdout, root)
+
+
+def merge(target: Coverage, source: Coverage) -> None:
+    for file, counts in source.items():
+        if file in target:
+            target[file].merge(counts)
+        else:
+            target[file] = counts
+
+
+def get_excluded_lines(source_lines: List[str]) -> Set[int]:
+    excluded: Set[int] = set()
+    start: Optional[int] = None
+    for line_number, line in enumerate(source_lines, 1):
+        if start is None and any(marker in line for marker in EXCLUDE_START_MARKERS):
+            start = line_number
+        if start is not None or any(marker in line for marker in EXCLUDE_LINE_MARKERS):
+            excluded.add(line_number)
+        if start is not None and any(marker in line for marker in EXCLUDE_STOP_MARKERS):
+            start = None
+    return excluded
+
+
+def apply_exclusions(coverage: Coverage, root: Path) -> None:
+    for file, counts in coverage.items():
+        try:
+            source = (root / file).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        if "_EXCL_" in source:
+            counts.remove_lines(get_excluded_lines(source.splitlines()))
+
+
+def collect(build_dir: Path, root: Path, jobs: int = 1, batch_size: int = DEFAULT_BATCH_SIZE, gcov_executable: str = "gcov") -> Dict[str, Any]:
+    """
+    Collects the coverage of all gcda files in the build directory.
+
+    Args:
+        build_dir: The directory with the gcda files.
+        root: Only source files below the root are collected, their paths are relative to the root.
+        jobs: Number of gcov processes running at the same time.
+        batch_size: Maximum number of gcda files passed to one gcov call.
+        gcov_executable: The gcov executable, it must support ``--json-format`` (GCC 9 and later).
+
+    Returns:
+        The tracefile content in the gcovr JSON format.
+    """
+    root_dir = str(root.absolute())
+    batches = get_batches(find_gcda_files(build_dir), jobs, batch_size)
+    coverage: Coverage = {}
+    if len(batches) == 1 or jobs == 1:
+        for batch in batches:
+            merge(coverage, run_gcov(batch, root_dir, gcov_executable))
+    elif batches:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(batches))) as executor:
+            for batch_coverage in executor.map(run_gcov, batches, [root_dir] * len(batches), [gcov_executable] * len(batches)):
+                merge(coverage, batch_coverage)
+    apply_exclusions(coverage, Path(root_dir))
+    return {"gcovr/format_version": get_format_version(), "files": [coverage[file].to_gcovr(file) for file in sorted(coverage)]}
+
+
+def get_format_version() -> str:
+    """The tracefile format version of the installed gcovr."""
+    try:
+        from gcovr.data_model.version import FORMAT_VERSION  # gcovr 8
+
+        return str(FORMAT_VERSION)
+    except ImportError:
+        pass
+    try:
+        from gcovr.formats.json.versions import JSON_FORMAT_VERSION  # gcovr 7
+
+        return str(JSON_FORMAT_VERSION)
+    except ImportError:
+        return GCOVR_FORMAT_VERSION
+
+
+def parse_jobs(value: str) -> int:
+    return (os.cpu_count() or 1) if value == "auto" else int(value)
+
+
+def run_gcovr(build_dir: Path, root: Path, output: Path, gcovr_options: List[str]) -> int:
+    """Writes the tracefile with gcovr, which supports all gcovr options."""
+    return subprocess.run([sys.executable, "-m", "gcovr", "--root", str(root), "--json", "--output", str(output), *gcovr_options, str(build_dir)]).returncode
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Collect the coverage of all gcda files in a build directory into a gcovr JSON tracefile.",
+        epilog="The arguments after '--' are gcovr options, if there are any the tracefile is written by gcovr.",
+    )
+    parser.add_argument("build_dir", help="Directory with the gcda files")
+    parser.add_argument("--root", required=True, help="Root directory of the source files (gcovr --root)")
+    parser.add_argument("--output", required=True, help="The tracefile")
+    parser.add_argument("-j", "--jobs", default="auto", type=parse_jobs, help="Number of parallel gcov processes or 'auto' for the number of CPUs (default: auto)")
+    parser.add_argument("--batch-size", default=DEFAULT_BATCH_SIZE, type=int, help=f"Maximum number of gcda files per gcov call (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--gcov-executable", default="gcov", help="The gcov executable (default: gcov)")
+    args = sys.argv[1:] if args is None else args
+    separator = args.index("--") if "--" in args else len(args)
+    arguments = parser.parse_args(args[:separator])
+    gcovr_options = args[separator + 1 :]
+    if gcovr_options:
+        return run_gcovr(Path(arguments.build_dir), Path(arguments.root), Path(arguments.output), gcovr_options)
+    try:
+        tracefile = collect(Path(arguments.build_dir), Path(arguments.root), arguments.jobs, arguments.batch_size, arguments.gcov_executable)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    Path(arguments.output).write_text(json.dumps(tracefile, indent=1), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
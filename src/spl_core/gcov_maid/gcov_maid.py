@@ -1,20 +1,44 @@
 import argparse
+import json
+import os
+import shlex
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+OBJECT_FILE_SUFFIXES = (".o", ".obj")
+
+
+@dataclass
+class CoverageFiles:
+    """Result of walking the build tree: files to be deleted and their total size in bytes."""
+
+    gcda_files: List[str] = field(default_factory=list)
+    gcda_bytes: int = 0
+    orphaned_gcno_files: List[str] = field(default_factory=list)
+    orphaned_gcno_bytes: int = 0
+    orphaned_gcda_files: List[str] = field(default_factory=list)
+    orphaned_gcda_bytes: int = 0
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Script with command line options")
-    parser.add_argument(
-        "--working-dir", help="Working directory", required=True
-    )  # Make the option mandatory
-    parser.add_argument(
-        "--wipe-all-gcda", action="store_true", help="Wipe all gcda files recursively"
-    )
+    parser.add_argument("--working-dir", help="Working directory", required=True)  # Make the option mandatory
+    parser.add_argument("--wipe-all-gcda", action="store_true", help="Wipe all gcda files recursively")
     parser.add_argument(
         "--wipe-orphaned-gcno",
         action="store_true",
         help="Wipe orphaned gcno files recursively",
     )
+    parser.add_argument("--wipe-orphaned-gcda", action="store_true", help="Wipe gcda files without object file in the build graph (requires --build-dir)")
+    parser.add_argument(
+        "--build-dir",
+        help="Build directory with compile_commands.json or build.ninja. The object files of the current configuration decide which coverage files are orphaned.",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
 
     args = parser.parse_args()
 
@@ -23,25 +47,200 @@ def main() -> None:
     wipe_gcda = bool(args.wipe_all_gcda)  # Convert the switch value to boolean
     wipe_gcno = bool(args.wipe_orphaned_gcno)  # Convert the switch value to boolean
 
-    if wipe_gcda:
-        wipe_gcda_files(working_dir)
+    object_index = load_object_index(Path(args.build_dir), working_dir) if args.build_dir else None
+    wipe_orphaned_gcda = bool(args.wipe_orphaned_gcda) and object_index is not None
+
+    if wipe_gcda or wipe_gcno or wipe_orphaned_gcda:
+        wipe_coverage_files(working_dir, wipe_gcda, wipe_gcno, dry_run=bool(args.dry_run), object_index=object_index, wipe_orphaned_gcda=wipe_orphaned_gcda)
+
+
+def _coverage_key(object_or_coverage_file: str) -> str:
+    """GCC names the coverage files after the object file without its suffix, e.g. main.c.obj -> main.c.gcno"""
+    return os.path.normcase(os.path.splitext(os.path.abspath(object_or_coverage_file))[0])
+
+
+def _get_output_from_command(entry: Dict[str, Any]) -> Optional[str]:
+    arguments = entry.get("arguments") or shlex.split(entry.get("command", ""), posix=os.name != "nt")
+    for index, argument in enumerate(arguments):
+        if argument in ("-o", "/Fo") and index + 1 < len(arguments):
+            return str(arguments[index + 1])
+        if argument.startswith(("-o", "/Fo")) and len(argument) > 2:
+            return str(argument[3:] if argument.startswith("/Fo") else argument[2:])
+    return None
+
+
+def _scope_prefix(scope: Optional[Path]) -> str:
+    """The object files below the scope directory start with this prefix (see _coverage_key)."""
+    return os.path.join(os.path.normcase(os.path.abspath(scope)), "") if scope else ""
+
+
+def load_object_index_from_compile_commands(compile_commands_file: Path, scope: Optional[Path] = None) -> Set[str]:
+    index = set()
+    prefix = _scope_prefix(scope)
+    for entry in json.loads(compile_commands_file.read_text()):
+        directory = os.path.join(os.path.normcase(os.path.abspath(entry.get("directory", ""))), "")
+        # The objects are written below the directory of the compile command (a component or the build directory),
+        # so only the commands of the scope and of its parent directories need to be parsed
+        if not (directory.startswith(prefix) or prefix.startswith(directory)):
+            continue
+        output = entry.get("output") or _get_output_from_command(entry)
+        if output:
+            key = _coverage_key(os.path.join(entry.get("directory", ""), output))
+            if key.startswith(prefix):
+                index.add(key)
+    return index
 
+
+def load_object_index_from_ninja(build_dir: Path, scope: Optional[Path] = None) -> Set[str]:
+    result = subprocess.run(["ninja", "-C", str(build_dir), "-t", "targets", "all"], capture_output=True, text=True, check=True)  # noqa: S607
+    index = set()
+    prefix = _scope_prefix(scope)
+    for line in result.stdout.splitlines():
+        target = line.rpartition(": ")[0]
+        if target.endswith(OBJECT_FILE_SUFFIXES):
+            key = _coverage_key(os.path.join(build_dir, target))
+            if key.startswith(prefix):
+                index.add(key)
+    return index
+
+
+def load_object_index(build_dir: Path, scope: Optional[Path] = None) -> Optional[Set[str]]:
+    """
+    Collect the object files of the current build configuration from compile_commands.json or the ninja build graph.
+
+    Args:
+        build_dir: The build directory with the compile_commands.json or build.ninja.
+        scope: Only the object files below this directory are collected, e.g. the build directory of a component.
+
+    Returns:
+        The object file paths without suffix (see _coverage_key) or None if no build graph is available.
+    """
+    compile_commands_file = build_dir / "compile_commands.json"
+    if compile_commands_file.exists():
+        return load_object_index_from_compile_commands(compile_commands_file, scope)
+    if (build_dir / "build.ninja").exists():
+        try:
+            return load_object_index_from_ninja(build_dir, scope)
+        except (OSError, subprocess.CalledProcessError):
+            pass
+    print(f"No compile_commands.json or build.ninja found in {build_dir}, checking for object files next to the gcno files.")
+    return None
+
+
+def _entry_size(entry: os.DirEntry[str]) -> int:
+    try:
+        return entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        return 0
+
+
+def collect_coverage_files(
+    working_dir: Path,
+    collect_gcda: bool = True,
+    collect_gcno: bool = True,
+    object_index: Optional[Set[str]] = None,
+    collect_orphaned_gcda: bool = False,
+) -> CoverageFiles:
+    """
+    Walk the build tree once and collect all gcda files and all orphaned gcno files.
+
+    With an object index, the coverage files not backed by an object file of the current configuration are orphaned
+    (one set difference after the walk). Otherwise a gcno file is orphaned if there is no sibling object file
+    with one of the OBJECT_FILE_SUFFIXES.
+    The object files are looked up in the names of the directory entries, so no additional stat is required.
+    """
+    result = CoverageFiles()
+    gcno_entries: Dict[str, os.DirEntry[str]] = {}
+    gcda_entries: Dict[str, os.DirEntry[str]] = {}
+    directories = [os.path.abspath(working_dir)]
+    while directories:
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError:
+            continue
+        names = {entry.name for entry in entries}
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif entry.name.endswith(".gcda"):
+                if collect_gcda:
+                    result.gcda_files.append(entry.path)
+                    result.gcda_bytes += _entry_size(entry)
+                elif collect_orphaned_gcda and object_index is not None:
+                    gcda_entries[_coverage_key(entry.path)] = entry
+            elif collect_gcno and entry.name.endswith(".gcno"):
+                if object_index is not None:
+                    gcno_entries[_coverage_key(entry.path)] = entry
+                elif not any(f"{entry.name[: -len('.gcno')]}{suffix}" in names for suffix in OBJECT_FILE_SUFFIXES):
+                    result.orphaned_gcno_files.append(entry.path)
+                    result.orphaned_gcno_bytes += _entry_size(entry)
+    if object_index is not None:
+        for key in gcno_entries.keys() - object_index:
+            result.orphaned_gcno_files.append(gcno_entries[key].path)
+            result.orphaned_gcno_bytes += _entry_size(gcno_entries[key])
+        for key in gcda_entries.keys() - object_index:
+            result.orphaned_gcda_files.append(gcda_entries[key].path)
+            result.orphaned_gcda_bytes += _entry_size(gcda_entries[key])
+    return result
+
+
+def _unlink_batch(files: List[str]) -> int:
+    deleted = 0
+    for file in files:
+        try:
+            os.unlink(file)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def delete_files(files: List[str], batch_size: int = 256) -> int:
+    """Delete the files in parallel batches. Returns the number of deleted files."""
+    batches = [files[index : index + batch_size] for index in range(0, len(files), batch_size)]
+    if len(batches) <= 1:
+        return sum(_unlink_batch(batch) for batch in batches)
+    with ThreadPoolExecutor() as executor:
+        return sum(executor.map(_unlink_batch, batches))
+
+
+def _format_bytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+
+def wipe_coverage_files(
+    working_dir: Path,
+    wipe_gcda: bool = True,
+    wipe_gcno: bool = True,
+    dry_run: bool = False,
+    object_index: Optional[Set[str]] = None,
+    wipe_orphaned_gcda: bool = False,
+) -> CoverageFiles:
+    """Delete all gcda files and/or all orphaned gcno (and gcda) files with a single walk of the build tree."""
+    start = time.perf_counter()
+    coverage_files = collect_coverage_files(working_dir, wipe_gcda, wipe_gcno, object_index, wipe_orphaned_gcda)
+    if not dry_run:
+        delete_files(coverage_files.gcda_files + coverage_files.orphaned_gcno_files + coverage_files.orphaned_gcda_files)
+    action = "Would delete" if dry_run else "Deleted"
+    summary = []
+    if wipe_gcda:
+        summary.append(f"{len(coverage_files.gcda_files)} obsolete coverage data files ({_format_bytes(coverage_files.gcda_bytes)})")
     if wipe_gcno:
-        wipe_gcno_files(working_dir)
+        summary.append(f"{len(coverage_files.orphaned_gcno_files)} obsolete coverage notes files ({_format_bytes(coverage_files.orphaned_gcno_bytes)})")
+    if wipe_orphaned_gcda and not wipe_gcda:
+        summary.append(f"{len(coverage_files.orphaned_gcda_files)} orphaned coverage data files ({_format_bytes(coverage_files.orphaned_gcda_bytes)})")
+    print(f"{action} {' and '.join(summary)} in {working_dir} ({time.perf_counter() - start:.2f}s)")
+    return coverage_files
 
 
 def wipe_gcda_files(working_dir: Path) -> None:
-    for file in working_dir.glob("**/*.gcda"):
-        print(f"Deleting obsolete coverage data file: {file}")
-        file.unlink()
+    wipe_coverage_files(working_dir, wipe_gcda=True, wipe_gcno=False)
 
 
 def wipe_gcno_files(working_dir: Path) -> None:
-    for file in working_dir.glob("**/*.gcno"):
-        obj_file = file.with_suffix(".obj")
-        if not obj_file.exists():
-            print(f"Deleting obsolete coverage notes file: {file}")
-            file.unlink()
+    wipe_coverage_files(working_dir, wipe_gcda=False, wipe_gcno=True)
 
 
 if __name__ == "__main__":
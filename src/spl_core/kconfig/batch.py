@@ -0,0 +1,129 @@
+"""
+Generate the KConfig outputs for several variants while parsing the feature model only once.
+
+Example: ``python -m spl_core.kconfig.batch --kconfig_model_file KConfig --variants_dir variants --out_dir build/kconfig --jobs 4``
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from spl_core.common.path import existing_path, non_existing_path
+from spl_core.common.variants import find_variants
+from spl_core.kconfig.kconfig import CMakeWriter, ConfigurationRenderer, ConfigurationWriter, ContentHashStore, HeaderWriter, JsonWriter, KConfig
+
+#: Environment variables which are set per variant (see spl.cmake)
+VARIANT_ENV_VARS = ["FLAVOR", "SUBSYSTEM", "VARIANT", "BUILD_KIT", "BINARY_BASENAME", "CMAKE_SOURCE_DIR"]
+
+
+class KConfigBatch:
+    """Holds one parsed feature model and generates the outputs for any number of variants from it."""
+
+    def __init__(self, k_config_model_file: Path, variants_dir: Path, out_dir: Path, build_kit: str = "prod") -> None:
+        self.k_config_model_file = k_config_model_file
+        self.variants_dir = variants_dir
+        self.out_dir = out_dir
+        self.build_kit = build_kit
+        self._kconfig: Optional[KConfig] = None
+        #: The variant specific environment variables referenced by the parsed model and their values
+        self._model_environment: Dict[str, Optional[str]] = {}
+
+    def get_config_file(self, variant: str) -> Optional[Path]:
+        config_file = self.variants_dir.joinpath(variant, "config.txt")
+        return config_file if config_file.exists() else None
+
+    def get_out_dir(self, variant: str) -> Path:
+        return self.out_dir.joinpath(variant)
+
+    def get_environment(self, variant: str) -> Dict[str, str]:
+        """The environment variables spl.cmake sets for the KConfig expansion. The variants are <flavor>/<subsystem>."""
+        flavor, _, subsystem = variant.partition("/")
+        return {
+            "FLAVOR": flavor if subsystem else "",
+            "SUBSYSTEM": subsystem,
+            "VARIANT": variant,
+            "BUILD_KIT": self.build_kit,
+            "BINARY_BASENAME": variant.replace("/", "_"),
+            "CMAKE_SOURCE_DIR": self.variants_dir.absolute().parent.as_posix(),
+        }
+
+    def generate(self, variant: str) -> str:
+        """
+        Load the variant configuration into the parsed model and write autoconf.h, autoconf.json and autoconf.cmake.
+
+        The model is parsed again only if a variant specific environment variable it references changed.
+        The environment of the caller is restored afterwards.
+        """
+        environment = dict(os.environ)
+        try:
+            os.environ.update(self.get_environment(variant))
+            self._generate(variant)
+        finally:
+            os.environ.clear()
+            os.environ.update(environment)
+        return variant
+
+    def _generate(self, variant: str) -> None:
+        config_file = self.get_config_file(variant)
+        if self._kconfig is None or any(os.environ.get(name) != value for name, value in self._model_environment.items()):
+            self._kconfig = KConfig(self.k_config_model_file, config_file)
+            self._model_environment = {name: os.environ.get(name) for name in self._kconfig._config.env_vars.intersection(VARIANT_ENV_VARS)}
+            config = self._kconfig.config
+        else:
+            config = self._kconfig.load_config_file(config_file)
+        out_dir = self.get_out_dir(variant)
+        hash_store = ContentHashStore(out_dir / "generated_file_hashes.json")
+        writers: List[ConfigurationWriter] = [HeaderWriter(out_dir / "autoconf.h", hash_store), JsonWriter(out_dir / "autoconf.json", hash_store), CMakeWriter(out_dir / "autoconf.cmake", hash_store)]
+        ConfigurationRenderer(writers, hash_store).render(config)
+
+
+#: Parsed feature model of the current worker process
+_worker_batch: Optional[KConfigBatch] = None
+
+
+def _init_worker(k_config_model_file: Path, variants_dir: Path, out_dir: Path, build_kit: str) -> None:
+    global _worker_batch
+    _worker_batch = KConfigBatch(k_config_model_file, variants_dir, out_dir, build_kit)
+
+
+def _generate_in_worker(variant: str) -> str:
+    assert _worker_batch is not None  # noqa: S101
+    return _worker_batch.generate(variant)
+
+
+def generate_variants(k_config_model_file: Path, variants_dir: Path, out_dir: Path, variants: List[str], jobs: int = 1, build_kit: str = "prod") -> List[str]:
+    """
+    Generate the KConfig outputs for all given variants.
+
+    :param jobs: number of worker processes. Every worker parses the feature model once.
+    :param build_kit: the BUILD_KIT environment variable of the KConfig expansion
+    """
+    if jobs <= 1 or len(variants) <= 1:
+        batch = KConfigBatch(k_config_model_file, variants_dir, out_dir, build_kit)
+        return [batch.generate(variant) for variant in variants]
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(variants)),
+        initializer=_init_worker,
+        initargs=(k_config_model_file, variants_dir, out_dir, build_kit),
+    ) as executor:
+        return list(executor.map(_generate_in_worker, variants))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="KConfig generation for multiple variants")
+    parser.add_argument("--kconfig_model_file", required=True, type=existing_path)
+    parser.add_argument("--variants_dir", required=True, type=existing_path)
+    parser.add_argument("--out_dir", required=True, type=non_existing_path, help="Outputs are written to <out_dir>/<variant>/")
+    parser.add_argument("--variants", nargs="*", help="Variants to generate. Default: all variants found in the variants directory.")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--build_kit", default="prod", help="Build kit of the KConfig expansion (BUILD_KIT). Default: prod")
+    arguments = parser.parse_args()
+    variants = arguments.variants or find_variants(arguments.variants_dir)
+    for variant in generate_variants(arguments.kconfig_model_file, arguments.variants_dir, arguments.out_dir, variants, arguments.jobs, arguments.build_kit):
+        print(f"Generated KConfig outputs for variant {variant}")
+
+
+if __name__ == "__main__":
+    main()
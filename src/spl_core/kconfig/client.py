@@ -0,0 +1,91 @@
+"""
+Thin client for the KConfig server, called by kconfig.cmake with the same arguments as kconfig.py.
+
+Only the standard library is imported, so the client starts fast.
+If no server is running, the configuration is generated in this process like kconfig.py does.
+"""
+
+import getpass
+import os
+import sys
+import tempfile
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from typing import Any, Dict, List, Optional
+
+#: Named pipe prefix on Windows
+PIPE_PREFIX = "\\\\.\\pipe\\"
+AUTHKEY_SIZE = 32
+
+
+def get_server_address() -> str:
+    """The server address can be overridden with the environment variable SPL_KCONFIG_SERVER_ADDRESS."""
+    address = os.environ.get("SPL_KCONFIG_SERVER_ADDRESS")
+    if address:
+        return address
+    if sys.platform == "win32":
+        return rf"\\.\pipe\spl_core_kconfig_{getpass.getuser()}"
+    return os.path.join(tempfile.gettempdir(), f"spl_core_kconfig_{getpass.getuser()}.sock")
+
+
+def get_authkey_file(address: str) -> str:
+    """The authentication key is stored next to the socket file. For named pipes it is stored in the (per user) temp directory."""
+    if address.startswith(PIPE_PREFIX):
+        return os.path.join(tempfile.gettempdir(), f"{address[len(PIPE_PREFIX) :]}.key")
+    return f"{address}.key"
+
+
+def create_authkey(address: str) -> bytes:
+    """Creates a random authentication key for a server, only readable by the current user."""
+    authkey = os.urandom(AUTHKEY_SIZE)
+    authkey_file = get_authkey_file(address)
+    if os.path.lexists(authkey_file):
+        os.unlink(authkey_file)
+    file_descriptor = os.open(authkey_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o600)
+    with os.fdopen(file_descriptor, "wb") as file:
+        file.write(authkey)
+    return authkey
+
+
+def read_authkey(address: str) -> Optional[bytes]:
+    """The authentication key of the server. Returns None if there is no key or it is accessible by other users."""
+    try:
+        with open(get_authkey_file(address), "rb") as file:
+            if os.name != "nt":
+                status = os.fstat(file.fileno())
+                if status.st_uid != os.getuid() or status.st_mode & 0o077:
+                    return None
+            return file.read()
+    except OSError:
+        return None
+
+
+def request(message: Dict[str, Any], address: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Sends the message to the server. Returns None if no server is running."""
+    address = address or get_server_address()
+    authkey = read_authkey(address)
+    if authkey is None:
+        return None
+    try:
+        with Client(address, authkey=authkey) as connection:
+            connection.send(message)
+            return connection.recv()
+    except (OSError, EOFError, AuthenticationError):
+        return None
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    args = sys.argv[1:] if args is None else args
+    response = request({"command": "generate", "args": args, "cwd": os.getcwd(), "env": dict(os.environ)})
+    if response is None:
+        # No server running, fall back to the one-shot generation
+        from spl_core.kconfig.kconfig import main as kconfig_main
+
+        kconfig_main(args)
+        return
+    print(response["output"], end="")
+    sys.exit(response["returncode"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compiler launcher which makes the object files depend on the used configuration elements instead of autoconf.h.
+
+It runs the compiler command and rewrites its make style dependency file (``-MF``), similar to Linux ``scripts/basic/fixdep.c``:
+the dependency on autoconf.h is replaced by the headers of the ``CONFIG_*`` elements referenced in the source
+and its included files. These headers are written by the SplitHeaderWriter and only change if the element value changes.
+So toggling ``CONFIG_FOO`` recompiles only the translation units which reference ``CONFIG_FOO``.
+
+Only the standard library is used to keep the start-up time per compiler call low.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+CONFIG_REFERENCE = re.compile(rb"CONFIG_([A-Za-z0-9_]+)")
+#: Separator between target and dependencies. A colon followed by a slash is part of a Windows drive letter.
+TARGET_SEPARATOR = re.compile(r":(?:\s|$)")
+DEPENDENCY = re.compile(r"(?:\\ |\S)+")
+SYMBOLS_FILE_NAME = "symbols.txt"
+
+
+def get_depfile(command: List[str]) -> Optional[Path]:
+    for index, arg in enumerate(command):
+        if arg == "-MF" and index + 1 < len(command):
+            return Path(command[index + 1])
+        if arg.startswith("-MF") and len(arg) > 3:
+            return Path(arg[3:])
+    return None
+
+
+def parse_depfile(content: str) -> Tuple[str, List[str]]:
+    """Returns the target and the dependencies of the first rule of a make style dependency file."""
+    content = content.replace("\\\r\n", " ").replace("\\\n", " ")
+    rule = content.strip().splitlines()[0]
+    separator = TARGET_SEPARATOR.search(rule)
+    if not separator:
+        raise ValueError(f"Invalid dependency file rule: {rule}")
+    dependencies = [re.sub(r"\\([ #])", r"\1", dependency).replace("$$", "$") for dependency in DEPENDENCY.findall(rule[separator.end() :])]
+    return rule[: separator.start()], dependencies
+
+
+def escape(path: str) -> str:
+    return path.replace("$", "$$").replace(" ", "\\ ").replace("#", "\\#")
+
+
+def normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class DependencyFixer:
+    def __init__(self, autoconf_header: Path, config_dir: Path) -> None:
+        self.autoconf_header = normalize(str(autoconf_header))
+        self.config_dir = config_dir
+        symbols_file = config_dir / SYMBOLS_FILE_NAME
+        self.symbols: Set[str] = set(symbols_file.read_text().split()) if symbols_file.exists() else set()
+
+    def get_config_dependency(self, name: str) -> str:
+        if name not in self.symbols and name.endswith("_MODULE") and name[: -len("_MODULE")] in self.symbols:
+            name = name[: -len("_MODULE")]
+        if name in self.symbols:
+            return (self.config_dir / f"{name}.h").as_posix()
+        # Unknown elements might be added to the model later
+        return (self.config_dir / SYMBOLS_FILE_NAME).as_posix()
+
+    def get_referenced_config_names(self, files: List[str]) -> Set[str]:
+        names: Set[str] = set()
+        for file in files:
+            try:
+                names.update(match.decode() for match in CONFIG_REFERENCE.findall(Path(file).read_bytes()))
+            except OSError:
+                continue
+        return names
+
+    def fix(self, depfile: Path) -> bool:
+        """
+        Rewrites the dependency file if it depends on autoconf.h.
+
+        Returns:
+            bool: True if the dependency file was changed.
+        """
+        target, dependencies = parse_depfile(depfile.read_text())
+        remaining = [dependency for dependency in dependencies if normalize(dependency) != self.autoconf_header]
+        if len(remaining) == len(dependencies):
+            return False
+        config_dependencies = sorted({self.get_config_dependency(name) for name in self.get_referenced_config_names(remaining)})
+        depfile.write_text(" \\\n ".join([f"{target}:", *[escape(dependency) for dependency in remaining + config_dependencies]]) + "\n")
+        return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replace the autoconf.h dependency by the used configuration elements")
+    parser.add_argument("--autoconf_header", required=True, type=Path)
+    parser.add_argument("--config_dir", required=True, type=Path, help="Directory with one header per configuration element")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Compiler command, separated by '--'")
+    arguments = parser.parse_args()
+    command = arguments.command[1:] if arguments.command[:1] == ["--"] else arguments.command
+    if not command:
+        parser.error("No compiler command given.")
+    returncode = subprocess.call(command)
+    depfile = get_depfile(command)
+    if returncode == 0 and depfile and depfile.exists():
+        DependencyFixer(arguments.autoconf_header, arguments.config_dir).fix(depfile)
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
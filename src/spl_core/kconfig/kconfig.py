@@ -1,30 +1,111 @@
 import argparse
+import hashlib
 import json
 import os
 import re
+import time
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum, auto
 from pathlib import Path
-from typing import Any, Generator, List, Optional
+from typing import Any, Dict, Generator, Iterable, List, Optional, Sequence, Set
 
 import kconfiglib
+from py_app_dev.core.exceptions import UserNotificationException
 
 from spl_core.common.path import existing_path, non_existing_path
 
 
+class ContentHashStore:
+    """
+    Remembers the content hash, size and modification time of generated files.
+
+    As long as size and modification time of a file did not change, its stored hash is used
+    to detect content changes, without reading the file again.
+    """
+
+    def __init__(self, store_file: Path) -> None:
+        self.store_file = store_file
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            self.entries = json.loads(store_file.read_text())
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get_hash(self, path: Path) -> Optional[str]:
+        """Returns the stored hash if the file was not modified since it was stored."""
+        entry = self.entries.get(path.absolute().as_posix())
+        if not entry:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return entry["hash"] if (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]) else None
+
+    def update(self, path: Path, content_hash: str) -> None:
+        stat = path.stat()
+        self.entries[path.absolute().as_posix()] = {"hash": content_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def save(self) -> None:
+        GeneratedFile(self.store_file, json.dumps(self.entries, indent=2, sort_keys=True), skip_writing_if_unchanged=True).to_file()
+
+
 class GeneratedFile:
-    def __init__(self, path: Path, content: str = "", skip_writing_if_unchanged: bool = False) -> None:
+    def __init__(
+        self,
+        path: Path,
+        content: str = "",
+        skip_writing_if_unchanged: bool = False,
+        hash_store: Optional[ContentHashStore] = None,
+    ) -> None:
         self.path = path
 
         self.content = content
 
         self.skip_writing_if_unchanged = skip_writing_if_unchanged
 
+        self.hash_store = hash_store
+
     def to_string(self) -> str:
         return self.content
 
+    def _is_unchanged(self, content: str, content_hash: str) -> bool:
+        if not self.path.exists():
+            return False
+        stored_hash = self.hash_store.get_hash(self.path) if self.hash_store else None
+        if stored_hash is not None:
+            return stored_hash == content_hash
+        # Nothing stored or the file was modified by someone else
+        if self.path.read_text() != content:
+            return False
+        if self.hash_store:
+            self.hash_store.update(self.path, content_hash)
+        return True
+
+    def _write_atomic(self, content: str) -> None:
+        """Readers never see a partially written file, because the complete content is moved in place by a rename."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(content)
+            for attempt in range(5):
+                try:
+                    os.replace(tmp_path, self.path)
+                    break
+                except PermissionError:
+                    # On Windows the target can not be replaced while another process has it open
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.1)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
     def to_file(self) -> None:
         """
         Only write to file if the content has changed.
@@ -32,10 +113,12 @@ class GeneratedFile:
         The directory of the file is created if it does not exist.
         """
         content = self.to_string()
+        content_hash = ContentHashStore.content_hash(content)
 
-        if not self.path.exists() or not self.skip_writing_if_unchanged or self.path.read_text() != content:
-            self.path.parent.mkdir(parents=True, exist_ok=True)
-            self.path.write_text(content)
+        if not self.skip_writing_if_unchanged or not self._is_unchanged(content, content_hash):
+            self._write_atomic(content)
+            if self.hash_store:
+                self.hash_store.update(self.path, content_hash)
 
 
 class TriState(Enum):
@@ -72,103 +155,361 @@ class ConfigurationData:
     elements: List[ConfigElement]
 
 
-class FileWriter(ABC):
+class KConfigCache:
+    """
+    Stores the ConfigurationData together with a fingerprint of all inputs used to calculate it.
+
+    The fingerprint consists of the content hash of every KConfig model file sourced by kconfiglib,
+    the content hash of the user configuration file and the values of all referenced environment variables.
+    """
+
+    #: Increase whenever the cache content or the ConfigurationData calculation changes
+    version = 1
+
+    def __init__(self, cache_file: Path) -> None:
+        self.cache_file = cache_file
+
+    @staticmethod
+    def file_hash(file: Path) -> Optional[str]:
+        try:
+            return hashlib.sha256(file.read_bytes()).hexdigest()
+        except OSError:
+            return None
+
+    def _create_fingerprint(self, k_config_model_file: Path, k_config_file: Optional[Path], files: Iterable[Path], env_vars: Iterable[str]) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "model_file": k_config_model_file.absolute().as_posix(),
+            "config_file": k_config_file.absolute().as_posix() if k_config_file else None,
+            "files": {file.as_posix(): self.file_hash(file) for file in sorted(set(files))},
+            "env": {name: os.environ.get(name) for name in sorted(set(env_vars))},
+        }
+
+    def _is_up_to_date(self, fingerprint: Dict[str, Any], k_config_model_file: Path, k_config_file: Optional[Path]) -> bool:
+        return fingerprint == self._create_fingerprint(
+            k_config_model_file,
+            k_config_file,
+            [Path(file) for file in fingerprint.get("files", {})],
+            fingerprint.get("env", {}).keys(),
+        )
+
+    def load(self, k_config_model_file: Path, k_config_file: Optional[Path]) -> Optional[ConfigurationData]:
+        """Returns the cached ConfigurationData if none of the inputs changed, otherwise None."""
+        try:
+            cache = json.loads(self.cache_file.read_text())
+            if not self._is_up_to_date(cache["fingerprint"], k_config_model_file, k_config_file):
+                return None
+            return ConfigurationData(
+                [
+                    ConfigElement(
+                        ConfigElementType[element["type"]],
+                        element["name"],
+                        TriState[element["value"]] if element["type"] in ["BOOL", "TRISTATE"] else element["value"],
+                        element["write_to_conf"],
+                    )
+                    for element in cache["elements"]
+                ]
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def store(
+        self,
+        configuration_data: ConfigurationData,
+        k_config_model_file: Path,
+        k_config_file: Optional[Path],
+        files: Iterable[Path],
+        env_vars: Iterable[str],
+    ) -> None:
+        """Stores the ConfigurationData together with the fingerprint of its inputs."""
+        elements = [
+            {
+                "type": element.type.name,
+                "name": element.name,
+                "value": element.value.name if isinstance(element.value, TriState) else element.value,
+                "write_to_conf": element._write_to_conf,
+            }
+            for element in configuration_data.elements
+        ]
+        fingerprint = self._create_fingerprint(k_config_model_file, k_config_file, files, env_vars)
+        GeneratedFile(self.cache_file, json.dumps({"fingerprint": fingerprint, "elements": elements}, indent=2)).to_file()
+
+
+class ConfigurationWriter(ABC):
+    """
+    - writes the ConfigurationData element by element
+
+    The writers are fed by the ConfigurationRenderer, which walks the elements only once for all writers.
+    """
+
+    def __init__(self, hash_store: Optional[ContentHashStore] = None):
+        self.hash_store = hash_store
+
+    @abstractmethod
+    def start(self) -> None:
+        """- called before the first element"""
+
+    @abstractmethod
+    def add_element(self, element: ConfigElement) -> None:
+        """- called for every element in the order of the ConfigurationData"""
+
+    @abstractmethod
+    def finish(self) -> None:
+        """- called after the last element, writes the output"""
+
+    @abstractmethod
+    def outputs_exist(self) -> bool:
+        """- checks whether all outputs of the writer exist"""
+
+    def write(self, configuration_data: ConfigurationData) -> None:
+        ConfigurationRenderer([self]).render(configuration_data)
+
+
+class FileWriter(ConfigurationWriter):
     """- writes the ConfigurationData to a file"""
 
-    def __init__(self, output_file: Path):
+    def __init__(self, output_file: Path, hash_store: Optional[ContentHashStore] = None):
+        super().__init__(hash_store)
         self.output_file = output_file
 
-    def write(self, configuration_data: ConfigurationData) -> None:
+    def finish(self) -> None:
         """
-        - writes the ConfigurationData to a file
+        - writes the generated content to the file
         The file shall not be modified if the content is the same as the existing one
         """
-        content = self.generate_content(configuration_data)
-        GeneratedFile(self.output_file, content, skip_writing_if_unchanged=True).to_file()
+        GeneratedFile(self.output_file, self.get_content(), skip_writing_if_unchanged=True, hash_store=self.hash_store).to_file()
+
+    def outputs_exist(self) -> bool:
+        return self.output_file.exists()
 
     @abstractmethod
+    def get_content(self) -> str:
+        """- returns the content generated from the elements added since start()"""
+
     def generate_content(self, configuration_data: ConfigurationData) -> str:
         """- generates the content of the file from the ConfigurationData"""
+        self.start()
+        for element in configuration_data.elements:
+            self.add_element(element)
+        return self.get_content()
 
 
 class HeaderWriter(FileWriter):
-    """Writes the ConfigurationData as pre-processor defines in a C Header file"""
+    """
+    Writes the ConfigurationData as pre-processor defines in a C Header file
+
+    This writer does exactly what the kconfiglib.write_autoconf() method does.
+    We had to implemented here because we refactor the file writers to use the ConfigurationData
+    instead of the KConfig configuration. ConfigurationData has variable substitution already done.
+    """
 
     config_prefix = "CONFIG_"  # Prefix for all configuration defines
 
-    def generate_content(self, configuration_data: ConfigurationData) -> str:
-        """
-        This method does exactly what the kconfiglib.write_autoconf() method does.
-        We had to implemented here because we refactor the file writers to use the ConfigurationData
-        instead of the KConfig configuration. ConfigurationData has variable substitution already done.
-        """
-        result: List[str] = [
+    def start(self) -> None:
+        self._lines: List[str] = [
             "/** @file */",
             "#ifndef __autoconf_h__",
             "#define __autoconf_h__",
             "",
         ]
 
-        def add_define(define_decl: str, description: str) -> None:
-            result.append(f"/** {description} */")
-            result.append(define_decl)
+    def add_element(self, element: ConfigElement) -> None:
+        define_decl = self.generate_define(element)
+        if define_decl:
+            self._lines.append(f"/** {element.name} */")
+            self._lines.append(define_decl)
 
-        for element in configuration_data.elements:
-            val = element.value
-            if not element._write_to_conf:
-                continue
+    def get_content(self) -> str:
+        return "\n".join([*self._lines, "", "#endif /* __autoconf_h__ */", ""])
 
-            if element.type in [ConfigElementType.BOOL, ConfigElementType.TRISTATE]:
-                if val == TriState.Y:
-                    add_define(f"#define {self.config_prefix}{element.name} 1", element.name)
-                elif val == TriState.M:
-                    add_define(
-                        f"#define {self.config_prefix}{element.name}_MODULE 1",
-                        element.name,
-                    )
+    @classmethod
+    def generate_define(cls, element: ConfigElement) -> Optional[str]:
+        """- generates the pre-processor define for one element, None if the element shall not be defined"""
+        val = element.value
+        if not element._write_to_conf:
+            return None
+
+        if element.type in [ConfigElementType.BOOL, ConfigElementType.TRISTATE]:
+            if val == TriState.Y:
+                return f"#define {cls.config_prefix}{element.name} 1"
+            elif val == TriState.M:
+                return f"#define {cls.config_prefix}{element.name}_MODULE 1"
+            return None
+
+        elif element.type is ConfigElementType.STRING:
+            return f'#define {cls.config_prefix}{element.name} "{kconfiglib.escape(val)}"'
+
+        else:  # element.type in [INT, HEX]:
+            if element.type is ConfigElementType.HEX:
+                val = hex(val)
+            return f"#define {cls.config_prefix}{element.name} {val}"
+
+
+class SplitHeaderWriter(ConfigurationWriter):
+    """
+    Writes one small header per configuration element into a directory (similar to Linux include/config/*).
+
+    Only the headers of elements whose value changed are rewritten, so their timestamps can be used
+    as fine grained dependencies instead of the complete autoconf.h (see fixdep.py).
+    The file ``symbols.txt`` lists all element names and only changes if elements are added or removed.
+    """
+
+    symbols_file_name = "symbols.txt"
 
-            elif element.type is ConfigElementType.STRING:
-                add_define(
-                    f'#define {self.config_prefix}{element.name} "{kconfiglib.escape(val)}"',
-                    element.name,
-                )
+    def __init__(self, output_dir: Path, hash_store: Optional[ContentHashStore] = None):
+        super().__init__(hash_store)
+        self.output_dir = output_dir
 
-            else:  # element.type in [INT, HEX]:
-                if element.type is ConfigElementType.HEX:
-                    val = hex(val)
-                add_define(f"#define {self.config_prefix}{element.name} {val}", element.name)
-        result.extend(["", "#endif /* __autoconf_h__ */", ""])
-        return "\n".join(result)
+    def get_header_file(self, name: str) -> Path:
+        return self.output_dir / f"{name}.h"
+
+    def generate_content(self, element: ConfigElement) -> str:
+        define_decl = HeaderWriter.generate_define(element)
+        return "\n".join([f"/** {element.name} */", define_decl or f"/* {HeaderWriter.config_prefix}{element.name} is not set */", ""])
+
+    def start(self) -> None:
+        self._names: Set[str] = set()
+
+    def add_element(self, element: ConfigElement) -> None:
+        self._names.add(element.name)
+        GeneratedFile(self.get_header_file(element.name), self.generate_content(element), skip_writing_if_unchanged=True, hash_store=self.hash_store).to_file()
+
+    def finish(self) -> None:
+        # remove the headers of elements which no longer exist
+        for header_file in self.output_dir.glob("*.h"):
+            if header_file.stem not in self._names:
+                header_file.unlink()
+        GeneratedFile(self.output_dir / self.symbols_file_name, "\n".join(sorted(self._names)) + "\n", skip_writing_if_unchanged=True, hash_store=self.hash_store).to_file()
+
+    def outputs_exist(self) -> bool:
+        return (self.output_dir / self.symbols_file_name).exists()
 
 
 class JsonWriter(FileWriter):
     """Writes the ConfigurationData in json format"""
 
-    def generate_content(self, configuration_data: ConfigurationData) -> str:
-        result = {}
-        for element in configuration_data.elements:
-            if element.type is ConfigElementType.BOOL:
-                result[element.name] = True if element.value == TriState.Y else False
-            else:
-                result[element.name] = element.value
-        return json.dumps({"features": result}, indent=4)
+    def start(self) -> None:
+        self._features: Dict[str, Any] = {}
+
+    def add_element(self, element: ConfigElement) -> None:
+        if element.type is ConfigElementType.BOOL:
+            self._features[element.name] = True if element.value == TriState.Y else False
+        else:
+            self._features[element.name] = element.value
+
+    def get_content(self) -> str:
+        return json.dumps({"features": self._features}, indent=4)
 
 
 class CMakeWriter(FileWriter):
     """Writes the ConfigurationData as CMake variables"""
 
-    def generate_content(self, configuration_data: ConfigurationData) -> str:
-        result: List[str] = []
-        add = result.append
+    def start(self) -> None:
+        self._lines: List[str] = []
+
+    def add_element(self, element: ConfigElement) -> None:
+        val = element.value
+        if element.type is ConfigElementType.BOOL:
+            val = True if element.value == TriState.Y else False
+        if not element._write_to_conf:
+            return
+        self._lines.append(f'set({element.name} "{val}")')
+
+    def get_content(self) -> str:
+        return "\n".join(self._lines)
+
+
+class ConfigurationRenderer:
+    """Walks the ConfigurationData elements once and feeds them to all registered writers."""
+
+    def __init__(self, writers: Sequence[ConfigurationWriter], hash_store: Optional[ContentHashStore] = None):
+        self.writers = writers
+        self.hash_store = hash_store
+
+    def render(self, configuration_data: ConfigurationData) -> None:
+        for writer in self.writers:
+            writer.start()
         for element in configuration_data.elements:
-            val = element.value
-            if element.type is ConfigElementType.BOOL:
-                val = True if element.value == TriState.Y else False
-            if not element._write_to_conf:
-                continue
-            add(f'set({element.name} "{val}")')
+            for writer in self.writers:
+                writer.add_element(element)
+        for writer in self.writers:
+            writer.finish()
+        if self.hash_store:
+            self.hash_store.save()
 
-        return "\n".join(result)
+
+class VariableResolver:
+    """
+    Replaces the ${NAME} and ${ENV:NAME} references in the values of STRING elements.
+
+    The STRING elements are resolved in the order of their references to each other (topological order),
+    so the result does not depend on the order of declaration. Every symbol is resolved exactly once,
+    the value is assigned to all elements of the symbol (a symbol can be defined in several places).
+    """
+
+    reference_pattern = re.compile(r"\$\{(ENV:)?([A-Za-z0-9_]+)\}")
+
+    def __init__(self, elements: List[ConfigElement]) -> None:
+        #: All elements of a symbol, the last one is used to resolve the value
+        self.elements: Dict[str, List[ConfigElement]] = {}
+        for element in elements:
+            self.elements.setdefault(element.name, []).append(element)
+        #: Names of the environment variables referenced with ${ENV:NAME}
+        self.referenced_env_vars: Set[str] = set()
+
+    def _get_dependencies(self, element: ConfigElement) -> List[ConfigElement]:
+        dependencies = []
+        for match in self.reference_pattern.finditer(element.value):
+            if match.group(1):
+                continue
+            if match.group(2) not in self.elements:
+                raise UserNotificationException(f"KConfig '{element.name}' references unknown variable '{match.group(2)}'.")
+            dependency = self.elements[match.group(2)][-1]
+            if dependency.type is ConfigElementType.STRING:
+                dependencies.append(dependency)
+        return dependencies
+
+    def _sorted_string_elements(self) -> List[ConfigElement]:
+        """Depth-first post-order of all STRING elements, i.e. every element comes after the elements it references."""
+        result: List[ConfigElement] = []
+        visited: Set[str] = set()
+        for symbol_elements in self.elements.values():
+            root = symbol_elements[-1]
+            if root.type is not ConfigElementType.STRING or root.name in visited:
+                continue
+            visited.add(root.name)
+            # Iterative to support arbitrary long reference chains
+            stack = [(root, iter(self._get_dependencies(root)))]
+            # Insertion ordered, the last entry is the element on top of the stack
+            in_progress = {root.name: None}
+            while stack:
+                element, dependencies = stack[-1]
+                dependency = next(dependencies, None)
+                if dependency is None:
+                    stack.pop()
+                    in_progress.popitem()
+                    result.append(element)
+                elif dependency.name in in_progress:
+                    names = list(in_progress)
+                    cycle = [*names[names.index(dependency.name) :], dependency.name]
+                    raise UserNotificationException(f"KConfig variables have a cyclic reference: {' -> '.join(cycle)}.")
+                elif dependency.name not in visited:
+                    visited.add(dependency.name)
+                    stack.append((dependency, iter(self._get_dependencies(dependency))))
+                    in_progress[dependency.name] = None
+        return result
+
+    def _replace(self, match: re.Match[str]) -> str:
+        if match.group(1):
+            self.referenced_env_vars.add(match.group(2))
+            return str(os.environ.get(match.group(2), ""))
+        return str(self.elements[match.group(2)][-1].value)
+
+    def resolve(self) -> None:
+        for element in self._sorted_string_elements():
+            element.value = self.reference_pattern.sub(self._replace, element.value)
+            for duplicate in self.elements[element.name]:
+                duplicate.value = element.value
 
 
 @contextmanager
@@ -187,21 +528,85 @@ class KConfig:
         k_config_model_file: Path,
         k_config_file: Optional[Path] = None,
         k_config_root_directory: Optional[Path] = None,
+        cache_file: Optional[Path] = None,
     ):
         """
         :param k_config_model_file: Feature model definition (KConfig format)
         :param k_config_file: User feature selection configuration file
         :param k_config_root_directory: all paths for the included configuration paths shall be relative to this folder
+        :param cache_file: if given, the configuration data is taken from this file as long as none of the inputs changed
         """
         if not k_config_model_file.exists():
             raise FileNotFoundError(f"File {k_config_model_file} does not exist.")
-        with working_directory(k_config_root_directory or k_config_model_file.parent):
-            self._config = kconfiglib.Kconfig(k_config_model_file.absolute().as_posix())
+        self.k_config_model_file = k_config_model_file
+        self.k_config_root_directory = k_config_root_directory
+        #: Names of the environment variables referenced with ${ENV:NAME}
+        self.referenced_env_vars: Set[str] = set()
+        #: All model files sourced by kconfiglib
+        self.model_files: List[Path] = []
+        #: Parsed kconfiglib.Kconfig model, None until the model is needed
+        self._config: Any = None
+        self._model_fingerprint: Any = None
+        self.load(k_config_file, cache_file)
+
+    def load(self, k_config_file: Optional[Path] = None, cache_file: Optional[Path] = None) -> ConfigurationData:
+        """
+        Calculates the configuration data for the given user feature selection.
+
+        The model is only parsed if it was not parsed yet or if one of its files changed,
+        so an instance can be kept to calculate the configuration data of several configuration files.
+        """
+        if k_config_file and not k_config_file.exists():
+            raise FileNotFoundError(f"File {k_config_file} does not exist.")
+        cache = KConfigCache(cache_file) if cache_file else None
+        cached_config = cache.load(self.k_config_model_file, k_config_file) if cache else None
+        self.from_cache = cached_config is not None
+        if cached_config:
+            self.config = cached_config
+            return self.config
+        if self._config is None or self.model_changed():
+            self._parse_model()
+        self.load_config_file(k_config_file)
+        if cache:
+            cache.store(
+                self.config,
+                self.k_config_model_file,
+                k_config_file,
+                self.model_files + ([k_config_file.absolute()] if k_config_file else []),
+                self._config.env_vars | self.referenced_env_vars,
+            )
+        return self.config
+
+    def _parse_model(self) -> None:
+        with working_directory(self.k_config_root_directory or self.k_config_model_file.parent):
+            self._config = kconfiglib.Kconfig(self.k_config_model_file.absolute().as_posix())
+            self.model_files = [Path(file).absolute() for file in self._config.kconfig_filenames]
+        self._model_fingerprint = self._create_model_fingerprint()
+
+    def _create_model_fingerprint(self) -> Any:
+        return (
+            {file.as_posix(): KConfigCache.file_hash(file) for file in self.model_files},
+            {name: os.environ.get(name) for name in sorted(self._config.env_vars)},
+        )
+
+    def model_changed(self) -> bool:
+        """Checks whether one of the parsed model files or one of the environment variables used in the model changed."""
+        return self._model_fingerprint != self._create_model_fingerprint()
+
+    def load_config_file(self, k_config_file: Optional[Path]) -> ConfigurationData:
+        """
+        Replaces the user feature selection of the already parsed model and recalculates the configuration data.
+
+        :param k_config_file: User feature selection configuration file. If not given, the model defaults are used.
+        """
+        self.referenced_env_vars = set()
         if k_config_file:
-            if not k_config_file.exists():
-                raise FileNotFoundError(f"File {k_config_file} does not exist.")
-            self._config.load_config(k_config_file, replace=False)
+            # replace=True removes the user values of all symbols not set in the file
+            self._config.load_config(k_config_file, replace=True)
+        else:
+            self._config.unset_values()
         self.config = self.create_config_data(self._config)
+        return self.config
 
     def create_config_data(self, config: kconfiglib.Kconfig) -> ConfigurationData:
         """- creates the ConfigurationData from the KConfig configuration"""
@@ -234,37 +639,46 @@ class KConfig:
 
         # replace text in KConfig with referenced variables (string type only)
         # KConfig variables get replaced like: ${VARIABLE_NAME}, e.g. ${CONFIG_FOO}
-        for element in elements:
-            if element.type == ConfigElementType.STRING:
-                element.value = re.sub(
-                    r"\$\{([A-Za-z0-9_]+)\}",
-                    lambda m: str(elements_dict[m.group(1)].value),
-                    element.value,
-                )
-                element.value = re.sub(
-                    r"\$\{ENV:([A-Za-z0-9_]+)\}",
-                    lambda m: str(os.environ.get(m.group(1), "")),
-                    element.value,
-                )
+        # environment variables get replaced like: ${ENV:VARIABLE_NAME}
+        resolver = VariableResolver(elements)
+        resolver.resolve()
+        self.referenced_env_vars.update(resolver.referenced_env_vars)
 
         return ConfigurationData(elements)
 
 
-def main() -> None:
+def create_argument_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="KConfig generation")
     parser.add_argument("--kconfig_model_file", required=True, type=existing_path)
     parser.add_argument("--kconfig_config_file", required=False, type=existing_path)
     parser.add_argument("--out_header_file", required=True, type=non_existing_path)
     parser.add_argument("--out_json_file", required=False, type=non_existing_path)
     parser.add_argument("--out_cmake_file", required=False, type=non_existing_path)
-    arguments = parser.parse_args()
-    config = KConfig(arguments.kconfig_model_file, arguments.kconfig_config_file).config
+    parser.add_argument("--out_split_header_dir", required=False, type=non_existing_path, help="Directory for one header per configuration element")
+    parser.add_argument("--cache_file", required=False, type=non_existing_path)
+    return parser
+
 
-    HeaderWriter(arguments.out_header_file).write(config)
+def write_outputs(kconfig: KConfig, arguments: argparse.Namespace) -> None:
+    """Writes all outputs requested by the command line arguments for the current configuration data."""
+    hash_store = ContentHashStore(arguments.out_header_file.with_name("generated_file_hashes.json"))
+    writers: List[ConfigurationWriter] = [HeaderWriter(arguments.out_header_file, hash_store)]
     if arguments.out_json_file:
-        JsonWriter(arguments.out_json_file).write(config)
+        writers.append(JsonWriter(arguments.out_json_file, hash_store))
     if arguments.out_cmake_file:
-        CMakeWriter(arguments.out_cmake_file).write(config)
+        writers.append(CMakeWriter(arguments.out_cmake_file, hash_store))
+    if arguments.out_split_header_dir:
+        writers.append(SplitHeaderWriter(arguments.out_split_header_dir, hash_store))
+    if kconfig.from_cache:
+        # Outputs generated from the cached configuration data are up to date, only missing ones are recreated
+        writers = [writer for writer in writers if not writer.outputs_exist()]
+    ConfigurationRenderer(writers, hash_store).render(kconfig.config)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    arguments = create_argument_parser().parse_args(args)
+    kconfig = KConfig(arguments.kconfig_model_file, arguments.kconfig_config_file, cache_file=arguments.cache_file)
+    write_outputs(kconfig, arguments)
 
 
 if __name__ == "__main__":
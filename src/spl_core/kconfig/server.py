@@ -0,0 +1,138 @@
+"""
+Long-lived KConfig server which keeps the parsed feature models in memory.
+
+Start it once, e.g. ``python -m spl_core.kconfig.server --idle_timeout 3600``.
+The CMake configure step calls ``client.py`` which forwards its arguments to the server
+and falls back to the one-shot ``kconfig.py`` if the server is not running.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import threading
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from py_app_dev.core.exceptions import UserNotificationException
+
+from spl_core.kconfig.client import create_authkey, get_authkey_file, get_server_address, request
+from spl_core.kconfig.kconfig import KConfig, create_argument_parser, write_outputs
+
+
+class KConfigServer:
+    def __init__(self, address: Optional[str] = None, idle_timeout: Optional[float] = None) -> None:
+        """
+        :param address: Unix socket path or Windows named pipe. Defaults to a per user address.
+        :param idle_timeout: stop the server after this many seconds without a request
+        """
+        self.address = address or get_server_address()
+        self.idle_timeout = idle_timeout
+        #: Parsed models by model file
+        self.models: Dict[Path, KConfig] = {}
+        self.last_request_time = time.monotonic()
+        self._running = False
+
+    def generate(self, args: List[str]) -> None:
+        """Same as kconfig.py main(), but reuses the already parsed models."""
+        arguments = create_argument_parser().parse_args(args)
+        kconfig = self.models.get(arguments.kconfig_model_file)
+        if kconfig is None:
+            kconfig = KConfig(arguments.kconfig_model_file, arguments.kconfig_config_file, cache_file=arguments.cache_file)
+            self.models[arguments.kconfig_model_file] = kconfig
+        else:
+            kconfig.load(arguments.kconfig_config_file, cache_file=arguments.cache_file)
+        write_outputs(kconfig, arguments)
+
+    def handle_request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        command = message.get("command")
+        if command == "ping":
+            return {"returncode": 0, "output": ""}
+        if command == "stop":
+            self._running = False
+            return {"returncode": 0, "output": "KConfig server stopped."}
+        if command != "generate":
+            return {"returncode": 1, "output": f"Unknown command '{command}'."}
+        cwd = os.getcwd()
+        environment = dict(os.environ)
+        output = io.StringIO()
+        returncode = 0
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                # Run the request in the context of the client
+                os.chdir(message["cwd"])
+                os.environ.clear()
+                os.environ.update(message["env"])
+                self.generate(message["args"])
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else 1
+            except UserNotificationException as e:
+                print(f"{e}")
+                returncode = 1
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+            finally:
+                os.chdir(cwd)
+                os.environ.clear()
+                os.environ.update(environment)
+        return {"returncode": returncode, "output": output.getvalue()}
+
+    def _serve(self, connection: Connection) -> None:
+        with connection:
+            connection.send(self.handle_request(connection.recv()))
+
+    def _stop_when_idle(self) -> None:
+        assert self.idle_timeout is not None  # noqa: S101
+        while self._running:
+            time.sleep(min(self.idle_timeout, 1.0))
+            if time.monotonic() - self.last_request_time > self.idle_timeout:
+                # Wake up the blocking accept
+                request({"command": "stop"}, self.address)
+                return
+
+    def serve_forever(self) -> None:
+        if os.name != "nt" and Path(self.address).exists():
+            Path(self.address).unlink()
+        authkey = create_authkey(self.address)
+        try:
+            with Listener(self.address, authkey=authkey) as listener:
+                if os.name != "nt":
+                    os.chmod(self.address, 0o600)
+                self._running = True
+                if self.idle_timeout:
+                    threading.Thread(target=self._stop_when_idle, daemon=True).start()
+                print(f"KConfig server listening on {self.address}", flush=True)
+                while self._running:
+                    try:
+                        connection = listener.accept()
+                    except (OSError, AuthenticationError):
+                        continue
+                    self.last_request_time = time.monotonic()
+                    try:
+                        self._serve(connection)
+                    except (EOFError, OSError):
+                        continue
+        finally:
+            Path(get_authkey_file(self.address)).unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="KConfig server keeping the parsed feature models in memory")
+    parser.add_argument("--address", help="Unix socket path or Windows named pipe")
+    parser.add_argument("--idle_timeout", type=float, help="Stop after this many seconds without a request")
+    parser.add_argument("--stop", action="store_true", help="Stop the running server")
+    arguments = parser.parse_args()
+    if arguments.stop:
+        response = request({"command": "stop"}, arguments.address)
+        print(response["output"] if response else "No KConfig server running.")
+        return
+    KConfigServer(arguments.address, arguments.idle_timeout).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
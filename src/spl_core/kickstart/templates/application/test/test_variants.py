@@ -0,0 +1,5 @@
+from spl_core.test_utils.variant_discovery import VariantTestRunner
+
+
+class Test_Variants(VariantTestRunner):
+    """Runs the build and test targets for every variant, configured in variants/<variant>/variant_test.json."""
@@ -3,7 +3,8 @@
 import datetime
 import json
 import os
-import re
+
+from spl_core.sphinx_builder.needs_functions import tr_link
 
 day = datetime.date.today()
 # meta data #################################################################
@@ -80,36 +81,7 @@ extensions.append("sphinx_needs")
 extensions.append("sphinxcontrib.test_reports")
 tr_report_template = "doc/test_report_template.txt"
 
-
-def tr_link(app, need, needs, first_option_name, second_option_name, *args, **kwargs):
-    """Make links between 'needs'. In comparison to the default 'tr_link' function,
-    this function supports regular expression pattern matching."""
-    if first_option_name not in need:
-        return ""
-    # Get the value of the 'first_option_name'
-    first_option_value = need[first_option_name]
-
-    links = []
-    for need_target in needs.values():
-        # Skip linking to itself
-        if need_target["id"] == need["id"]:
-            continue
-        if second_option_name not in need_target:
-            continue
-
-        if first_option_value is not None and len(first_option_value) > 0:
-            second_option_value = need_target[second_option_name]
-            if second_option_value is not None and len(second_option_value) > 0:
-                if first_option_value == second_option_value:
-                    links.append(need_target["id"])
-                # if the first option value has a *, use regex matching
-                elif "*" in first_option_value:
-                    if re.match(first_option_value, second_option_value):
-                        links.append(need_target["id"])
-
-    return links
-
-
+# Links the test results to the test cases, see needs_global_options
 needs_functions = [tr_link]
 
 extensions.append("sphinx.ext.todo")
@@ -1,40 +1,129 @@
-import sys
-from pathlib import Path
+"""
+Entry point of the ``please`` command line interface.
+
+Build wrappers call ``please`` many times, therefore this module only imports the standard library.
+``--version`` and the top level help are answered directly, typer and the command dependencies
+are imported only when a command is executed.
+"""
 
-import typer
-from py_app_dev.core.exceptions import UserNotificationException
-from py_app_dev.core.logging import logger, setup_logger, time_it
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from spl_core import __version__
-from spl_core.kickstart.create import KickstartProject
+
+if TYPE_CHECKING:
+    import typer
 
 package_name = "please"
+help_text = "Software Product Line Support for CMake."
+
+#: Command name and help text, used for the fast help and the typer commands
+commands: Dict[str, str] = {
+    "init": "Create a new SPL project in the project directory.",
+    "build": "Build several variants and build kits in parallel.",
+}
+
+_app: Optional["typer.Typer"] = None
+
+
+def create_app() -> "typer.Typer":
+    from pathlib import Path
+
+    import typer
+    from py_app_dev.core.logging import time_it
+
+    app = typer.Typer(name=package_name, help=help_text, no_args_is_help=True, add_completion=False)
 
-app = typer.Typer(name=package_name, help="Software Product Line Support for CMake.", no_args_is_help=True, add_completion=False)
+    @app.callback(invoke_without_command=True)
+    def version(
+        version: bool = typer.Option(None, "--version", "-v", is_eager=True, help="Show version and exit."),
+    ) -> None:
+        if version:
+            typer.echo(f"{package_name} {__version__}")
+            raise typer.Exit()
 
+    @app.command(help=commands["init"])
+    @time_it("init")
+    def init(
+        project_dir: Path = typer.Option(Path.cwd().absolute(), help="The project directory"),  # noqa: B008
+        force: bool = typer.Option(False, help="Force the initialization of the project even if the directory is not empty."),
+    ) -> None:
+        from spl_core.kickstart.create import KickstartProject
 
-@app.callback(invoke_without_command=True)
-def version(
-    version: bool = typer.Option(None, "--version", "-v", is_eager=True, help="Show version and exit."),
-) -> None:
-    if version:
-        typer.echo(f"{package_name} {__version__}")
-        raise typer.Exit()
+        KickstartProject(project_dir, force).run()
 
+    @app.command(help=commands["build"])
+    @time_it("build")
+    def build(
+        project_dir: Path = typer.Option(Path.cwd().absolute(), help="The project directory"),  # noqa: B008
+        variants: Optional[List[str]] = typer.Option(None, "--variant", help="Variant to build, can be given multiple times. Default: all variants."),  # noqa: B008
+        build_kits: Optional[List[str]] = typer.Option(None, "--build-kit", help="Build kit (prod, test), can be given multiple times. Default: prod."),  # noqa: B008
+        target: str = typer.Option("all", help="The build target."),
+        ninja_jobs: Optional[int] = typer.Option(None, help="Total number of Ninja jobs of all parallel builds. Default: number of CPUs."),
+        parallel: Optional[int] = typer.Option(None, help="Number of builds running at the same time."),
+        echo: bool = typer.Option(False, help="Print the build output, not only the progress."),
+    ) -> None:
+        from spl_core.build.orchestrator import BuildOrchestrator, format_summary
 
-@app.command()
-@time_it("init")
-def init(
-    project_dir: Path = typer.Option(Path.cwd().absolute(), help="The project directory"),  # noqa: B008
-    force: bool = typer.Option(False, help="Force the initialization of the project even if the directory is not empty."),
-) -> None:
-    KickstartProject(project_dir, force).run()
+        results = BuildOrchestrator(project_dir, variants, build_kits, target, ninja_jobs, parallel, echo).run()
+        typer.echo(format_summary(results))
+        if not all(result.success for result in results):
+            raise typer.Exit(1)
+
+    return app
+
+
+def get_app() -> "typer.Typer":
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(name: str) -> Any:
+    # The typer application is created on first access, e.g. 'from spl_core.main import app'
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_help() -> str:
+    width = max(len(name) for name in ["--version, -v", *commands])
+    lines = [
+        f"Usage: {package_name} [OPTIONS] COMMAND [ARGS]...",
+        "",
+        f"  {help_text}",
+        "",
+        "Options:",
+        f"  {'--version, -v':<{width}}  Show version and exit.",
+        f"  {'--help':<{width}}  Show this message and exit.",
+        "",
+        "Commands:",
+        *[f"  {name:<{width}}  {command_help}" for name, command_help in commands.items()],
+    ]
+    return "\n".join(lines)
+
+
+def run_fast_path(args: List[str]) -> bool:
+    """Answers the requests which do not need typer. Returns True if the request was handled."""
+    if args in (["--version"], ["-v"]):
+        print(f"{package_name} {__version__}")
+        return True
+    if args in ([], ["--help"]):
+        print(get_help())
+        return True
+    return False
 
 
 def main() -> None:
+    if run_fast_path(sys.argv[1:]):
+        return
+    from py_app_dev.core.exceptions import UserNotificationException
+    from py_app_dev.core.logging import logger, setup_logger
+
     try:
         setup_logger()
-        app()
+        get_app()()
     except UserNotificationException as e:
         logger.error(f"{e}")
         sys.exit(1)
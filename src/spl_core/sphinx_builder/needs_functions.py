@@ -0,0 +1,90 @@
+"""
+Sphinx-Needs dynamic functions for the project conf.py.
+
+.. code-block:: python
+
+    from spl_core.sphinx_builder.needs_functions import tr_link
+
+    needs_functions = [tr_link]
+    needs_global_options = {"results": "[[tr_link('title', 'case')]]"}
+"""
+
+import functools
+import re
+from typing import Any, Dict, List, Mapping, Optional, Pattern
+
+#: Option values containing this character are regular expressions
+WILDCARD = "*"
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_pattern(pattern: str) -> Pattern[str]:
+    return re.compile(pattern)
+
+
+def has_value(value: Any) -> bool:
+    return value is not None and len(value) > 0
+
+
+class NeedsIndex:
+    def __init__(self, needs: Mapping[str, Any], option_name: str) -> None:
+        """
+        Maps the values of an option to the ids of the needs having this value.
+
+        Args:
+            needs: All needs of the build, by id.
+            option_name: The indexed option.
+        """
+        self.needs = needs
+        self.size = len(needs)
+        self.ids_by_value: Dict[str, List[str]] = {}
+        self.positions: Dict[str, int] = {}
+        for position, need in enumerate(needs.values()):
+            value = need.get(option_name)
+            # Only strings can be matched, other values (e.g. links) never match
+            if isinstance(value, str) and has_value(value):
+                self.ids_by_value.setdefault(value, []).append(need["id"])
+                self.positions[need["id"]] = position
+        self._pattern_matches: Dict[str, List[str]] = {}
+
+    def is_valid_for(self, needs: Mapping[str, Any]) -> bool:
+        """The index is built for every Sphinx build. Needs added after the index was built invalidate it."""
+        return self.needs is needs and self.size == len(needs)
+
+    def find(self, value: str) -> List[str]:
+        """Ids of the needs with the value. Values containing a wildcard also return the needs matching them as regular expression."""
+        if WILDCARD not in value:
+            return self.ids_by_value.get(value, [])
+        if value not in self._pattern_matches:
+            pattern = compile_pattern(value)
+            ids = [need_id for indexed_value, ids in self.ids_by_value.items() if indexed_value == value or pattern.match(indexed_value) for need_id in ids]
+            # Keep the order of the needs
+            self._pattern_matches[value] = sorted(ids, key=self.positions.__getitem__)
+        return self._pattern_matches[value]
+
+
+_indexes: Dict[str, NeedsIndex] = {}
+
+
+def get_needs_index(needs: Mapping[str, Any], option_name: str) -> NeedsIndex:
+    index: Optional[NeedsIndex] = _indexes.get(option_name)
+    if index is None or not index.is_valid_for(needs):
+        index = _indexes[option_name] = NeedsIndex(needs, option_name)
+    return index
+
+
+def tr_link(app: Any, need: Mapping[str, Any], needs: Mapping[str, Any], first_option_name: str, second_option_name: str, *args: Any, **kwargs: Any) -> Any:
+    """
+    Make links between 'needs'. In comparison to the default 'tr_link' function,
+    this function supports regular expression pattern matching.
+
+    Links the need to all other needs where the value of the second option equals the value of the first option.
+    If the value of the first option contains a ``*``, it is matched as regular expression against the start of the second option.
+    The needs are looked up in an index of the second option, built once per Sphinx build.
+    """
+    if first_option_name not in need:
+        return ""
+    first_option_value = need[first_option_name]
+    if not isinstance(first_option_value, str) or not has_value(first_option_value):
+        return []
+    return [need_id for need_id in get_needs_index(needs, second_option_name).find(first_option_value) if need_id != need["id"]]
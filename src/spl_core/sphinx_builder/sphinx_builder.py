@@ -0,0 +1,234 @@
+"""
+Incremental Sphinx builds for the docs and reports targets.
+
+``sphinx-build -E`` reads and writes all documents on every build, because Sphinx does not know all inputs:
+
+* The project conf.py renders every document as Jinja template with the content of the
+  ``SPHINX_BUILD_CONFIGURATION_FILE`` and ``AUTOCONF_JSON_FILE`` files and the ``VARIANT``.
+  If one of them changes, the documents using Jinja markup are read again.
+* Directives read data files, e.g. the junit results of ``test-report`` (``:file:``) or ``datatemplate``.
+  They are registered as dependencies of the document, so Sphinx reads the document again if they changed.
+* The needs queries (``needtable``, ``needflow`` and ``needextract``) show needs defined in other documents, and the
+  dynamic functions (``[[...]]``, e.g. the test results linked by ``tr_link`` in the ``needs_global_options``) read them.
+  If a document defining needs is read again, the documents with queries or dynamic functions are read again, too.
+
+All other inputs (the rst sources, conf.py and the config values) are tracked by Sphinx itself.
+
+With ``--targets`` several outputs of the same source directory are built in one process, e.g. the reports of all components.
+Every target has its own ``SPHINX_BUILD_CONFIGURATION_FILE`` and keeps its own incremental environment,
+but Python, Sphinx and the extensions are only started and imported once.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+#: Environment variables used by the project conf.py to render the documents
+CONTEXT_VARIABLES = ("SPHINX_BUILD_CONFIGURATION_FILE", "AUTOCONF_JSON_FILE", "VARIANT")
+#: Stores the context of the last successful build, next to the doctrees
+STATE_FILE = "spl_sphinx_state.json"
+#: Directive options and arguments referencing data files
+DATA_FILE_PATTERNS = [
+    re.compile(r"^\s*:file:\s*(\S+)\s*$", re.MULTILINE),
+    re.compile(r"^\s*\.\.\s+datatemplate:\w+::\s*(\S+)\s*$", re.MULTILINE),
+]
+JINJA_MARKUP = re.compile(r"{{|{%")
+NEEDS_QUERY_DIRECTIVES = re.compile(r"^\s*\.\.\s+(needtable|needflow|needextract)::", re.MULTILINE)
+NEEDS_DYNAMIC_FUNCTION = re.compile(r"\[\[")
+
+
+def get_context_hash(environ: Mapping[str, str]) -> str:
+    """Hash of the context variables and the content of the files they point to."""
+    sha256 = hashlib.sha256()
+    for variable in CONTEXT_VARIABLES:
+        value = environ.get(variable)
+        sha256.update(f"{variable}={value}\n".encode())
+        if value and variable.endswith("_FILE") and os.path.isfile(value):
+            sha256.update(Path(value).read_bytes())
+    return sha256.hexdigest()
+
+
+def find_data_files(source: str, document_dir: Path, source_dir: Path) -> List[Path]:
+    """
+    Existing data files referenced by the document.
+
+    Relative paths are relative to the document, paths starting with a slash might also be relative to the source directory.
+    """
+    data_files: List[Path] = []
+    for pattern in DATA_FILE_PATTERNS:
+        for match in pattern.finditer(source):
+            path = Path(match.group(1))
+            candidates = [path, source_dir / str(path).lstrip("/\\")] if path.is_absolute() or str(path).startswith("/") else [document_dir / path]
+            data_file = next((candidate for candidate in candidates if candidate.is_file()), None)
+            if data_file and data_file not in data_files:
+                data_files.append(data_file)
+    return data_files
+
+
+def contains(source_file: Path, pattern: re.Pattern[str]) -> bool:
+    try:
+        return pattern.search(source_file.read_text(encoding="utf-8", errors="replace")) is not None
+    except OSError:
+        return False
+
+
+def uses_jinja(source_file: Path) -> bool:
+    return contains(source_file, JINJA_MARKUP)
+
+
+def uses_needs_queries(source_file: Path) -> bool:
+    return contains(source_file, NEEDS_QUERY_DIRECTIVES)
+
+
+def uses_needs_dynamic_functions(source_file: Path) -> bool:
+    return contains(source_file, NEEDS_DYNAMIC_FUNCTION)
+
+
+class IncrementalSphinxBuild:
+    def __init__(
+        self,
+        source_dir: Path,
+        output_dir: Path,
+        jobs: int = 1,
+        fresh: bool = False,
+        builder: str = "html",
+    ) -> None:
+        """
+        Sphinx build which only reads and writes the documents affected by a change.
+
+        Args:
+            source_dir: The Sphinx source directory with the conf.py.
+            output_dir: The output directory. The doctrees are stored in ``<output_dir>/.doctrees``, same as sphinx-build does.
+            jobs: Number of parallel processes reading and writing the documents.
+            fresh: Read all documents, like ``sphinx-build -E``.
+            builder: The Sphinx builder.
+        """
+        self.source_dir = source_dir.absolute()
+        self.output_dir = output_dir.absolute()
+        self.doctree_dir = self.output_dir / ".doctrees"
+        self.jobs = jobs
+        self.fresh = fresh
+        self.builder = builder
+
+    @property
+    def state_file(self) -> Path:
+        return self.doctree_dir / STATE_FILE
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            return dict(json.loads(self.state_file.read_text()))
+        except (OSError, ValueError):
+            return {}
+
+    def _store_state(self, context_hash: str) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(json.dumps({"context_hash": context_hash}, indent=2))
+
+    def _note_data_files(self, app: Any, docname: str, source: List[str]) -> None:
+        document_dir = Path(app.env.doc2path(docname)).parent
+        for data_file in find_data_files(source[0], document_dir, self.source_dir):
+            app.env.note_dependency(str(data_file))
+
+    @staticmethod
+    def _get_jinja_documents(env: Any, added: Set[str], changed: Set[str]) -> Set[str]:
+        return {docname for docname in env.found_docs - added - changed if uses_jinja(Path(env.doc2path(docname)))}
+
+    @staticmethod
+    def _get_needs_query_documents(env: Any, added: Set[str], changed: Set[str], removed: Set[str]) -> Set[str]:
+        """The documents with needs queries or needs with dynamic functions, if the needs might have changed."""
+        # sphinx-needs keeps the needs of the previous build in the environment, an added document might define new needs
+        needs_documents = {need.get("docname") for need in getattr(env, "needs_all_needs", {}).values()}
+        if not added and not needs_documents & (changed | removed):
+            return set()
+        unchanged = env.found_docs - added - changed
+        # The dynamic functions of the global options are evaluated for the needs of every document
+        global_options = getattr(env.config, "needs_global_options", None) or {}
+        outdated = unchanged & needs_documents if any(NEEDS_DYNAMIC_FUNCTION.search(str(value)) for value in global_options.values()) else set()
+        return outdated | {docname for docname in unchanged - outdated if uses_needs_queries(Path(env.doc2path(docname))) or uses_needs_dynamic_functions(Path(env.doc2path(docname)))}
+
+    def _get_outdated_documents(self, context_changed: bool, app: Any, env: Any, added: Set[str], changed: Set[str], removed: Set[str]) -> List[str]:
+        """Handler of the env-get-outdated event, returns the documents Sphinx does not know to be outdated."""
+        outdated = self._get_jinja_documents(env, added, changed) if context_changed else set()
+        # The documents read again because of the context might define needs, too
+        outdated |= self._get_needs_query_documents(env, added, changed | outdated, removed)
+        return sorted(outdated)
+
+    def run(self) -> int:
+        """Runs the build and returns the Sphinx status code."""
+        from sphinx.application import Sphinx
+        from sphinx.util.docutils import docutils_namespace, patch_docutils
+
+        context_hash = get_context_hash(os.environ)
+        context_changed = self._load_state().get("context_hash") != context_hash
+        with patch_docutils(str(self.source_dir)), docutils_namespace():
+            app = Sphinx(self.source_dir, self.source_dir, self.output_dir, self.doctree_dir, self.builder, freshenv=self.fresh, parallel=self.jobs)
+            app.connect("source-read", self._note_data_files)
+            if not self.fresh:
+                app.connect("env-get-outdated", functools.partial(self._get_outdated_documents, context_changed))
+            app.build()
+        if app.statuscode == 0:
+            self._store_state(context_hash)
+        return int(app.statuscode)
+
+
+def build_targets(source_dir: Path, targets: List[Tuple[Path, Path]], jobs: int = 1, fresh: bool = False, builder: str = "html") -> int:
+    """
+    Builds several targets of the same source directory one after the other in this process.
+
+    Args:
+        source_dir: The Sphinx source directory with the conf.py.
+        targets: The configuration file (exported as ``SPHINX_BUILD_CONFIGURATION_FILE``) and the output directory of every target.
+        jobs: Number of parallel processes reading and writing the documents.
+        fresh: Read all documents, like ``sphinx-build -E``.
+        builder: The Sphinx builder.
+
+    Returns:
+        The highest Sphinx status code of all targets.
+    """
+    status_code = 0
+    previous_config_file = os.environ.get("SPHINX_BUILD_CONFIGURATION_FILE")
+    try:
+        for config_file, output_dir in targets:
+            os.environ["SPHINX_BUILD_CONFIGURATION_FILE"] = str(config_file)
+            status_code = max(status_code, IncrementalSphinxBuild(source_dir, output_dir, jobs, fresh, builder).run())
+    finally:
+        if previous_config_file is None:
+            os.environ.pop("SPHINX_BUILD_CONFIGURATION_FILE", None)
+        else:
+            os.environ["SPHINX_BUILD_CONFIGURATION_FILE"] = previous_config_file
+    return status_code
+
+
+def load_targets(targets_file: Path) -> List[Tuple[Path, Path]]:
+    """Reads the targets from a JSON list of objects with ``config_file`` and ``output_dir``."""
+    return [(Path(target["config_file"]), Path(target["output_dir"])) for target in json.loads(targets_file.read_text())]
+
+
+def parse_jobs(value: str) -> int:
+    return (os.cpu_count() or 1) if value == "auto" else int(value)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Incremental Sphinx build. Only the documents affected by a change are read and written again.")
+    parser.add_argument("source_dir", help="Sphinx source directory with the conf.py")
+    parser.add_argument("output_dir", nargs="?", help="Output directory, not used with --targets")
+    parser.add_argument("-b", "--builder", default="html", help="Sphinx builder (default: html)")
+    parser.add_argument("-j", "--jobs", default="1", type=parse_jobs, help="Number of parallel processes or 'auto' for the number of CPUs (default: 1)")
+    parser.add_argument("-E", "--fresh", action="store_true", help="Read all documents, like sphinx-build -E")
+    parser.add_argument("--targets", help="JSON file with a list of targets ({'config_file': ..., 'output_dir': ...}) built in one process")
+    arguments = parser.parse_args(args)
+    if arguments.targets:
+        return build_targets(Path(arguments.source_dir), load_targets(Path(arguments.targets)), arguments.jobs, arguments.fresh, arguments.builder)
+    if arguments.output_dir is None:
+        parser.error("the output_dir is required without --targets")
+    return IncrementalSphinxBuild(Path(arguments.source_dir), Path(arguments.output_dir), arguments.jobs, arguments.fresh, arguments.builder).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+import hashlib
+import itertools
+import json
+import os
+import re
+import struct
+import tarfile
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from py_app_dev.core.exceptions import UserNotificationException
+
+#: Files larger than this are compressed in the writing thread to keep the memory bounded
+MAX_PARALLEL_ENTRY_SIZE = 64 * 1024 * 1024
+#: Maximum size of the files read and compressed ahead of the writing thread
+MAX_IN_FLIGHT_SIZE = 256 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+#: Reading and hashing is I/O bound, same default as the ThreadPoolExecutor
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class ArchiveArtifact:
+    archive_path: Path
+    absolute_path: Path
+
+
+class ArtifactsCollection:
+    """
+    Collects the artifact files lazily, iterate over it to get the ArchiveArtifact objects.
+
+    An artifact is a file, a directory (all files below it) or a glob pattern, e.g. ``reports/**/*.html``.
+    Patterns starting with ``!`` exclude files, e.g. ``!**/*.tmp``; they are matched against the archive path.
+    Relative artifacts are relative to the build directory. Artifacts outside the build directory are archived
+    with their file name only. Files matched by several artifacts are collected once.
+    """
+
+    def __init__(self, artifacts: Sequence[Path | str], build_dir: Path, exclude: Optional[List[str]] = None):
+        self.artifacts = artifacts
+        self.build_dir = build_dir
+        self.exclude = exclude or []
+
+    def __iter__(self) -> Iterator[ArchiveArtifact]:
+        build_dir = os.path.normpath(self.build_dir.absolute())
+        excludes = [glob_to_regex(str(pattern)[1:]) for pattern in self.artifacts if str(pattern).startswith("!")]
+        excludes += [glob_to_regex(pattern.lstrip("!")) for pattern in self.exclude]
+        seen: Set[str] = set()
+        for artifact in self.artifacts:
+            if str(artifact).startswith("!"):
+                continue
+            for absolute_path, archive_path in self._expand(artifact, build_dir):
+                if absolute_path in seen or any(exclude.match(archive_path) for exclude in excludes):
+                    continue
+                seen.add(absolute_path)
+                yield ArchiveArtifact(archive_path=Path(archive_path), absolute_path=Path(absolute_path))
+
+    @staticmethod
+    def _expand(artifact: Path | str, build_dir: str) -> Iterator[Tuple[str, str]]:
+        """Yields the absolute path and the archive path (posix) of the files of one artifact."""
+        parts = Path(artifact).parts
+        static_parts = list(itertools.takewhile(lambda part: not _has_magic(part), parts))
+        base = os.path.normpath(os.path.join(build_dir, *static_parts))
+        inside_build_dir = base == build_dir or base.startswith(build_dir.rstrip(os.sep) + os.sep)
+        prefix = Path(os.path.relpath(base, build_dir)).as_posix() + "/" if inside_build_dir and base != build_dir else ""
+        pattern = "/".join(parts[len(static_parts) :])
+        if not pattern:
+            if os.path.isdir(base):
+                for absolute_path, relative_path in _walk(base, recursive=True):
+                    yield absolute_path, prefix + relative_path if inside_build_dir else os.path.basename(absolute_path)
+            elif inside_build_dir:
+                yield base, prefix.rstrip("/")
+            else:
+                yield base, os.path.basename(base)
+            return
+        regex = glob_to_regex(pattern)
+        for absolute_path, relative_path in _walk(base, recursive="/" in pattern or "**" in pattern):
+            if regex.match(relative_path):
+                yield absolute_path, prefix + relative_path if inside_build_dir else os.path.basename(absolute_path)
+
+    @property
+    def archive_artifacts(self) -> List[ArchiveArtifact]:
+        return list(self)
+
+
+def _has_magic(part: str) -> bool:
+    return any(char in part for char in "*?[")
+
+
+def glob_to_regex(pattern: str) -> re.Pattern[str]:
+    """
+    Translates a glob pattern with posix separators to a regular expression.
+
+    ``**`` matches any number of directories, ``*`` and ``?`` do not match the separator.
+    """
+    regex = ""
+    parts = pattern.split("/")
+    for index, part in enumerate(parts):
+        last = index == len(parts) - 1
+        if part == "**":
+            regex += ".*" if last else "(?:[^/]+/)*"
+            continue
+        position = 0
+        while position < len(part):
+            char = part[position]
+            closing = part.find("]", position + 2)
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[" and closing != -1:
+                characters = part[position + 1 : closing]
+                regex += "[" + ("^" + characters[1:] if characters.startswith("!") else characters).replace("\\", "\\\\") + "]"
+                position = closing
+            else:
+                regex += re.escape(char)
+            position += 1
+        if not last:
+            regex += "/"
+    return re.compile(regex + r"\Z")
+
+
+def _walk(directory: str, recursive: bool) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the absolute and the relative path (posix) of the files below the directory, sorted by name.
+
+    os.scandir provides the file type with the directory entry, so no additional stat call per file is needed.
+    """
+    pending: Deque[Tuple[str, str]] = deque([(directory, "")])
+    while pending:
+        current, relative = pending.popleft()
+        try:
+            with os.scandir(current) as entries:
+                sorted_entries = sorted(entries, key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in sorted_entries:
+            if entry.is_file():
+                yield entry.path, relative + entry.name
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                pending.append((entry.path, relative + entry.name + "/"))
+
+
+class Compression(Enum):
+    #: zip without compression
+    STORED = "stored"
+    #: zip with deflate compression, the entries are compressed in parallel
+    DEFLATE = "deflate"
+    #: zstandard compressed tar (requires the ``zstandard`` package), compressed with multiple threads
+    ZSTD = "zstd"
+
+    @property
+    def suffix(self) -> str:
+        return ".tar.zst" if self is Compression.ZSTD else ".zip"
+
+
+def bounded_map(function: Callable[[T], R], items: Iterable[T], executor: ThreadPoolExecutor, window: int, size: Optional[Callable[[T], int]] = None, max_size: int = 0) -> Iterator[R]:
+    """
+    Like executor.map, but consumes the items lazily and keeps at most ``window`` results in memory. The order is kept.
+
+    If ``size`` is given, the total size of the items in flight is limited to ``max_size`` as well (one item is always in flight).
+    """
+    pending: Deque[Tuple[Future[R], int]] = deque()
+    in_flight_size = 0
+    for item in items:
+        item_size = size(item) if size else 0
+        while pending and (len(pending) >= window or in_flight_size + item_size > max_size > 0):
+            future, future_size = pending.popleft()
+            in_flight_size -= future_size
+            yield future.result()
+        pending.append((executor.submit(function, item), item_size))
+        in_flight_size += item_size
+    while pending:
+        yield pending.popleft()[0].result()
+
+
+def hash_file(file: Path) -> str:
+    sha256 = hashlib.sha256()
+    with file.open("rb") as stream:
+        while chunk := stream.read(CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+@dataclass
+class ArtifactFile:
+    """An artifact with its size, modification time and content hash."""
+
+    artifact: ArchiveArtifact
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    @property
+    def archive_name(self) -> str:
+        return self.artifact.archive_path.as_posix()
+
+
+def collect_artifact_files(artifacts: Iterable[ArchiveArtifact], known_files: Optional[Dict[str, Any]] = None, max_workers: Optional[int] = None) -> List[ArtifactFile]:
+    """
+    Determine size, modification time and SHA-256 of the artifacts in a thread pool, while the artifacts are still collected.
+
+    Args:
+        artifacts: The artifacts, e.g. an ArtifactsCollection or a generator.
+        known_files: Files info of a previous run (see get_files_info). The hash of a file with the same size
+            and modification time is reused.
+        max_workers: Number of threads reading the files.
+    """
+    known_files = known_files or {}
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+
+    def stat_and_hash(artifact: ArchiveArtifact) -> ArtifactFile:
+        stat = artifact.absolute_path.stat()
+        known = known_files.get(artifact.archive_path.as_posix())
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return ArtifactFile(artifact, stat.st_size, stat.st_mtime_ns, known["sha256"])
+        return ArtifactFile(artifact, stat.st_size, stat.st_mtime_ns, hash_file(artifact.absolute_path))
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        return list(bounded_map(stat_and_hash, artifacts, executor, 4 * max_workers))
+
+
+def get_files_info(files: List[ArtifactFile]) -> Dict[str, Dict[str, Any]]:
+    """Size, modification time and SHA-256 by archive path, in the order of the files."""
+    return {file.archive_name: {"size": file.size, "mtime_ns": file.mtime_ns, "sha256": file.sha256} for file in files}
+
+
+def compare_files_info(previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Compare the files of two artifacts manifests, e.g. to upload only the changed artifacts.
+
+    Returns:
+        Dict[str, List[str]]: the archive paths of the "added", "changed", "removed" and "unchanged" files.
+    """
+    return {
+        "added": [name for name in current if name not in previous],
+        "changed": [name for name in current if name in previous and previous[name]["sha256"] != current[name]["sha256"]],
+        "removed": [name for name in previous if name not in current],
+        "unchanged": [name for name in current if name in previous and previous[name]["sha256"] == current[name]["sha256"]],
+    }
+
+
+class ArtifactsArchive:
+    def __init__(self, archive_file: Path, compression: Compression = Compression.STORED, level: Optional[int] = None, max_workers: Optional[int] = None) -> None:
+        """
+        Archive with the build artifacts.
+
+        The hashes of the archived files are stored next to the archive (``<archive>.hashes.json``),
+        so the archive is only created again if the content of the artifacts changed.
+
+        Args:
+            archive_file: The archive file. The suffix shall match the compression (.zip or .tar.zst).
+            compression: The compression of the archive.
+            level: The compression level. Defaults to the default level of the compression.
+            max_workers: Number of threads reading, hashing and compressing the files.
+        """
+        self.archive_file = archive_file
+        self.compression = compression
+        self.level = level
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.hashes_file = archive_file.with_name(f"{archive_file.name}.hashes.json")
+
+    def _load_hashes(self) -> Dict[str, Any]:
+        try:
+            return dict(json.loads(self.hashes_file.read_text()))
+        except (OSError, ValueError):
+            return {}
+
+    def collect(self, artifacts: Iterable[ArchiveArtifact], known_files: Optional[Dict[str, Any]] = None) -> List[ArtifactFile]:
+        return collect_artifact_files(artifacts, known_files, self.max_workers)
+
+    def get_settings(self) -> Dict[str, Any]:
+        return {"compression": self.compression.value, "level": self.level}
+
+    def is_up_to_date(self, files: List[ArtifactFile], previous: Dict[str, Any]) -> bool:
+        """The archive is up to date if it was created with the same settings from files with the same names and content."""
+        previous_files = previous.get("files", {})
+        return (
+            self.archive_file.exists()
+            and previous.get("settings") == self.get_settings()
+            and list(previous_files.keys()) == [file.archive_name for file in files]
+            and all(previous_files[file.archive_name]["sha256"] == file.sha256 for file in files)
+        )
+
+    def _store_hashes(self, files: List[ArtifactFile]) -> None:
+        self.hashes_file.write_text(json.dumps({"settings": self.get_settings(), "files": get_files_info(files)}, indent=2))
+
+    def create(self, artifacts: Iterable[ArchiveArtifact], force: bool = False) -> bool:
+        """
+        Create the archive if the artifacts changed since the last archive was created.
+
+        Args:
+            artifacts: The artifacts to be archived, e.g. an ArtifactsCollection or a generator.
+            force: Create the archive even if the artifacts did not change.
+
+        Returns:
+            bool: True if the archive was created, False if the existing archive is up to date.
+        """
+        return self.create_from_files(self.collect(artifacts, self._load_hashes().get("files")), force)
+
+    def create_from_files(self, files: List[ArtifactFile], force: bool = False) -> bool:
+        """Same as create(), for artifacts which were already collected, e.g. for the artifacts manifest."""
+        if not force and self.is_up_to_date(files, self._load_hashes()):
+            # Store the new modification times, so the files are not hashed again next time
+            self._store_hashes(files)
+            return False
+        self.hashes_file.unlink(missing_ok=True)
+        self.archive_file.unlink(missing_ok=True)
+        self.archive_file.parent.mkdir(parents=True, exist_ok=True)
+        if self.compression is Compression.ZSTD:
+            self._create_tar_zst(files)
+        else:
+            self._create_zip(files)
+        self._store_hashes(files)
+        return True
+
+    def _create_zip(self, files: List[ArtifactFile]) -> None:
+        level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+        if self.compression is Compression.STORED or not DeflateZipWriter.fits(files):
+            compress_type = zipfile.ZIP_STORED if self.compression is Compression.STORED else zipfile.ZIP_DEFLATED
+            with zipfile.ZipFile(self.archive_file, "w", compress_type, compresslevel=None if self.compression is Compression.STORED else level) as zip_file:
+                for file in files:
+                    zip_file.write(file.artifact.absolute_path, arcname=file.artifact.archive_path)
+            return
+        with self.archive_file.open("wb") as stream, ThreadPoolExecutor(self.max_workers) as executor:
+            writer = DeflateZipWriter(stream, level)
+            # zlib releases the GIL, so the entries are compressed in parallel and written in order
+            for file, compressed in bounded_map(lambda file: (file, _deflate(file, level)), files, executor, 2 * self.max_workers, _get_in_flight_size, MAX_IN_FLIGHT_SIZE):
+                writer.write(file, compressed)
+            writer.close()
+
+    def _create_tar_zst(self, files: List[ArtifactFile]) -> None:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise UserNotificationException("The zstd compression requires the 'zstandard' package. Please install it (e.g. 'spl-core[zstd]') or use a zip compression.") from e
+        compressor = zstandard.ZstdCompressor(level=3 if self.level is None else self.level, threads=-1)
+        with self.archive_file.open("wb") as archive, compressor.stream_writer(archive) as stream, tarfile.open(fileobj=stream, mode="w|") as tar:
+            for file in files:
+                tar.add(file.artifact.absolute_path, arcname=file.archive_name, recursive=False)
+
+
+def _get_in_flight_size(file: ArtifactFile) -> int:
+    # Large files are not read ahead
+    return 0 if file.size > MAX_PARALLEL_ENTRY_SIZE else file.size
+
+
+def _deflate(file: ArtifactFile, level: int) -> Optional[Tuple[bytes, int, int]]:
+    """Returns the raw deflate data, the CRC-32 and the size of the file, or None for large files which are compressed while writing."""
+    if file.size > MAX_PARALLEL_ENTRY_SIZE:
+        return None
+    data = file.artifact.absolute_path.read_bytes()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(), zlib.crc32(data), len(data)
+
+
+def _deflate_chunks(file: Path, level: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Compresses a large file chunk by chunk. Yields the raw deflate data, the CRC-32 and the size of the data read so far."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = size = 0
+    with file.open("rb") as stream:
+        while chunk := stream.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            yield compressor.compress(chunk), crc, size
+    yield compressor.flush(), crc, size
+
+
+class DeflateZipWriter:
+    """
+    Writes a zip archive with entries which were already compressed (raw deflate data), e.g. in parallel.
+
+    zipfile can only write data it compresses itself, so the records are written here (see the PKWARE APPNOTE).
+    zip64 is not supported, larger archives are created with zipfile (see fits()).
+    """
+
+    #: Limit of the sizes, offsets and number of entries without zip64
+    MAX_SIZE = 0xFFFFFFFF
+    MAX_ENTRIES = 0xFFFF
+    LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+    CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+    END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+    VERSION = 20
+    #: The file name is UTF-8 encoded
+    UTF8_FLAG = 0x800
+
+    def __init__(self, stream: BinaryIO, level: int = zlib.Z_DEFAULT_COMPRESSION) -> None:
+        self.stream = stream
+        self.level = level
+        self.entries: List[Tuple[zipfile.ZipInfo, int]] = []
+
+    @classmethod
+    def fits(cls, files: List[ArtifactFile]) -> bool:
+        """The archive fits without zip64, even if deflate does not reduce the size (it adds about 0.03% for incompressible data)."""
+        size = sum(file.size + file.size // 1000 + 2 * len(file.archive_name.encode()) + 1024 for file in files)
+        return len(files) < cls.MAX_ENTRIES and size < cls.MAX_SIZE
+
+    def write(self, file: ArtifactFile, compressed: Optional[Tuple[bytes, int, int]]) -> None:
+        """Writes the entry of the file. Without compressed data the file is compressed while writing."""
+        zip_info = zipfile.ZipInfo.from_file(file.artifact.absolute_path, arcname=file.archive_name)
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        name = zip_info.filename.encode()
+        offset = self.stream.tell()
+        # The sizes are only known after compressing, the header is written again afterwards
+        self.stream.write(self.LOCAL_HEADER.size * b"\0" + name)
+        zip_info.compress_size = 0
+        # The CRC-32 and the size of the last chunk are the ones of the whole file
+        for data, zip_info.CRC, zip_info.file_size in [compressed] if compressed else _deflate_chunks(file.artifact.absolute_path, self.level):
+            self.stream.write(data)
+            zip_info.compress_size += len(data)
+        end = self.stream.tell()
+        self.stream.seek(offset)
+        self.stream.write(self.LOCAL_HEADER.pack(b"PK\x03\x04", self.VERSION, *self._get_common_fields(zip_info), len(name), 0))
+        self.stream.seek(end)
+        self.entries.append((zip_info, offset))
+
+    def close(self) -> None:
+        """Writes the central directory."""
+        start = self.stream.tell()
+        for zip_info, offset in self.entries:
+            name = zip_info.filename.encode()
+            version_made_by = zip_info.create_system << 8 | self.VERSION
+            self.stream.write(self.CENTRAL_HEADER.pack(b"PK\x01\x02", version_made_by, self.VERSION, *self._get_common_fields(zip_info), len(name), 0, 0, 0, 0, zip_info.external_attr, offset) + name)
+        size = self.stream.tell() - start
+        self.stream.write(self.END_OF_CENTRAL_DIRECTORY.pack(b"PK\x05\x06", 0, 0, len(self.entries), len(self.entries), size, start, 0))
+
+    def _get_common_fields(self, zip_info: zipfile.ZipInfo) -> Tuple[int, ...]:
+        """Flags, compression method, time, date, CRC-32, compressed and uncompressed size."""
+        year, month, day, hour, minute, second = zip_info.date_time
+        dos_time = hour << 11 | minute << 5 | second // 2
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        flags = 0 if zip_info.filename.isascii() else self.UTF8_FLAG
+        return flags, zipfile.ZIP_DEFLATED, dos_time, dos_date, zip_info.CRC, zip_info.compress_size, zip_info.file_size
@@ -1,10 +1,11 @@
 import re
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List
+from typing import List, Sequence
 
 import pytest
 
+from spl_core.test_utils.build_cache import SESSION_BUILD_CACHE
 from spl_core.test_utils.spl_build import SplBuild
 
 
@@ -50,9 +51,24 @@ class BaseVariantTestRunner(ABC):
         return True
 
     @property
-    def expected_archive_artifacts(self) -> List[Path]:
+    def expected_archive_artifacts(self) -> Sequence[Path | str]:
         return self.expected_build_artifacts
 
+    @property
+    def reuse_builds(self) -> bool:
+        """Build every build kit and target only once per pytest session, e.g. test_reports reuses the unit test build."""
+        return True
+
+    def get_build(self, build_kit: str) -> SplBuild:
+        if self.reuse_builds:
+            return SESSION_BUILD_CACHE.get_build(self.variant, build_kit)
+        return SplBuild(variant=self.variant, build_kit=build_kit)
+
+    def execute_build(self, spl_build: SplBuild, target: str) -> int:
+        if self.reuse_builds:
+            return SESSION_BUILD_CACHE.execute(spl_build, target)
+        return spl_build.execute(target=target)
+
     def assert_artifact_exists(self, dir: Path, artifact: Path) -> None:
         if artifact.is_absolute():
             assert artifact.exists(), f"Artifact {artifact} does not exist"  # noqa: S101
@@ -61,8 +77,8 @@ class BaseVariantTestRunner(ABC):
 
     @pytest.mark.build
     def test_build(self) -> None:
-        spl_build: SplBuild = SplBuild(variant=self.variant, build_kit="prod")
-        assert 0 == spl_build.execute(target="all")  # noqa: S101
+        spl_build: SplBuild = self.get_build(build_kit="prod")
+        assert 0 == self.execute_build(spl_build, target="all")  # noqa: S101
         for artifact in self.expected_build_artifacts:
             self.assert_artifact_exists(dir=spl_build.build_dir, artifact=artifact)
         if self.create_artifacts_archive:
@@ -73,15 +89,15 @@ class BaseVariantTestRunner(ABC):
 
     @pytest.mark.unittests
     def test_unittests(self) -> None:
-        spl_build: SplBuild = SplBuild(variant=self.variant, build_kit="test")
-        assert 0 == spl_build.execute(target="unittests")  # noqa: S101
+        spl_build: SplBuild = self.get_build(build_kit="test")
+        assert 0 == self.execute_build(spl_build, target="unittests")  # noqa: S101
         for artifact in self.expected_test_artifacts:
             self.assert_artifact_exists(dir=spl_build.build_dir, artifact=artifact)
 
     @pytest.mark.reports
     def test_reports(self) -> None:
-        spl_build: SplBuild = SplBuild(variant=self.variant, build_kit="test")
-        assert 0 == spl_build.execute(target="all")  # noqa: S101
+        spl_build: SplBuild = self.get_build(build_kit="test")
+        assert 0 == self.execute_build(spl_build, target="all")  # noqa: S101
         for artifact in self.expected_variant_report_artifacts:
             self.assert_artifact_exists(dir=spl_build.build_dir, artifact=artifact)
         for component in self.component_paths:
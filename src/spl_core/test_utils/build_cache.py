@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from spl_core.test_utils.spl_build import SplBuild
+
+#: Targets which are also built by other targets. The reports of the "all" target depend on the unit test results and the coverage.
+DEFAULT_COVERING_TARGETS: Dict[str, List[str]] = {"unittests": ["all"]}
+
+
+class BuildCache:
+    def __init__(self, covering_targets: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        Remembers the builds of a pytest session, so every target of a variant and build kit is built only once.
+
+        Later tests of the same variant and build kit get the result of the first build and only run the targets
+        which were not built yet. These builds are incremental, the build is only reconfigured if needed.
+
+        Args:
+            covering_targets: Targets which are also built by other targets, e.g. {"unittests": ["all"]}.
+        """
+        self.covering_targets = DEFAULT_COVERING_TARGETS if covering_targets is None else covering_targets
+        self._builds: Dict[Tuple[Path, str, str], SplBuild] = {}
+        self._results: Dict[SplBuild, Dict[str, int]] = {}
+
+    def get_build(self, variant: str, build_kit: str) -> SplBuild:
+        # The build directory is relative to the current working directory
+        key = (Path.cwd(), variant, build_kit)
+        if key not in self._builds:
+            self._builds[key] = SplBuild(variant=variant, build_kit=build_kit)
+        return self._builds[key]
+
+    def execute(self, spl_build: SplBuild, target: str) -> int:
+        """Builds the target unless it was already built in this session, returns the return code of the build."""
+        results = self._results.setdefault(spl_build, {})
+        if target not in results:
+            if any(results.get(covering_target) == 0 for covering_target in self.covering_targets.get(target, [])):
+                return 0
+            results[target] = spl_build.execute(target=target)
+        return results[target]
+
+    def clear(self) -> None:
+        self._builds.clear()
+        self._results.clear()
+
+
+#: The build cache of the pytest session (every pytest-xdist worker has its own)
+SESSION_BUILD_CACHE = BuildCache()
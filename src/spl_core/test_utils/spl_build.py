@@ -1,57 +1,61 @@
+import asyncio
+import hashlib
 import json
+import os
 import time
-import zipfile
-from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from py_app_dev.core.logging import time_it
 
-from spl_core.common.command_line_executor import CommandLineExecutor
+from spl_core.common.async_command_line_executor import AsyncCommandLineExecutor, Command
+from spl_core.common.command_line_executor import CommandLineExecutor, LogFileSink, OutputSink
+from spl_core.common.retry_policy import ErrorMatcherSink, RetryPolicy, RetryReport, RetryScheduler
+from spl_core.test_utils.artifacts import ArchiveArtifact, ArtifactFile, ArtifactsArchive, ArtifactsCollection, Compression, collect_artifact_files, get_files_info
 
+__all__ = ["ArchiveArtifact", "ArtifactsCollection", "Compression", "SplBuild", "execute_parallel"]
 
-@dataclass
-class ArchiveArtifact:
-    archive_path: Path
-    absolute_path: Path
+#: File in the build directory with the outcome, duration and retries of the last build
+BUILD_REPORT = "build_report.json"
+#: File in the build directory with the size, modification time and hash of the configure inputs of the last successful build
+CONFIGURE_INPUTS_MANIFEST = "configure_inputs.json"
+#: Project subdirectories searched for configure inputs, in addition to the project directory itself and the own variant directory
+CONFIGURE_INPUT_DIRS = ["cmake", "src", "tools"]
+#: Directories which do not contain configure inputs
+IGNORED_DIRS = {".git", ".venv", ".vscode", "build", "out", "node_modules", "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache"}
 
 
-class ArtifactsCollection:
-    def __init__(self, artifacts: List[Path], build_dir: Path):
-        self.archive_artifacts: List[ArchiveArtifact] = []
-        for artifact in artifacts:
-            if artifact.is_absolute():
-                artifact_path = artifact
-            else:
-                artifact_path = Path.joinpath(build_dir.absolute(), artifact)
-            if artifact_path.is_dir():
-                for artifact in artifact_path.glob("**/*"):
-                    if artifact.is_file():
-                        if artifact_path.is_relative_to(build_dir.absolute()):
-                            self.archive_artifacts.append(ArchiveArtifact(archive_path=artifact.relative_to(build_dir.absolute()), absolute_path=artifact.absolute()))
-                        else:
-                            self.archive_artifacts.append(ArchiveArtifact(archive_path=Path(artifact.name), absolute_path=artifact.absolute()))
-            else:
-                if artifact_path.is_relative_to(build_dir.absolute()):
-                    self.archive_artifacts.append(ArchiveArtifact(archive_path=artifact_path.relative_to(build_dir.absolute()), absolute_path=artifact_path.absolute()))
-                else:
-                    self.archive_artifacts.append(ArchiveArtifact(archive_path=Path(artifact_path.name), absolute_path=artifact_path.absolute()))
+def is_configure_input(file_name: str) -> bool:
+    """CMake files (including the toolchain files) and KConfig models are read during configure."""
+    return file_name == "CMakeLists.txt" or file_name.endswith(".cmake") or file_name.lower() == "kconfig" or file_name.lower().endswith(".kconfig")
+
+
+def hash_file(file: Path) -> str:
+    return hashlib.sha256(file.read_bytes()).hexdigest()
 
 
 class SplBuild:
     """Class for building an SPL repository."""
 
-    def __init__(self, variant: str, build_kit: str):
+    def __init__(self, variant: str, build_kit: str, project_dir: Optional[Path] = None, retry_policy: Optional[RetryPolicy] = None):
         """
         Initialize a SplBuild instance.
 
         Args:
             variant (str): The build variant.
             build_kit (str): The build kit.
+            project_dir (Path, optional): The project directory. Defaults to the current working directory.
+            retry_policy (RetryPolicy, optional): When and how often to retry a build failing because of a license issue.
 
         """
         self.variant = variant
         self.build_kit = build_kit
+        self.project_dir = project_dir
+        self.retry_policy = retry_policy or RetryPolicy()
+        #: Retries of the last build
+        self.retry_report = RetryReport()
+        #: Collected artifacts by expected artifacts, shared by the artifacts archive and json
+        self._artifact_files: Dict[Tuple[Path | str, ...], List[ArtifactFile]] = {}
 
     @property
     def build_dir(self) -> Path:
@@ -64,83 +68,263 @@ class SplBuild:
         """
         return Path(f"build/{self.variant}/{self.build_kit}")
 
+    @property
+    def configure_inputs_manifest(self) -> Path:
+        return (self.project_dir or Path.cwd()) / self.build_dir / CONFIGURE_INPUTS_MANIFEST
+
+    def find_configure_inputs(self) -> List[Path]:
+        """
+        Find the files read by the CMake configure step.
+
+        These are the CMake files (including the toolchain files) and the KConfig models in the project directory and in the CONFIGURE_INPUT_DIRS,
+        the CMake files of the parent variant directories (e.g. variants/Flavor) and all files of the own variant directory.
+        """
+        project_dir = self.project_dir or Path.cwd()
+        variants_dir = project_dir / "variants"
+        variant_dir = variants_dir / self.variant
+        parent_dirs = [project_dir, *(variants_dir / parent for parent in reversed(variant_dir.relative_to(variants_dir).parents))]
+        files = [directory / entry.name for directory in parent_dirs if directory.is_dir() for entry in os.scandir(directory) if entry.is_file() and is_configure_input(entry.name)]
+        for input_dir in [*(project_dir / name for name in CONFIGURE_INPUT_DIRS), variant_dir]:
+            for dir_path, dir_names, file_names in os.walk(input_dir):
+                dir_names[:] = [name for name in dir_names if name not in IGNORED_DIRS]
+                files.extend(Path(dir_path) / file_name for file_name in file_names if input_dir == variant_dir or is_configure_input(file_name))
+        return files
+
+    def collect_configure_inputs(self, previous: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Collect the size, modification time and SHA-256 hash of all configure inputs.
+
+        Args:
+            previous (Dict, optional): The inputs of the last manifest. Files with unchanged size and modification time are not hashed again.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The size, mtime_ns and sha256 by project relative file path (posix style).
+
+        """
+        project_dir = self.project_dir or Path.cwd()
+        previous = previous or {}
+        inputs: Dict[str, Dict[str, Any]] = {}
+        for file in self.find_configure_inputs():
+            status = file.stat()
+            path = file.relative_to(project_dir).as_posix()
+            entry = previous.get(path)
+            if not (isinstance(entry, dict) and entry.get("size") == status.st_size and entry.get("mtime_ns") == status.st_mtime_ns):
+                entry = {"size": status.st_size, "mtime_ns": status.st_mtime_ns, "sha256": hash_file(file)}
+            inputs[path] = entry
+        return dict(sorted(inputs.items()))
+
+    def _read_configure_inputs_manifest(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            manifest = json.loads(self.configure_inputs_manifest.read_text())
+        except (OSError, ValueError):
+            return None
+        return manifest if isinstance(manifest, dict) else None
+
+    def needs_reconfigure(self) -> bool:
+        """Reconfigure is required if the content of the configure inputs changed since the last successful build."""
+        previous = self._read_configure_inputs_manifest()
+        if previous is None:
+            return True
+        current = self.collect_configure_inputs(previous)
+        return {path: entry["sha256"] for path, entry in current.items()} != {path: entry.get("sha256") if isinstance(entry, dict) else entry for path, entry in previous.items()}
+
+    def update_configure_inputs_manifest(self, success: bool) -> None:
+        """Store the configure inputs after a successful build. After a failed build the next build shall reconfigure."""
+        if success:
+            inputs = self.collect_configure_inputs(self._read_configure_inputs_manifest())
+            self.configure_inputs_manifest.parent.mkdir(parents=True, exist_ok=True)
+            self.configure_inputs_manifest.write_text(json.dumps(inputs, indent=2))
+        else:
+            self.configure_inputs_manifest.unlink(missing_ok=True)
+
     @time_it()
-    def execute(self, target: str, additional_args: Optional[List[str]] = None) -> int:
+    def execute(self, target: str, additional_args: Optional[List[str]] = None, reconfigure: Optional[bool] = None) -> int:
         """
         Build the target
 
         Args:
             target (str): The build target.
             additional_args (List[str], optional): Additional arguments for building. Defaults to ["-build"].
+            reconfigure (bool, optional): Delete the CMake cache and reconfigure.
+                Defaults to reconfigure only if the configure inputs changed since the last successful build.
 
         Returns:
             int: 0 in case of success.
 
         """
-        if additional_args is None:
-            additional_args = ["-build"]
-        return_code = -1
+        if reconfigure is None:
+            reconfigure = self.needs_reconfigure()
+        scheduler = RetryScheduler(self.retry_policy)
+        start = time.perf_counter()
         while True:
-            cmd = [
-                "build.bat",
-                "-buildKit",
-                self.build_kit,
-                "-variants",
-                self.variant,
-                "-target",
-                target,
-                "-reconfigure",
-            ]
-            cmd.extend(additional_args)
-            result = CommandLineExecutor().execute(cmd)
-            return_code = result.returncode
-            if result.returncode:
-                if result.stdout:
-                    if any(error in str(result.stdout) for error in ["No valid floating license", "No valid license", "GHS_LMHOST = N/A"]):
-                        print("Probably a license issue, retrying ...")
-                        time.sleep(10)
-                    else:
-                        break
-                else:
-                    break
-            else:
+            error_matcher = self.retry_policy.create_sink()
+            result = CommandLineExecutor(cwd=self.project_dir, sinks=[error_matcher], max_output_lines=100).execute(self.get_build_command(target, additional_args, reconfigure))
+            delay = scheduler.next_delay(result.returncode, self._get_retry_reason(result.returncode, result.stdout, error_matcher))
+            if delay is None:
                 break
-        return return_code
+            print(f"Probably a license issue, retrying in {delay:.0f}s ...")
+            time.sleep(delay)
+        self._finish_build(target, result.returncode, reconfigure, scheduler.report, time.perf_counter() - start)
+        return result.returncode
 
-    def create_artifacts_archive(self, expected_artifacts: List[Path]) -> Path:
+    async def execute_async(
+        self,
+        target: str,
+        additional_args: Optional[List[str]] = None,
+        reconfigure: Optional[bool] = None,
+        executor: Optional[AsyncCommandLineExecutor] = None,
+        timeout: Optional[float] = None,
+        log_file: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> int:
         """
-        Create a zip file containing the collected artifacts.
+        Build the target with the asyncio executor, e.g. to build several variants at the same time.
 
         Args:
-            expected_artifacts: List of Path of artifacts which should be archived
+            target (str): The build target.
+            additional_args (List[str], optional): Additional arguments for building. Defaults to ["-build"].
+            reconfigure (bool, optional): Delete the CMake cache and reconfigure. Defaults to reconfigure only if required.
+            executor (AsyncCommandLineExecutor, optional): The executor shared by the parallel builds.
+            timeout (float, optional): Maximum duration of one build attempt in seconds.
+            log_file (Path, optional): File to write the build output to.
+            env (Dict[str, str], optional): Environment of the build. Defaults to the environment of this process.
 
         Returns:
-            Path: The path to the created zip file.
+            int: 0 in case of success.
 
-        Raises:
-            Exception: If there is an error creating the zip file.
+        """
+        if reconfigure is None:
+            reconfigure = self.needs_reconfigure()
+        executor = executor or AsyncCommandLineExecutor()
+        scheduler = RetryScheduler(self.retry_policy)
+        prefix = f"[{self.variant}/{self.build_kit}] "
+        start = time.perf_counter()
+        while True:
+            error_matcher = self.retry_policy.create_sink()
+            sinks: List[OutputSink] = [error_matcher]
+            if log_file:
+                sinks.append(LogFileSink(log_file, append=scheduler.report.attempts > 0))
+            command = Command(self.get_build_command(target, additional_args, reconfigure), cwd=self.project_dir, env=env, prefix=prefix, timeout=timeout)
+            try:
+                result = await executor.execute(command, sinks=sinks)
+            finally:
+                for sink in sinks:
+                    sink.close()
+            delay = scheduler.next_delay(result.returncode, self._get_retry_reason(result.returncode, result.stdout, error_matcher))
+            if delay is None:
+                break
+            print(f"{prefix}Probably a license issue, retrying in {delay:.0f}s ...", flush=True)
+            await asyncio.sleep(delay)
+        self._finish_build(target, result.returncode, reconfigure, scheduler.report, time.perf_counter() - start)
+        return result.returncode
+
+    def _get_retry_reason(self, returncode: int, output: Optional[str], error_matcher: ErrorMatcherSink) -> Optional[str]:
+        if not returncode:
+            return None
+        # The retained output tail is checked as well, in case the output was not streamed through the sink
+        return error_matcher.matched_line or self.retry_policy.matches(output or "")
+
+    def _finish_build(self, target: str, returncode: int, reconfigured: bool, retry_report: RetryReport, duration: float) -> None:
+        self.retry_report = retry_report
+        # The build might have changed the artifacts
+        self._artifact_files.clear()
+        self.update_configure_inputs_manifest(returncode == 0)
+        self.write_build_report(target, returncode, reconfigured, duration)
 
+    @property
+    def build_report_file(self) -> Path:
+        return (self.project_dir or Path.cwd()) / self.build_dir / BUILD_REPORT
+
+    def write_build_report(self, target: str, returncode: int, reconfigured: bool, duration: float) -> Path:
+        """Write the machine-readable report of the last build, including the license retries."""
+        report = {
+            "variant": self.variant,
+            "build_kit": self.build_kit,
+            "target": target,
+            "returncode": returncode,
+            "reconfigured": reconfigured,
+            "duration": round(duration, 3),
+            "retry": self.retry_report.to_dict(),
+        }
+        self.build_report_file.parent.mkdir(parents=True, exist_ok=True)
+        self.build_report_file.write_text(json.dumps(report, indent=2))
+        return self.build_report_file
+
+    def get_build_command(self, target: str, additional_args: Optional[List[str]] = None, reconfigure: bool = True) -> List[str]:
+        if additional_args is None:
+            additional_args = ["-build"]
+        cmd = [
+            # Windows searches the executable in the directory of the calling process, not in the cwd of the build
+            str(self.project_dir / "build.bat") if self.project_dir else "build.bat",
+            "-buildKit",
+            self.build_kit,
+            "-variants",
+            self.variant,
+            "-target",
+            target,
+        ]
+        if reconfigure:
+            cmd.append("-reconfigure")
+        cmd.extend(additional_args)
+        return cmd
+
+    def create_artifacts_archive(self, expected_artifacts: Sequence[Path | str], compression: Compression = Compression.STORED, level: Optional[int] = None, force: bool = False) -> Path:
         """
-        zip_path = self.build_dir / "artifacts.zip"
+        Create an archive containing the collected artifacts.
 
-        # Delete the file if it already exists
-        if zip_path.exists():
-            zip_path.unlink()
+        The archive is only created again if the content of the artifacts changed since the last call.
 
+        Args:
+            expected_artifacts: Files, directories and glob patterns of the artifacts, patterns starting with "!" exclude files (see ArtifactsCollection)
+            compression: The compression, zip without compression by default. Compression.ZSTD creates a tar.zst archive.
+            level: The compression level. Defaults to the default level of the compression.
+            force: Create the archive even if the artifacts did not change.
+
+        Returns:
+            Path: The path to the created archive, e.g. artifacts.zip.
+
+        Raises:
+            Exception: If there is an error creating the archive.
+
+        """
+        archive_path = self.build_dir / f"artifacts{compression.suffix}"
         try:
-            with zipfile.ZipFile(zip_path, "w") as zip_file:
-                artifacts_collection = ArtifactsCollection(artifacts=expected_artifacts, build_dir=self.build_dir)
-                for artifact in artifacts_collection.archive_artifacts:
-                    zip_file.write(artifact.absolute_path, arcname=artifact.archive_path)
-            print(f"Zip file created at: {zip_path}")
-            return zip_path
+            if ArtifactsArchive(archive_path, compression, level).create_from_files(self.collect_artifacts(expected_artifacts), force):
+                print(f"Archive created at: {archive_path}")
+            else:
+                print(f"Archive is up to date: {archive_path}")
+            return archive_path
         except Exception as e:
-            print(f"Error creating artifacts zip file: {e}")
+            print(f"Error creating artifacts archive: {e}")
             raise e
 
-    def create_artifacts_json(self, expected_artifacts: List[Path]) -> Path:
+    @property
+    def artifacts_json(self) -> Path:
+        return self.build_dir / "artifacts.json"
+
+    def collect_artifacts(self, expected_artifacts: Sequence[Path | str]) -> List[ArtifactFile]:
         """
-        Create a JSON file listing the collected artifacts.
+        Collect the artifacts with size, modification time and SHA-256.
+
+        The result is shared by the artifacts archive and json until the next build.
+        The hashes of files which did not change since the last artifacts json was written are reused.
+        """
+        key = tuple(expected_artifacts)
+        if key not in self._artifact_files:
+            self._artifact_files[key] = collect_artifact_files(ArtifactsCollection(artifacts=expected_artifacts, build_dir=self.build_dir), self._load_artifacts_json().get("files"))
+        return self._artifact_files[key]
+
+    def _load_artifacts_json(self) -> Dict[str, Any]:
+        try:
+            return dict(json.loads(self.artifacts_json.read_text()))
+        except (OSError, ValueError):
+            return {}
+
+    def create_artifacts_json(self, expected_artifacts: Sequence[Path | str]) -> Path:
+        """
+        Create a JSON file listing the collected artifacts with their size, modification time and SHA-256.
+
+        Compare the files of two artifacts json files with compare_files_info, e.g. to upload only the changed artifacts.
 
         Returns:
             Path: The path to the created JSON file.
@@ -149,14 +333,47 @@ class SplBuild:
             Exception: If there is an error creating the JSON file.
 
         """
-        artifacts_collection = ArtifactsCollection(artifacts=expected_artifacts, build_dir=self.build_dir)
+        artifact_files = self.collect_artifacts(expected_artifacts)
         json_content = {
             "variant": self.variant,
             "build_kit": self.build_kit,
-            "artifacts": [str(artifact.archive_path.as_posix()) for artifact in artifacts_collection.archive_artifacts],
+            "artifacts": [artifact_file.archive_name for artifact_file in artifact_files],
+            "files": get_files_info(artifact_files),
         }
-        json_path = self.build_dir / "artifacts.json"
+        json_path = self.artifacts_json
 
         json_path.write_text(json.dumps(json_content, indent=4))
 
         return json_path
+
+
+def execute_parallel(
+    builds: List[SplBuild],
+    target: str,
+    additional_args: Optional[List[str]] = None,
+    max_parallel: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[SplBuild, int]:
+    """
+    Build several variants and/or build kits at the same time.
+
+    The output lines are prefixed with ``<variant>/<build_kit>``. Builds failing because of a license issue are retried
+    according to the retry policy of each build.
+
+    Args:
+        builds: The builds to execute.
+        target: The build target.
+        additional_args: Additional arguments for building. Defaults to ["-build"].
+        max_parallel: Maximum number of builds running at the same time. Defaults to the number of CPUs.
+        timeout: Maximum duration of one build in seconds.
+
+    Returns:
+        Dict[SplBuild, int]: The return code of every build, 0 in case of success.
+
+    """
+    executor = AsyncCommandLineExecutor(max_parallel=max_parallel)
+
+    async def execute_all() -> List[int]:
+        return list(await asyncio.gather(*[build.execute_async(target, additional_args, executor=executor, timeout=timeout) for build in builds]))
+
+    return dict(zip(builds, asyncio.run(execute_all())))
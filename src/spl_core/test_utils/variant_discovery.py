@@ -0,0 +1,195 @@
+"""
+Pytest plugin generating the variant tests for all variants, instead of one BaseVariantTestRunner subclass per variant.
+
+Subclass VariantTestRunner once, e.g. in ``test/test_variants.py``:
+
+.. code-block:: python
+
+    class Test_Variants(VariantTestRunner):
+        pass
+
+Every directory with a ``config.cmake`` file in the variants directory is a variant.
+The optional ``variant_test.json`` next to it configures the tests of the variant, e.g.:
+
+.. code-block:: json
+
+    {
+        "component_paths": ["src/greeter"],
+        "expected_build_artifacts": ["my_main.exe", "compile_commands.json"]
+    }
+
+The variants are discovered once per session. They are cached in the pytest cache and only discovered again
+if a ``config.cmake`` or ``variant_test.json`` file was added, removed or modified.
+
+Enable the plugin with ``-p spl_core.test_utils.variant_discovery``, e.g. in the ``addopts`` of the pytest.ini,
+to select another variants directory (``--spl-variants-dir``) and to skip the generated tests of variants
+which still have a hand-written BaseVariantTestRunner subclass.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+
+from spl_core.common.variants import find_variants
+from spl_core.test_utils.base_variant_test_runner import BaseVariantTestRunner
+
+#: Optional test configuration in the variant directory
+METADATA_FILE = "variant_test.json"
+#: Name of the parameter with the VariantTestConfig of the generated tests
+VARIANT_CONFIG_ARG = "spl_variant_config"
+CACHE_KEY = "spl/variant_discovery"
+#: The variants discovered in this session, per variants directory
+DISCOVERED_VARIANTS = pytest.StashKey[Dict[Path, List["VariantTestConfig"]]]()
+
+
+@dataclass
+class VariantTestConfig:
+    variant: str
+    component_paths: List[Path] = field(default_factory=list)
+    expected_build_artifacts: List[Path] = field(default_factory=list)
+    #: The optional artifacts default to the ones of BaseVariantTestRunner
+    expected_test_artifacts: Optional[List[Path]] = None
+    expected_variant_report_artifacts: Optional[List[Path]] = None
+    expected_component_report_artifacts: Optional[List[Path]] = None
+    #: Files, directories or glob patterns, see ArtifactsCollection
+    expected_archive_artifacts: Optional[List[str]] = None
+
+    @classmethod
+    def from_dict(cls, variant: str, metadata: Dict[str, Any]) -> "VariantTestConfig":
+        names = {config_field.name for config_field in fields(cls)} - {"variant"}
+        unknown = sorted(set(metadata) - names)
+        if unknown:
+            raise UserNotificationException(f"Variant '{variant}': unknown keys {unknown} in {METADATA_FILE}. Valid keys are {sorted(names)}.")
+        values: Dict[str, Any] = {name: value if name == "expected_archive_artifacts" else [Path(path) for path in value] for name, value in metadata.items()}
+        return cls(variant=variant, **values)
+
+
+def _load_metadata(metadata_file: Path, variant: str) -> Dict[str, Any]:
+    try:
+        return dict(json.loads(metadata_file.read_text()))
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise UserNotificationException(f"Variant '{variant}': invalid {metadata_file}: {e}") from e
+
+
+def _get_signature(variants_dir: Path) -> List[Tuple[str, int]]:
+    """The paths (relative to the variants directory) and modification times of all config.cmake and variant_test.json files."""
+    signature = []
+    directories = [str(variants_dir)]
+    while directories:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        directories.append(entry.path)
+                    elif entry.name in ("config.cmake", METADATA_FILE):
+                        signature.append((Path(os.path.relpath(entry.path, variants_dir)).as_posix(), entry.stat().st_mtime_ns))
+        except OSError:
+            continue
+    return sorted(signature)
+
+
+def discover_variants(variants_dir: Path, cache: Optional[pytest.Cache] = None) -> List[VariantTestConfig]:
+    """
+    Finds the variants and reads their test configuration.
+
+    Args:
+        variants_dir: The directory containing the variants.
+        cache: The pytest cache. The variants of the previous session are reused if no config.cmake or variant_test.json file changed.
+    """
+    # The cache stores json, i.e. lists instead of tuples
+    signature = [list(file) for file in _get_signature(variants_dir)]
+    cached = cache.get(CACHE_KEY, {}) if cache else {}
+    if cached.get("variants_dir") == str(variants_dir) and cached.get("signature") == signature:
+        variants: Dict[str, Any] = cached["variants"]
+    else:
+        variants = {variant: _load_metadata(variants_dir.joinpath(variant, METADATA_FILE), variant) for variant in find_variants(variants_dir)}
+        if cache:
+            cache.set(CACHE_KEY, {"variants_dir": str(variants_dir), "signature": signature, "variants": variants})
+    return [VariantTestConfig.from_dict(variant, metadata) for variant, metadata in variants.items()]
+
+
+def get_variant_configs(config: pytest.Config) -> List[VariantTestConfig]:
+    """The variants of the session. They are discovered once and shared by all test functions."""
+    # The option is only available if the plugin is enabled
+    variants_dir = config.rootpath / config.getoption("spl_variants_dir", default="variants")
+    discovered = config.stash.setdefault(DISCOVERED_VARIANTS, {})
+    if variants_dir not in discovered:
+        discovered[variants_dir] = discover_variants(variants_dir, getattr(config, "cache", None))
+    return discovered[variants_dir]
+
+
+class VariantTestRunner(BaseVariantTestRunner):
+    """Runs the variant tests for every discovered variant. The tests are parametrized with the VariantTestConfig."""
+
+    variant_config: VariantTestConfig
+
+    @staticmethod
+    def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+        variant_configs = get_variant_configs(metafunc.config)
+        metafunc.parametrize(VARIANT_CONFIG_ARG, variant_configs, ids=[variant_config.variant for variant_config in variant_configs])
+
+    @pytest.fixture(autouse=True)
+    def _set_variant_config(self, spl_variant_config: VariantTestConfig) -> None:
+        self.variant_config = spl_variant_config
+
+    @property
+    def variant(self) -> str:
+        return self.variant_config.variant
+
+    @property
+    def component_paths(self) -> List[Path]:
+        return self.variant_config.component_paths
+
+    @property
+    def expected_build_artifacts(self) -> List[Path]:
+        return self.variant_config.expected_build_artifacts
+
+    @property
+    def expected_test_artifacts(self) -> List[Path]:
+        config = self.variant_config.expected_test_artifacts
+        return config if config is not None else super().expected_test_artifacts
+
+    @property
+    def expected_variant_report_artifacts(self) -> List[Path]:
+        config = self.variant_config.expected_variant_report_artifacts
+        return config if config is not None else super().expected_variant_report_artifacts
+
+    @property
+    def expected_component_report_artifacts(self) -> List[Path]:
+        config = self.variant_config.expected_component_report_artifacts
+        return config if config is not None else super().expected_component_report_artifacts
+
+    @property
+    def expected_archive_artifacts(self) -> Sequence[Path | str]:
+        config = self.variant_config.expected_archive_artifacts
+        return config if config is not None else super().expected_archive_artifacts
+
+
+def get_variant_config(item: pytest.Item) -> Optional[VariantTestConfig]:
+    """The VariantTestConfig of a generated test, None for other tests."""
+    callspec = getattr(item, "callspec", None)
+    variant_config = callspec.params.get(VARIANT_CONFIG_ARG) if callspec else None
+    return variant_config if isinstance(variant_config, VariantTestConfig) else None
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("spl", "SPL variant tests")
+    group.addoption("--spl-variants-dir", default="variants", help="Directory with the variants, relative to the pytest root directory. Defaults to 'variants'.")
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: List[pytest.Item]) -> None:
+    # Hand-written test classes take precedence, e.g. for variants with additional tests
+    instances = [getattr(item, "instance", None) for item in items]
+    hand_written = {instance.variant for instance in instances if isinstance(instance, BaseVariantTestRunner) and not isinstance(instance, VariantTestRunner)}
+    deselected = [item for item in items if (variant_config := get_variant_config(item)) is not None and variant_config.variant in hand_written]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        deselected_ids = {id(item) for item in deselected}
+        items[:] = [item for item in items if id(item) not in deselected_ids]
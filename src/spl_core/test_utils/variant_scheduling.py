@@ -0,0 +1,216 @@
+"""
+Pytest plugin to run the variant tests (BaseVariantTestRunner subclasses) with pytest-xdist.
+
+Enable it with ``-p spl_core.test_utils.variant_scheduling``, e.g. in the ``addopts`` of the pytest.ini.
+
+* All tests of a variant run on the same worker, so the build of the variant is reused (``--dist loadgroup``).
+* The workers share a global Ninja job budget (``--spl-jobs``, defaults to the number of CPUs).
+  At most ``jobs / MIN_JOBS_PER_BUILD`` variant tests build at the same time, every build gets its share of the jobs.
+  The workers coordinate through locked files in a temporary directory, which is removed at the end of the session.
+* The terminal summary reports the duration of the variant tests.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+
+from spl_core.common.variants import MIN_JOBS_PER_BUILD
+from spl_core.test_utils.base_variant_test_runner import BaseVariantTestRunner
+from spl_core.test_utils.variant_discovery import VariantTestRunner, get_variant_config
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+VARIANT_PROPERTY = "spl_variant"
+WAIT_TIME_PROPERTY = "spl_budget_wait_time"
+JOB_BUDGET_DIR_KEY = "spl_job_budget_dir"
+JOB_BUDGET_DIR = pytest.StashKey[Path]()
+#: The job budget directory was created by this session, it is removed at the end of the session
+JOB_BUDGET_DIR_CREATED = pytest.StashKey[bool]()
+
+
+def try_lock(file_descriptor: int) -> bool:
+    """Locks the file without waiting. The operating system releases the lock when the process ends, even if it crashed."""
+    try:
+        if sys.platform == "win32":
+            msvcrt.locking(file_descriptor, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def unlock(file_descriptor: int) -> None:
+    if sys.platform == "win32":
+        os.lseek(file_descriptor, 0, os.SEEK_SET)
+        msvcrt.locking(file_descriptor, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file_descriptor, fcntl.LOCK_UN)
+
+
+class JobBudget:
+    def __init__(self, directory: Path, slots: int, poll_interval: float = 0.5) -> None:
+        """
+        Limits the number of builds running at the same time across processes.
+
+        Every running build holds the lock of one of the files ``slot_<n>.lock`` in the directory.
+        The locks are released by the operating system if a process crashes, so a crashed worker does not block the others.
+
+        Args:
+            directory: The directory of the token files. All processes sharing the budget use the same directory.
+            slots: Number of builds running at the same time.
+            poll_interval: Seconds to wait before trying again if all slots are taken.
+        """
+        self.directory = directory
+        self.slots = max(1, slots)
+        self.poll_interval = poll_interval
+
+    @contextmanager
+    def acquire(self) -> Iterator[int]:
+        """Waits for a free slot and holds it until the context is left. Yields the slot number."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            for slot in range(self.slots):
+                file_descriptor = os.open(self.directory / f"slot_{slot}.lock", os.O_CREAT | os.O_RDWR)
+                if not try_lock(file_descriptor):
+                    os.close(file_descriptor)
+                    continue
+                try:
+                    yield slot
+                finally:
+                    unlock(file_descriptor)
+                    os.close(file_descriptor)
+                return
+            time.sleep(self.poll_interval)
+
+
+def get_variant(item: pytest.Item) -> Optional[str]:
+    """The variant of a BaseVariantTestRunner test, None for other tests."""
+    # The generated variant tests only know their variant from the test parameter
+    variant_config = get_variant_config(item)
+    if variant_config:
+        return variant_config.variant
+    instance = getattr(item, "instance", None)
+    return instance.variant if isinstance(instance, BaseVariantTestRunner) and not isinstance(instance, VariantTestRunner) else None
+
+
+def get_parallel_builds(jobs: int, workers: int) -> Tuple[int, int]:
+    """Returns the number of builds running at the same time and the Ninja jobs of every build."""
+    parallel_builds = max(1, min(workers, jobs // MIN_JOBS_PER_BUILD))
+    return parallel_builds, max(1, jobs // parallel_builds)
+
+
+def format_durations(durations: Dict[str, Dict[str, float]], wait_times: Dict[str, float]) -> List[str]:
+    """One line per variant with the total and the duration of every test, the slowest variant first."""
+    lines = []
+    for variant, tests in sorted(durations.items(), key=lambda variant_tests: sum(variant_tests[1].values()), reverse=True):
+        details = ", ".join(f"{test} {duration:.1f}s" for test, duration in tests.items())
+        wait_time = f", waited {wait_times[variant]:.1f}s for the job budget" if round(wait_times.get(variant, 0.0), 1) else ""
+        lines.append(f"{variant}: {sum(tests.values()):.1f}s ({details}{wait_time})")
+    return lines
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("spl", "SPL variant tests")
+    group.addoption("--spl-jobs", type=int, default=None, help="Total number of Ninja jobs of all variant builds running at the same time. Defaults to the number of CPUs.")
+    group.addoption(
+        "--spl-job-budget-dir",
+        default=None,
+        help="Directory of the job budget lock files, shared by all processes using the same budget. Defaults to a temporary directory, which is removed at the end of the session.",
+    )
+
+
+class VariantDurations:
+    """Collects the durations of the variant tests. Runs in the controller, which receives the reports of all xdist workers."""
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, Dict[str, float]] = {}
+        self.wait_times: Dict[str, float] = {}
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        # The user properties are transferred from the workers with the report
+        properties: Dict[str, Any] = dict(report.user_properties)
+        variant = properties.get(VARIANT_PROPERTY)
+        if variant is None or report.when != "call":
+            return
+        self.durations.setdefault(variant, {})[report.nodeid.split("::")[-1]] = report.duration
+        self.wait_times[variant] = self.wait_times.get(variant, 0.0) + float(properties.get(WAIT_TIME_PROPERTY, 0.0))
+
+    def pytest_terminal_summary(self, terminalreporter: pytest.TerminalReporter) -> None:
+        lines = format_durations(self.durations, self.wait_times)
+        if lines:
+            terminalreporter.write_sep("=", "variant test durations")
+            for line in lines:
+                terminalreporter.write_line(line)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config: pytest.Config) -> None:
+    # pytest-xdist distributes the tests with "load" by default, keep explicitly selected other modes
+    if getattr(config.option, "dist", None) == "load":
+        config.option.dist = "loadgroup"
+    if not config.pluginmanager.hasplugin("xdist"):
+        config.addinivalue_line("markers", "xdist_group(name): run the tests of a group on the same pytest-xdist worker")
+    if not hasattr(config, "workerinput"):
+        config.pluginmanager.register(VariantDurations(), "spl_variant_durations")
+        directory = config.getoption("spl_job_budget_dir")
+        config.stash[JOB_BUDGET_DIR] = Path(directory or Path(tempfile.gettempdir()) / f"spl-job-budget-{uuid.uuid4().hex}")
+        config.stash[JOB_BUDGET_DIR_CREATED] = not directory
+    else:
+        config.stash[JOB_BUDGET_DIR] = Path(config.workerinput[JOB_BUDGET_DIR_KEY])
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node: Any) -> None:
+    """pytest-xdist hook, all workers share the job budget directory of the controller."""
+    node.workerinput[JOB_BUDGET_DIR_KEY] = str(node.config.stash[JOB_BUDGET_DIR])
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    # The workers finish before the controller
+    if session.config.stash.get(JOB_BUDGET_DIR_CREATED, False):
+        shutil.rmtree(session.config.stash[JOB_BUDGET_DIR], ignore_errors=True)
+
+
+# pytest-xdist adds the group of the xdist_group marker to the node ids in its own (trylast) hook, the markers must be added before
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(items: List[pytest.Item]) -> None:
+    for item in items:
+        variant = get_variant(item)
+        if variant:
+            item.add_marker(pytest.mark.xdist_group(name=variant))
+
+
+def _get_job_budget(config: pytest.Config) -> Tuple[JobBudget, int]:
+    # Only pytest-xdist workers have the workerinput
+    worker_input = getattr(config, "workerinput", {})
+    workers = int(worker_input.get("workercount", 1))
+    parallel_builds, jobs_per_build = get_parallel_builds(config.getoption("spl_jobs") or os.cpu_count() or 1, workers)
+    return JobBudget(config.stash[JOB_BUDGET_DIR], parallel_builds), jobs_per_build
+
+
+@pytest.fixture(autouse=True)
+def _spl_job_budget(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    variant = get_variant(request.node)
+    if variant is None:
+        yield
+        return
+    job_budget, jobs_per_build = _get_job_budget(request.config)
+    start = time.perf_counter()
+    with job_budget.acquire():
+        request.node.user_properties.append((VARIANT_PROPERTY, variant))
+        request.node.user_properties.append((WAIT_TIME_PROPERTY, time.perf_counter() - start))
+        # cmake --build passes the number of jobs to Ninja
+        monkeypatch.setenv("CMAKE_BUILD_PARALLEL_LEVEL", str(jobs_per_build))
+        yield
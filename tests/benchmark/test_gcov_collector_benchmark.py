@@ -0,0 +1,65 @@
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from utils import ExecutionTime, load_tracefile
+
+from spl_core.coverage.gcov_collector import main
+
+pytestmark = pytest.mark.benchmark
+
+SOURCE_FILES = 300
+
+SOURCE_TEMPLATE = """
+int add_{index}(int a, int b) {{
+    if (a > b) {{
+        return a - b;
+    }}
+    return a + b;
+}}
+
+int unused_{index}(int a) {{
+    return a > 0 ? a : -a;
+}}
+"""
+
+
+def create_project(root: Path) -> Path:
+    """Compiles a project with SOURCE_FILES source files with coverage and runs it to create the gcda files."""
+    source_dir = root / "src"
+    build_dir = root / "build"
+    source_dir.mkdir()
+    build_dir.mkdir()
+    for index in range(SOURCE_FILES):
+        source_dir.joinpath(f"source_{index}.c").write_text(SOURCE_TEMPLATE.format(index=index))
+    declarations = "".join(f"int add_{index}(int a, int b);\n" for index in range(SOURCE_FILES))
+    calls = "".join(f"    sum += add_{index}({index}, {index % 7});\n" for index in range(SOURCE_FILES))
+    source_dir.joinpath("main.c").write_text(f"{declarations}\nint main(void) {{\n    int sum = 0;\n{calls}    return sum == 0;\n}}\n")
+
+    def compile_source(source: Path) -> Path:
+        object_file = build_dir / f"{source.stem}.o"
+        subprocess.run(["gcc", "--coverage", "-c", str(source), "-o", str(object_file)], check=True)  # noqa: S607
+        return object_file
+
+    with ThreadPoolExecutor() as executor:
+        object_files = list(executor.map(compile_source, sorted(source_dir.glob("*.c"))))
+    subprocess.run(["gcc", "--coverage", *map(str, object_files), "-o", str(build_dir / "main")], check=True)  # noqa: S607
+    subprocess.run([str(build_dir / "main")], check=True)
+    return build_dir
+
+
+@pytest.mark.skipif(not all(shutil.which(tool) for tool in ["gcc", "gcov", "gcovr"]), reason="gcc, gcov and gcovr are required")
+def test_gcov_collector_is_faster_than_gcovr(tmp_path: Path) -> None:
+    build_dir = create_project(tmp_path)
+
+    # Same invocation as the component coverage step in common.cmake before the gcov collector
+    with ExecutionTime(f"gcovr with {SOURCE_FILES + 1} gcda files") as gcovr_time:
+        subprocess.run(["gcovr", "--root", str(tmp_path), "--json", "--output", str(tmp_path / "gcovr.json"), str(build_dir)], check=True, capture_output=True)  # noqa: S607
+    with ExecutionTime(f"gcov collector with {SOURCE_FILES + 1} gcda files") as collector_time:
+        assert main([str(build_dir), "--root", str(tmp_path), "--output", str(tmp_path / "collector.json")]) == 0
+
+    print(f"The gcov collector took {collector_time.time / gcovr_time.time:.0%} of the gcovr time")
+    assert load_tracefile(tmp_path / "collector.json") == load_tracefile(tmp_path / "gcovr.json")
+    assert collector_time.time < gcovr_time.time
@@ -0,0 +1,37 @@
+import os
+from typing import List
+
+import pytest
+from utils import ExecutionTime
+
+from spl_core.kconfig.kconfig import ConfigElement, ConfigElementType, VariableResolver
+
+pytestmark = pytest.mark.benchmark
+
+
+def create_elements(count: int) -> List[ConfigElement]:
+    """
+    Every string references its parent in a binary tree and an environment variable.
+    The elements are declared in reverse order, so every reference points to a not yet resolved element.
+    """
+    elements = [ConfigElement(ConfigElementType.STRING, f"STRING_{index}", f"${{STRING_{(index - 1) // 2}}}/${{ENV:BENCHMARK_ENV}}_{index}") for index in range(count - 1, 0, -1)]
+    elements.append(ConfigElement(ConfigElementType.STRING, "STRING_0", "root"))
+    return elements
+
+
+def measure(count: int) -> float:
+    elements = create_elements(count)
+    with ExecutionTime(f"resolve {count} interpolated strings") as execution_time:
+        VariableResolver(elements).resolve()
+    assert elements[-2].value == "root/env_1"
+    return execution_time.time
+
+
+def test_variable_resolution_scales_linear() -> None:
+    os.environ["BENCHMARK_ENV"] = "env"
+    measure(1000)  # warm up
+    small = min(measure(5000) for _ in range(3))
+    large = min(measure(20000) for _ in range(3))
+    print(f"4x elements took {large / small:.1f}x the time")
+    # linear scaling is ~4x (tree depth adds a logarithmic factor to the value length), quadratic would be ~16x
+    assert large / small < 10
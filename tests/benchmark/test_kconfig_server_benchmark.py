@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import textwrap
+import uuid
+from pathlib import Path
+from typing import Dict
+
+import pytest
+from utils import ExecutionTime, this_repository_root_dir
+
+from spl_core.kconfig.client import request
+
+pytestmark = pytest.mark.benchmark
+
+RUNS = 5
+
+
+def run_client(project_dir: Path, env: Dict[str, str]) -> float:
+    client = this_repository_root_dir() / "src/spl_core/kconfig/client.py"
+    with ExecutionTime("kconfig client") as execution_time:
+        subprocess.run(
+            [
+                sys.executable,
+                str(client),
+                "--kconfig_model_file",
+                str(project_dir / "KConfig"),
+                "--kconfig_config_file",
+                str(project_dir / "config.txt"),
+                "--out_header_file",
+                str(project_dir / "kconfig/autoconf.h"),
+                "--out_json_file",
+                str(project_dir / "kconfig/autoconf.json"),
+                "--out_cmake_file",
+                str(project_dir / "kconfig/autoconf.cmake"),
+            ],
+            env=env,
+            check=True,
+        )
+    return execution_time.time
+
+
+def test_cold_vs_warm_configure(tmp_path: Path) -> None:
+    tmp_path.joinpath("KConfig").write_text("".join(f'config FEATURE_{index}\n    bool "Feature {index}"\n' for index in range(200)))
+    tmp_path.joinpath("config.txt").write_text(textwrap.dedent("CONFIG_FEATURE_1=y\n"))
+    address = rf"\\.\pipe\spl_core_kconfig_{uuid.uuid4().hex}" if sys.platform == "win32" else (tmp_path / "kconfig.sock").as_posix()
+    env = {**os.environ, "PYTHONPATH": str(this_repository_root_dir() / "src"), "SPL_KCONFIG_SERVER_ADDRESS": address}
+
+    cold = min(run_client(tmp_path, env) for _ in range(RUNS))
+
+    server = subprocess.Popen([sys.executable, "-m", "spl_core.kconfig.server", "--address", address, "--idle_timeout", "60"], env=env)
+    try:
+        while request({"command": "ping"}, address) is None:
+            assert server.poll() is None, "the server shall be running"
+        warm = min(run_client(tmp_path, env) for _ in range(RUNS))
+    finally:
+        request({"command": "stop"}, address)
+        server.wait(timeout=10)
+
+    print(f"cold configure: {cold:.3f}s, warm configure: {warm:.3f}s")
+    assert warm < cold
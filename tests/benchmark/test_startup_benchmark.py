@@ -0,0 +1,17 @@
+from typing import List
+
+import pytest
+from utils import import_times
+
+pytestmark = pytest.mark.benchmark
+
+#: Budget for importing spl_core.main, the original eager imports took more than 100 ms
+IMPORT_BUDGET_MS = 60
+
+
+@pytest.mark.parametrize("args", [["--version"], ["--help"], []])
+def test_fast_path_startup(args: List[str]) -> None:
+    times = min((import_times(args) for _ in range(3)), key=lambda times: times["spl_core.main"])
+    import_ms = times["spl_core.main"] / 1000
+    print(f"please {' '.join(args)}: importing spl_core.main took {import_ms:.1f} ms")
+    assert import_ms < IMPORT_BUDGET_MS
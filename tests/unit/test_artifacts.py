@@ -0,0 +1,210 @@
+import os
+import sys
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List
+from unittest.mock import patch
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+
+from spl_core.test_utils.artifacts import ArchiveArtifact, ArtifactsArchive, ArtifactsCollection, Compression, DeflateZipWriter, bounded_map, glob_to_regex
+
+
+@pytest.fixture
+def artifacts(tmp_path: Path) -> ArtifactsCollection:
+    build_dir = tmp_path / "build"
+    files = {
+        "main.elf": os.urandom(10_000),
+        "main.map": b"map file " * 10_000,
+        "reports/coverage/index.html": b"<html>coverage</html>" * 1000,
+        "reports/coverage/empty.html": b"",
+    }
+    for name, content in files.items():
+        build_dir.joinpath(name).parent.mkdir(parents=True, exist_ok=True)
+        build_dir.joinpath(name).write_bytes(content)
+    return ArtifactsCollection([Path("main.elf"), Path("main.map"), Path("reports")], build_dir)
+
+
+def read_zip(archive_file: Path) -> Dict[str, bytes]:
+    with zipfile.ZipFile(archive_file) as zip_file:
+        assert zip_file.testzip() is None
+        return {name: zip_file.read(name) for name in zip_file.namelist()}
+
+
+@pytest.mark.parametrize("compression", [Compression.DEFLATE, Compression.STORED])
+def test_create_zip(artifacts: ArtifactsCollection, tmp_path: Path, compression: Compression) -> None:
+    archive_file = tmp_path / "out" / "artifacts.zip"
+
+    assert ArtifactsArchive(archive_file, compression, max_workers=4).create(artifacts)
+
+    content = read_zip(archive_file)
+    assert list(content.keys()) == [artifact.archive_path.as_posix() for artifact in artifacts]
+    for artifact in artifacts:
+        assert content[artifact.archive_path.as_posix()] == artifact.absolute_path.read_bytes()
+    with zipfile.ZipFile(archive_file) as zip_file:
+        expected_type = zipfile.ZIP_DEFLATED if compression is Compression.DEFLATE else zipfile.ZIP_STORED
+        assert {info.compress_type for info in zip_file.infolist()} == {expected_type}
+        assert zip_file.getinfo("main.map").compress_size < zip_file.getinfo("main.map").file_size or compression is Compression.STORED
+
+
+def test_large_files_are_compressed_while_writing(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    archive_file = tmp_path / "artifacts.zip"
+    with patch("spl_core.test_utils.artifacts.MAX_PARALLEL_ENTRY_SIZE", 20_000):
+        ArtifactsArchive(archive_file, Compression.DEFLATE).create(artifacts)
+    assert read_zip(archive_file)["main.map"] == b"map file " * 10_000
+
+
+def test_zip_archive_keeps_file_attributes(tmp_path: Path) -> None:
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    build_dir.joinpath("größe.txt").write_text("content")
+    build_dir.joinpath("run.sh").write_text("#!/bin/sh\n")
+    build_dir.joinpath("run.sh").chmod(0o755)
+    os.utime(build_dir / "run.sh", (1_000_000_000, 1_000_000_000))
+    archive_file = tmp_path / "artifacts.zip"
+
+    ArtifactsArchive(archive_file, Compression.DEFLATE).create(ArtifactsCollection([Path(".")], build_dir))
+
+    assert read_zip(archive_file) == {"größe.txt": b"content", "run.sh": b"#!/bin/sh\n"}
+    with zipfile.ZipFile(archive_file) as zip_file:
+        expected = zipfile.ZipInfo.from_file(build_dir / "run.sh", "run.sh")
+        assert zip_file.getinfo("run.sh").date_time == expected.date_time
+        assert zip_file.getinfo("run.sh").external_attr == expected.external_attr
+
+
+def test_zip64_archives_are_created_by_zipfile(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    archive_file = tmp_path / "artifacts.zip"
+    with patch.object(DeflateZipWriter, "MAX_ENTRIES", 2), patch.object(DeflateZipWriter, "write") as write_mock:
+        ArtifactsArchive(archive_file, Compression.DEFLATE).create(artifacts)
+    write_mock.assert_not_called()
+    assert read_zip(archive_file)["main.map"] == b"map file " * 10_000
+
+
+def test_bounded_map_limits_the_size_in_flight() -> None:
+    events: List[str] = []
+
+    def items() -> Iterator[int]:
+        for item in [5, 5, 5, 20, 1]:
+            events.append(f"submit {item}")
+            yield item
+
+    with ThreadPoolExecutor(4) as executor:
+        for result in bounded_map(lambda item: item, items(), executor, window=10, size=lambda item: item, max_size=10):
+            events.append(f"result {result}")
+
+    # An item larger than the limit is submitted once nothing else is in flight
+    assert events == ["submit 5", "submit 5", "submit 5", "result 5", "submit 20", "result 5", "result 5", "submit 1", "result 20", "result 1"]
+
+
+def test_default_compression_is_stored(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    archive_file = tmp_path / "artifacts.zip"
+    ArtifactsArchive(archive_file).create(artifacts)
+    with zipfile.ZipFile(archive_file) as zip_file:
+        assert {info.compress_type for info in zip_file.infolist()} == {zipfile.ZIP_STORED}
+
+
+def test_create_from_generator(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    archive_file = tmp_path / "artifacts.zip"
+    generator = (ArchiveArtifact(Path("renamed") / artifact.archive_path, artifact.absolute_path) for artifact in artifacts)
+
+    ArtifactsArchive(archive_file).create(generator)
+
+    assert all(name.startswith("renamed/") for name in read_zip(archive_file))
+
+
+def test_skip_archive_if_content_unchanged(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    archive_file = tmp_path / "artifacts.zip"
+    archive = ArtifactsArchive(archive_file)
+    assert archive.create(artifacts)
+    assert archive.hashes_file.exists()
+
+    assert not archive.create(artifacts), "nothing changed"
+
+    # Same content, new modification time
+    main_elf = artifacts.build_dir / "main.elf"
+    main_elf.write_bytes(main_elf.read_bytes())
+    os.utime(main_elf, ns=(1, 1))
+    assert not archive.create(artifacts)
+
+    main_elf.write_bytes(b"new binary")
+    assert archive.create(artifacts)
+    assert read_zip(archive_file)["main.elf"] == b"new binary"
+
+    assert not archive.create(artifacts)
+    assert ArtifactsArchive(archive_file, level=9).create(artifacts), "the compression settings changed"
+    assert ArtifactsArchive(archive_file, level=9).create(artifacts, force=True)
+
+    archive_file.unlink()
+    assert ArtifactsArchive(archive_file, level=9).create(artifacts), "the archive is missing"
+
+
+def test_create_tar_zst(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    archive_file = tmp_path / "artifacts.tar.zst"
+
+    ArtifactsArchive(archive_file, Compression.ZSTD).create(artifacts)
+
+    with archive_file.open("rb") as archive, zstandard.ZstdDecompressor().stream_reader(archive) as stream, tarfile.open(fileobj=stream, mode="r|") as tar:
+        assert [member.name for member in tar] == [artifact.archive_path.as_posix() for artifact in artifacts]
+
+
+def test_create_tar_zst_without_zstandard(artifacts: ArtifactsCollection, tmp_path: Path) -> None:
+    with patch.dict(sys.modules, {"zstandard": None}), pytest.raises(UserNotificationException, match="zstandard"):
+        ArtifactsArchive(tmp_path / "artifacts.tar.zst", Compression.ZSTD).create(artifacts)
+
+
+def test_collect_with_patterns(artifacts: ArtifactsCollection) -> None:
+    build_dir = artifacts.build_dir
+    build_dir.joinpath("reports", "coverage", "index.tmp").write_text("temporary")
+    build_dir.joinpath("reports", "coverage", "src").mkdir()
+    build_dir.joinpath("reports", "coverage", "src", "main.c.html").write_text("source")
+
+    collection = ArtifactsCollection(["reports/**/*.html", "!**/empty.*", Path("main.elf"), "*.elf"], build_dir, exclude=["**/src/*"])
+
+    assert [artifact.archive_path.as_posix() for artifact in collection] == ["reports/coverage/index.html", "main.elf"]
+    assert [artifact.archive_path.as_posix() for artifact in ArtifactsCollection(["reports/*/*.tmp", "*.m?p"], build_dir)] == ["reports/coverage/index.tmp", "main.map"]
+
+
+def test_collect_directory_recursively(artifacts: ArtifactsCollection) -> None:
+    build_dir = artifacts.build_dir
+    build_dir.joinpath("reports", "a.html").write_text("top level")
+
+    collection = ArtifactsCollection(["reports/**"], build_dir)
+
+    assert sorted(artifact.archive_path.as_posix() for artifact in collection) == ["reports/a.html", "reports/coverage/empty.html", "reports/coverage/index.html"]
+
+
+def test_collect_overlapping_artifacts_once(artifacts: ArtifactsCollection) -> None:
+    collection = ArtifactsCollection([Path("reports"), Path("reports/coverage"), "reports/coverage/index.html"], artifacts.build_dir)
+
+    assert [artifact.archive_path.as_posix() for artifact in collection] == ["reports/coverage/empty.html", "reports/coverage/index.html"]
+
+
+def test_collect_outside_build_dir(tmp_path: Path) -> None:
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    tmp_path.joinpath("external", "sub").mkdir(parents=True)
+    tmp_path.joinpath("external", "sub", "tool.exe").write_text("tool")
+
+    collection = ArtifactsCollection([tmp_path / "external", Path("../external/sub/tool.exe"), (tmp_path / "external" / "**" / "*.exe").as_posix()], build_dir)
+
+    assert [(artifact.archive_path, artifact.absolute_path) for artifact in collection] == [(Path("tool.exe"), tmp_path / "external" / "sub" / "tool.exe")]
+
+
+@pytest.mark.parametrize(
+    "pattern, matching, not_matching",
+    [
+        ("**/*.tmp", ["a.tmp", "a/b/c.tmp"], ["a.tmpx", "tmp"]),
+        ("reports/**", ["reports/a", "reports/a/b.html"], ["other/reports/a"]),
+        ("*.[ch]", ["main.c", "main.h"], ["main.o", "dir/main.c"]),
+        ("[!m]*", ["a.c"], ["main.c"]),
+        ("a+b(1).txt", ["a+b(1).txt"], ["aab(1).txt"]),
+    ],
+)
+def test_glob_to_regex(pattern: str, matching: List[str], not_matching: List[str]) -> None:
+    regex = glob_to_regex(pattern)
+    assert all(regex.match(path) for path in matching)
+    assert not any(regex.match(path) for path in not_matching)
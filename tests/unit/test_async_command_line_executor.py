@@ -0,0 +1,66 @@
+import asyncio
+import sys
+import time
+from typing import Optional
+
+from spl_core.common.async_command_line_executor import AsyncCommandLineExecutor, Command
+from spl_core.common.command_line_executor import LogFileSink
+
+
+def python_command(code: str, prefix: str = "", timeout: Optional[float] = None) -> Command:
+    return Command([sys.executable, "-c", code], prefix=prefix, timeout=timeout)
+
+
+def test_execute_all_returns_results_in_order(capsys):
+    commands = [python_command(f"print('command {index}'); exit({index})", prefix=f"[{index}] ") for index in range(4)]
+
+    results = AsyncCommandLineExecutor(max_parallel=2).run(commands)
+
+    assert [result.returncode for result in results] == [0, 1, 2, 3]
+    assert [result.stdout for result in results] == [f"command {index}\n" for index in range(4)]
+    output = capsys.readouterr().out
+    for index in range(4):
+        assert f"[{index}] command {index}\n" in output
+
+
+def test_execute_all_runs_in_parallel():
+    commands = [python_command("import time; time.sleep(0.5)") for _ in range(4)]
+
+    start = time.perf_counter()
+    AsyncCommandLineExecutor(max_parallel=4, echo=False).run(commands)
+    duration = time.perf_counter() - start
+
+    assert duration < 1.5, "the commands shall not run one after the other"
+
+
+def test_max_parallel_limits_running_commands(tmp_path):
+    # Every command registers itself in a directory and records how many are running
+    code = "import os, sys, time; d = sys.argv[1]; f = os.path.join(d, str(os.getpid())); open(f, 'w').close(); print(len(os.listdir(d))); time.sleep(0.2); os.remove(f)"
+    commands = [Command([sys.executable, "-c", code, str(tmp_path)]) for _ in range(6)]
+
+    results = AsyncCommandLineExecutor(max_parallel=2, echo=False).run(commands)
+
+    assert max(int(result.stdout) for result in results) <= 2
+
+
+def test_timeout_kills_command():
+    start = time.perf_counter()
+    (result,) = AsyncCommandLineExecutor(echo=False).run([python_command("import time; print('started', flush=True); time.sleep(30)", timeout=1)])
+
+    assert time.perf_counter() - start < 10
+    assert result.returncode != 0
+    assert "started\n" in result.stdout
+    assert "timed out after 1s" in result.stdout
+
+
+def test_separate_stderr_and_sinks(tmp_path):
+    log_file = tmp_path / "command.log"
+    executor = AsyncCommandLineExecutor(echo=False, separate_stderr=True, max_output_lines=2)
+
+    log_sink = LogFileSink(log_file)
+    result = asyncio.run(executor.execute(python_command("import sys; [print(i) for i in range(5)]; print('error', file=sys.stderr)"), sinks=[log_sink]))
+    log_sink.close()
+
+    assert result.stdout == "3\n4\n"
+    assert result.stderr == "error\n"
+    assert sorted(log_file.read_text().splitlines()) == ["0", "1", "2", "3", "4", "[stderr] error"]
@@ -1,7 +1,16 @@
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from spl_core.test_utils.base_variant_test_runner import BaseVariantTestRunner
+from spl_core.test_utils.build_cache import SESSION_BUILD_CACHE
+
+
+@pytest.fixture(autouse=True)
+def clear_build_cache():
+    # Every test shall build on its own
+    SESSION_BUILD_CACHE.clear()
 
 
 class Test_SomeVariant(BaseVariantTestRunner):
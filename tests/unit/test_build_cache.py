@@ -0,0 +1,59 @@
+from pathlib import Path
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from spl_core.test_utils.build_cache import BuildCache
+
+
+@pytest.fixture
+def build_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> BuildCache:
+    monkeypatch.chdir(tmp_path)
+    return BuildCache()
+
+
+def test_get_build(build_cache: BuildCache, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    spl_build = build_cache.get_build("Flavor/A", "test")
+    assert build_cache.get_build("Flavor/A", "test") is spl_build
+    assert build_cache.get_build("Flavor/A", "prod") is not spl_build
+
+    monkeypatch.chdir(tmp_path.joinpath("..").resolve())
+    assert build_cache.get_build("Flavor/A", "test") is not spl_build, "the build directory depends on the working directory"
+
+
+@patch("spl_core.test_utils.spl_build.SplBuild.execute")
+def test_build_targets_once(mock_execute: MagicMock, build_cache: BuildCache) -> None:
+    mock_execute.return_value = 0
+    spl_build = build_cache.get_build("A", "test")
+
+    assert build_cache.execute(spl_build, "unittests") == 0
+    assert build_cache.execute(spl_build, "all") == 0
+    assert build_cache.execute(spl_build, "unittests") == 0
+    assert build_cache.execute(spl_build, "all") == 0
+    assert mock_execute.call_args_list == [call(target="unittests"), call(target="all")]
+
+    build_cache.clear()
+    assert build_cache.execute(build_cache.get_build("A", "test"), "all") == 0
+    assert mock_execute.call_count == 3
+
+
+@patch("spl_core.test_utils.spl_build.SplBuild.execute")
+def test_covering_target(mock_execute: MagicMock, build_cache: BuildCache) -> None:
+    mock_execute.return_value = 0
+    spl_build = build_cache.get_build("A", "test")
+
+    assert build_cache.execute(spl_build, "all") == 0
+    assert build_cache.execute(spl_build, "unittests") == 0, "all also runs the unit tests"
+    mock_execute.assert_called_once_with(target="all")
+
+
+@patch("spl_core.test_utils.spl_build.SplBuild.execute")
+def test_failed_build(mock_execute: MagicMock, build_cache: BuildCache) -> None:
+    mock_execute.return_value = 1
+    spl_build = build_cache.get_build("A", "test")
+
+    assert build_cache.execute(spl_build, "all") == 1
+    assert build_cache.execute(spl_build, "all") == 1, "a failed build is not repeated"
+    mock_execute.return_value = 0
+    assert build_cache.execute(spl_build, "unittests") == 0, "the unit tests might still succeed"
+    assert mock_execute.call_args_list == [call(target="all"), call(target="unittests")]
@@ -0,0 +1,84 @@
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+from unittest.mock import patch
+
+import pytest
+
+from spl_core.build.orchestrator import BuildOrchestrator, BuildResult, format_summary
+from spl_core.common.async_command_line_executor import Command
+from spl_core.common.command_line_executor import OutputSink
+from spl_core.common.retry_policy import RetryPolicy
+
+
+@pytest.fixture
+def project_dir(tmp_path: Path) -> Path:
+    for variant in ["Flavor/A", "Flavor/B", "C"]:
+        tmp_path.joinpath("variants", variant).mkdir(parents=True)
+        tmp_path.joinpath("variants", variant, "config.cmake").touch()
+    return tmp_path
+
+
+def test_default_variants_and_job_budget(project_dir: Path) -> None:
+    orchestrator = BuildOrchestrator(project_dir, build_kits=["prod", "test"], ninja_jobs=16)
+
+    assert [(build.variant, build.build_kit) for build in orchestrator.builds] == [
+        ("C", "prod"),
+        ("Flavor/A", "prod"),
+        ("Flavor/B", "prod"),
+        ("C", "test"),
+        ("Flavor/A", "test"),
+        ("Flavor/B", "test"),
+    ]
+    assert orchestrator.max_parallel == 4
+    assert orchestrator.jobs_per_build == 4
+    assert orchestrator.get_env()["CMAKE_BUILD_PARALLEL_LEVEL"] == "4"
+
+
+def test_job_budget_is_shared(project_dir: Path) -> None:
+    orchestrator = BuildOrchestrator(project_dir, variants=["C"], ninja_jobs=16, max_parallel=8)
+    assert orchestrator.max_parallel == 1, "there is only one build"
+    assert orchestrator.jobs_per_build == 16
+
+    orchestrator = BuildOrchestrator(project_dir, ninja_jobs=2, max_parallel=3)
+    assert orchestrator.max_parallel == 2, "the builds do not exceed the job budget"
+    assert orchestrator.jobs_per_build == 1
+
+    orchestrator = BuildOrchestrator(project_dir, ninja_jobs=8, max_parallel=3)
+    assert orchestrator.max_parallel == 3
+    assert orchestrator.jobs_per_build == 2
+
+
+def test_run(project_dir: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    executed: List[Command] = []
+    outputs = {"C": [(1, "No valid license"), (0, "")], "Flavor/A": [(2, "error")], "Flavor/B": [(0, "")]}
+
+    async def execute(command: Command, sinks: Optional[List[OutputSink]] = None) -> subprocess.CompletedProcess[str]:
+        executed.append(command)
+        returncode, stdout = outputs[command.cmd[4]].pop(0)
+        return subprocess.CompletedProcess(command.cmd, returncode, stdout)
+
+    with patch("spl_core.common.async_command_line_executor.AsyncCommandLineExecutor.execute", side_effect=execute):
+        results = BuildOrchestrator(project_dir, ninja_jobs=8, retry_policy=RetryPolicy(initial_delay=0)).run()
+
+    assert [(result.variant, result.build_kit, result.returncode, result.retries) for result in results] == [("C", "prod", 0, 1), ("Flavor/A", "prod", 2, 0), ("Flavor/B", "prod", 0, 0)]
+    assert len(executed) == 4, "the build with the license issue shall be retried"
+    assert executed[0].cmd == [str(project_dir / "build.bat"), "-buildKit", "prod", "-variants", "C", "-target", "all", "-reconfigure", "-build"]
+    assert executed[0].env and executed[0].env["CMAKE_BUILD_PARALLEL_LEVEL"] == "4"
+    assert executed[0].cwd == project_dir
+    assert executed[0].prefix == "[C/prod] "
+    output = capsys.readouterr().out
+    assert "[C/prod] Probably a license issue, retrying in 0s ..." in output
+    assert "[3/3]" in output
+    assert "Flavor/A/prod FAILED" in output
+
+
+def test_format_summary() -> None:
+    results = [BuildResult("Flavor/A", "prod", 0, 62.04, Path("a.log"), retries=2), BuildResult("B", "test", 1, 3.0, Path("b.log"))]
+
+    assert format_summary(results).splitlines() == [
+        "Variant  | Build kit | Result     | Duration | Retries",
+        "---------+-----------+------------+----------+--------",
+        "Flavor/A | prod      | success    | 62.0s    | 2",
+        "B        | test      | failed (1) | 3.0s     | 0",
+    ]
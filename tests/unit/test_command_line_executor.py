@@ -1,8 +1,11 @@
+import os
+import sys
 from pathlib import Path
+from typing import List
 
 import pytest
 
-from spl_core.common.command_line_executor import CommandLineExecutor
+from spl_core.common.command_line_executor import STDERR, STDOUT, CommandLineExecutor, LogFileSink, RingBufferSink
 
 
 class TestCommandLineExecuter:
@@ -38,3 +41,52 @@ class TestCommandLineExecuter:
         link_path = test_path.joinpath("link")
         result = CommandLineExecutor().execute(["cmd", "/c", "mklink", "/J", str(link_path), str(test_path)])
         assert result.returncode == 0
+
+    def test_CommandLineExecuter_separate_stderr(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        command = python_script(tmp_path, "import sys; print('out'); print('err', file=sys.stderr)")
+        result = CommandLineExecutor(separate_stderr=True).execute(command)
+        assert result.returncode == 0
+        assert result.stdout == "out\n"
+        assert result.stderr == "err\n"
+        captured = capsys.readouterr()
+        assert "out\n" in captured.out
+        assert captured.err == "err\n"
+
+    def test_CommandLineExecuter_retains_only_tail(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        command = python_script(tmp_path, "for i in range(1000): print(i)")
+        result = CommandLineExecutor(echo=False, max_output_lines=3).execute(command)
+        assert result.returncode == 0
+        assert result.stdout == "997\n998\n999\n"
+        assert capsys.readouterr().out == "", "nothing shall be printed without echo"
+
+    def test_CommandLineExecuter_sinks(self, tmp_path: Path) -> None:
+        log_file = tmp_path / "logs" / "build.log"
+        ring_buffer = RingBufferSink(max_lines=2)
+        command = python_script(tmp_path, "import sys; print('1'); print('2'); print('3'); print('oops', file=sys.stderr)")
+        CommandLineExecutor(sinks=[LogFileSink(log_file), ring_buffer], echo=False, separate_stderr=True).execute(command)
+        assert list(ring_buffer.lines[STDOUT]) == ["2\n", "3\n"]
+        assert list(ring_buffer.lines[STDERR]) == ["oops\n"]
+        log = log_file.read_text().splitlines()
+        assert [line for line in log if not line.startswith("[stderr]")] == ["1", "2", "3"]
+        assert "[stderr] oops" in log
+
+    def test_CommandLineExecuter_does_not_close_caller_sinks(self, tmp_path: Path) -> None:
+        log_file = tmp_path / "build.log"
+        log_sink = LogFileSink(log_file)
+        executor = CommandLineExecutor(sinks=[log_sink], echo=False)
+        executor.execute(python_script(tmp_path, "print('first')"))
+        executor.execute(python_script(tmp_path, "print('second')"))
+        log_sink.close()
+        assert log_file.read_text().splitlines() == ["first", "second"]
+
+    def test_CommandLineExecuter_retains_limited_output_by_default(self, tmp_path: Path) -> None:
+        result = CommandLineExecutor(echo=False).execute(python_script(tmp_path, "for i in range(2000): print(i)"))
+        assert result.stdout.splitlines() == [str(i) for i in range(1000, 2000)]
+
+
+def python_script(tmp_path: Path, code: str) -> List[str]:
+    """Command running the python code. The command is joined to a string, so on Linux the script itself must be executable."""
+    script = tmp_path / "script.py"
+    script.write_text(f"#!{sys.executable}\n{code}\n")
+    script.chmod(0o755)
+    return ["python", str(script)] if os.name == "nt" else [str(script)]
@@ -0,0 +1,83 @@
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from spl_core.coverage.coverage_report import INDEX_FILE, CoverageReports, main, run_gcovr
+
+
+@pytest.fixture
+def tracefiles(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Dict[str, Path]:
+    """One gcovr JSON tracefile per source file of a small project. The gcovr filters are relative to the project directory."""
+    if not (shutil.which("gcc") and shutil.which("gcov")):
+        pytest.skip("gcc and gcov are required")
+    pytest.importorskip("gcovr")
+    monkeypatch.chdir(tmp_path)
+    source_dir = tmp_path / "src"
+    build_dir = tmp_path / "build"
+    source_dir.mkdir()
+    build_dir.mkdir()
+    source_dir.joinpath("a.c").write_text("int a(int x) {\n    if (x > 0) {\n        return 1;\n    }\n    return 0;\n}\n")
+    source_dir.joinpath("b.c").write_text("int b(void) { return 2; }\nint unused(void) { return 3; }\n")
+    source_dir.joinpath("main.c").write_text("int a(int);\nint b(void);\nint main(void) { return a(1) + b() - 3; }\n")
+    subprocess.run(["gcc", "--coverage", "../src/a.c", "../src/b.c", "../src/main.c", "-o", "main"], cwd=build_dir, check=True)  # noqa: S607
+    subprocess.run([str(build_dir / "main")], cwd=build_dir, check=True)
+    tracefiles = {}
+    for name in ["a", "b"]:
+        tracefiles[name] = tmp_path / f"{name}.json"
+        assert run_gcovr(["--root", str(tmp_path), "--filter", f"src/{name}\\.c", "--json", "--output", str(tracefiles[name]), str(build_dir)]) == 0
+    return tracefiles
+
+
+def test_render_component_and_variant_reports(tracefiles: Dict[str, Path], tmp_path: Path) -> None:
+    assert (
+        main(
+            [
+                "--root",
+                str(tmp_path),
+                "--component",
+                str(tracefiles["a"]),
+                str(tmp_path / "first"),
+                str(tmp_path / "report"),
+                "--tracefile",
+                str(tracefiles["b"]),
+                "--variant",
+                str(tmp_path / "variant"),
+                "--",
+                "--html-title",
+                "My Coverage",
+            ]
+        )
+        == 0
+    )
+
+    for output_dir in ["first", "report", "variant"]:
+        assert "My Coverage" in tmp_path.joinpath(output_dir, INDEX_FILE).read_text(), "the gcovr options are used for all reports"
+    first = tmp_path.joinpath("first", INDEX_FILE).read_text()
+    assert "a.c" in first
+    assert "b.c" not in first
+    assert sorted(path.name for path in tmp_path.joinpath("report").iterdir()) == sorted(path.name for path in tmp_path.joinpath("first").iterdir()), "the report is copied"
+    variant = tmp_path.joinpath("variant", INDEX_FILE).read_text()
+    assert "a.c" in variant
+    assert "b.c" in variant
+
+
+def test_gcovr_options_are_honoured(tracefiles: Dict[str, Path], tmp_path: Path) -> None:
+    args = ["--root", str(tmp_path), "--tracefile", str(tracefiles["a"]), "--tracefile", str(tracefiles["b"]), "--variant", str(tmp_path / "variant")]
+
+    assert main([*args, "--", "--exclude", "src/b.c"]) == 0
+    assert "b.c" not in tmp_path.joinpath("variant", INDEX_FILE).read_text()
+
+    assert main([*args, "--", "--fail-under-line", "100"]) != 0, "unused() is not covered"
+
+
+def test_tracefiles_are_added_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    reports = CoverageReports(tmp_path)
+    reports.add_tracefile(Path("coverage.json"))
+    reports.add_tracefile(tmp_path / "coverage.json")
+    reports.add_tracefile(tmp_path / "other.json")
+
+    assert reports.tracefiles == [Path("coverage.json"), tmp_path / "other.json"]
@@ -0,0 +1,84 @@
+import sys
+import textwrap
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from spl_core.kconfig.fixdep import DependencyFixer, get_depfile, main, parse_depfile
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    config_dir = tmp_path / "kconfig/config"
+    config_dir.mkdir(parents=True)
+    for name in ["FOO", "BAR", "TRI"]:
+        config_dir.joinpath(f"{name}.h").write_text("")
+    config_dir.joinpath("symbols.txt").write_text("BAR\nFOO\nTRI\n")
+    tmp_path.joinpath("kconfig/autoconf.h").write_text("#define CONFIG_FOO 1\n#define CONFIG_BAR 1\n")
+    tmp_path.joinpath("src").mkdir()
+    tmp_path.joinpath("src/main.c").write_text('#include "autoconf.h"\n#include "my header.h"\n#if CONFIG_FOO\n#endif\n')
+    tmp_path.joinpath("src/my header.h").write_text("#if defined(CONFIG_TRI_MODULE) || defined(CONFIG_UNKNOWN)\n#endif\n")
+    tmp_path.joinpath("src/other.c").write_text("int main() { return 0; }\n")
+    return tmp_path
+
+
+def test_get_depfile() -> None:
+    assert get_depfile(["gcc", "-MD", "-MT", "main.o", "-MF", "main.o.d", "-c", "main.c"]) == Path("main.o.d")
+    assert get_depfile(["gcc", "-MFmain.o.d", "-c", "main.c"]) == Path("main.o.d")
+    assert get_depfile(["gcc", "-c", "main.c"]) is None
+
+
+def test_parse_depfile() -> None:
+    content = "C:/build/main.o: C:/src/main.c C:/src/my\\ header.h \\\n  C:/src/cost$$.h\n\nC:/src/main.c:\n"
+    assert parse_depfile(content) == ("C:/build/main.o", ["C:/src/main.c", "C:/src/my header.h", "C:/src/cost$.h"])
+
+
+def test_autoconf_dependency_is_replaced(project: Path) -> None:
+    depfile = project / "main.o.d"
+    depfile.write_text(
+        textwrap.dedent(
+            f"""\
+            main.o: {project.as_posix()}/src/main.c {project.as_posix()}/kconfig/autoconf.h \\
+              {project.as_posix()}/src/my\\ header.h
+            """
+        )
+    )
+    assert DependencyFixer(project / "kconfig/autoconf.h", project / "kconfig/config").fix(depfile)
+    config_dir = (project / "kconfig/config").as_posix()
+    assert parse_depfile(depfile.read_text()) == (
+        "main.o",
+        [
+            f"{project.as_posix()}/src/main.c",
+            f"{project.as_posix()}/src/my header.h",
+            f"{config_dir}/FOO.h",
+            f"{config_dir}/TRI.h",
+            f"{config_dir}/symbols.txt",
+        ],
+    )
+
+
+def test_depfile_without_autoconf_is_not_changed(project: Path) -> None:
+    depfile = project / "other.o.d"
+    content = f"other.o: {project.as_posix()}/src/other.c\n"
+    depfile.write_text(content)
+    assert not DependencyFixer(project / "kconfig/autoconf.h", project / "kconfig/config").fix(depfile)
+    assert depfile.read_text() == content
+
+
+def test_main_runs_compiler_and_fixes_depfile(project: Path) -> None:
+    depfile = project / "main.o.d"
+    compiler = f"open(r'{depfile}', 'w').write(r'main.o: {project / 'src/main.c'} {project / 'kconfig/autoconf.h'}')"
+    args = ["fixdep", "--autoconf_header", f"{project / 'kconfig/autoconf.h'}", "--config_dir", f"{project / 'kconfig/config'}", "--", sys.executable, "-c", compiler, "-MF", f"{depfile}"]
+    with patch("sys.argv", args), pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 0
+    assert "FOO.h" in depfile.read_text()
+    assert "autoconf.h" not in depfile.read_text()
+
+
+def test_main_returns_compiler_error(project: Path) -> None:
+    args = ["fixdep", "--autoconf_header", "autoconf.h", "--config_dir", "config", "--", sys.executable, "-c", "exit(3)"]
+    with patch("sys.argv", args), pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 3
@@ -0,0 +1,110 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict
+
+import pytest
+from utils import load_tracefile
+
+from spl_core.coverage.coverage_report import run_gcovr
+from spl_core.coverage.gcov_collector import find_gcda_files, get_batches, get_excluded_lines, get_relative_path, main, parse_gcov_output
+
+
+def gcov_report(working_dir: str, file: str, line_counts: Dict[int, int]) -> str:
+    lines = [{"line_number": line, "count": count, "function_name": "f", "branches": [{"count": count, "fallthrough": True, "throw": False}]} for line, count in line_counts.items()]
+    functions = [{"name": "_Z1fv", "demangled_name": "f()", "start_line": 1, "execution_count": max(line_counts.values())}]
+    return json.dumps({"current_working_directory": working_dir, "files": [{"file": file, "lines": lines, "functions": functions}]})
+
+
+def test_parse_gcov_output(tmp_path: Path) -> None:
+    root = tmp_path / "project"
+    output = "\n".join(
+        [
+            gcov_report(str(root / "build"), "../src/a.c", {1: 1, 2: 0}),
+            gcov_report(str(root / "build"), str(root / "src/a.c"), {1: 2, 3: 0}),
+            gcov_report(str(root / "build"), "/usr/include/stdio.h", {1: 1}),
+        ]
+    )
+    coverage = parse_gcov_output(output, str(root))
+    assert list(coverage) == ["src/a.c"], "only the files below the root are collected"
+    assert coverage["src/a.c"].lines == {1: 3, 2: 0, 3: 0}
+    assert coverage["src/a.c"].branches == {1: [3], 2: [0], 3: [0]}
+    assert coverage["src/a.c"].functions == {("f()", 1): 3}
+
+
+def test_get_relative_path(tmp_path: Path) -> None:
+    assert get_relative_path("../src/a.c", str(tmp_path / "build"), str(tmp_path)) == "src/a.c"
+    assert get_relative_path("../../a.c", str(tmp_path / "build"), str(tmp_path)) is None
+
+
+def test_get_batches() -> None:
+    files = [f"{index}.gcda" for index in range(10)]
+    assert get_batches(files, jobs=2, batch_size=32) == [files[:5], files[5:]]
+    assert get_batches(files, jobs=1, batch_size=4) == [files[:4], files[4:8], files[8:]]
+    assert get_batches([], jobs=4) == []
+
+
+def test_get_excluded_lines() -> None:
+    source = ["int a;", "int b; // GCOVR_EXCL_LINE", "// LCOV_EXCL_START", "int c;", "// LCOV_EXCL_STOP", "int d;"]
+    assert get_excluded_lines(source) == {2, 3, 4, 5}
+
+
+def test_find_gcda_files(tmp_path: Path) -> None:
+    for file in ["a.gcda", "a.gcno", "sub/b.gcda", "sub/deeper/c.gcda"]:
+        tmp_path.joinpath(file).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(file).touch()
+    assert [Path(file).relative_to(tmp_path).as_posix() for file in find_gcda_files(tmp_path)] == ["a.gcda", "sub/b.gcda", "sub/deeper/c.gcda"]
+
+
+@pytest.fixture
+def build_dir(tmp_path: Path) -> Path:
+    """Build directory with the gcda files of a small project, the sources are in tmp_path/src."""
+    if not (shutil.which("gcc") and shutil.which("gcov")):
+        pytest.skip("gcc and gcov are required")
+    source_dir = tmp_path / "src"
+    build_dir = tmp_path / "build"
+    source_dir.mkdir()
+    build_dir.mkdir()
+    source_dir.joinpath("a.c").write_text("int f(int x) {\n    if (x > 0) {\n        return 1;\n    }\n    return 0; // GCOVR_EXCL_LINE\n}\nint g(void) { return 2; }\n")
+    source_dir.joinpath("main.c").write_text("int f(int);\nint main(void) { return f(1) - 1; }\n")
+    for name in ["a", "main"]:
+        subprocess.run(["gcc", "--coverage", "-c", f"../src/{name}.c", "-o", f"{name}.o"], cwd=build_dir, check=True)  # noqa: S607
+    subprocess.run(["gcc", "--coverage", "a.o", "main.o", "-o", "main"], cwd=build_dir, check=True)  # noqa: S607
+    subprocess.run([str(build_dir / "main")], cwd=build_dir, check=True)
+    return build_dir
+
+
+def test_collect(build_dir: Path, tmp_path: Path) -> None:
+    tracefile = tmp_path / "coverage.json"
+    assert main([str(build_dir), "--root", str(tmp_path), "--output", str(tracefile), "-j", "2", "--batch-size", "1"]) == 0
+
+    coverage = load_tracefile(tracefile)
+    assert sorted(coverage) == ["src/a.c", "src/main.c"]
+    assert coverage["src/a.c"].lines == {1: 1, 2: 1, 3: 1, 7: 0}
+    assert coverage["src/a.c"].branches == {(2, 0): 1, (2, 1): 0}
+    assert coverage["src/a.c"].functions == {("f", 1): 1, ("g", 7): 0}
+
+
+def test_gcovr_options_are_honoured(build_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("gcovr")
+    # The gcovr filters are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    tracefile = tmp_path / "coverage.json"
+    assert main([str(build_dir), "--root", str(tmp_path), "--output", str(tracefile), "--", "--exclude", "src/main\\.c"]) == 0
+
+    coverage = load_tracefile(tracefile)
+    assert sorted(coverage) == ["src/a.c"], "the tracefile is written by gcovr with the excludes"
+    assert coverage["src/a.c"].lines == {1: 1, 2: 1, 3: 1, 7: 0}, "the exclusion markers are honoured as well"
+
+
+def test_tracefile_is_read_by_gcovr(build_dir: Path, tmp_path: Path) -> None:
+    pytest.importorskip("gcovr")
+    tracefile = tmp_path / "coverage.json"
+    assert main([str(build_dir), "--root", str(tmp_path), "--output", str(tracefile)]) == 0
+
+    summary_file = tmp_path / "summary.json"
+    assert run_gcovr(["--root", str(tmp_path), "--add-tracefile", str(tracefile), "--json-summary", str(summary_file)]) == 0
+    summary = {file["filename"]: file for file in json.loads(summary_file.read_text())["files"]}
+    assert sorted(summary) == ["src/a.c", "src/main.c"]
+    assert (summary["src/a.c"]["line_covered"], summary["src/a.c"]["line_total"]) == (3, 4)
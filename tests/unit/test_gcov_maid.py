@@ -1,8 +1,10 @@
+import json
 import os
+from unittest.mock import patch
 
 import pytest
 
-from spl_core.gcov_maid.gcov_maid import wipe_gcda_files, wipe_gcno_files
+from spl_core.gcov_maid.gcov_maid import delete_files, load_object_index, wipe_coverage_files, wipe_gcda_files, wipe_gcno_files
 
 
 @pytest.fixture
@@ -68,3 +70,117 @@ def test_wipe_gcda_files(temp_dir):
     # Check that the other files are not deleted
     assert other_files[0].exists()
     assert other_files[1].exists()
+
+
+def test_wipe_coverage_files_in_one_walk(temp_dir, capsys):
+    files = {
+        "file1.c.gcda": "1234",
+        "file1.c.gcno": "",
+        "file1.c.obj": "",
+        "subdir/file2.c.gcda": "12",
+        "subdir/file2.c.gcno": "123",
+        "subdir/deeper/file3.c.gcno": "",
+        "subdir/deeper/file3.c.obj": "",
+    }
+    for name, content in files.items():
+        os.makedirs((temp_dir / name).parent, exist_ok=True)
+        (temp_dir / name).write_text(content)
+
+    with patch("os.scandir", wraps=os.scandir) as scandir:
+        result = wipe_coverage_files(temp_dir, dry_run=True)
+        assert scandir.call_count == 3, "every directory shall be listed only once"
+    assert sorted(result.gcda_files) == sorted([str(temp_dir / "file1.c.gcda"), str(temp_dir / "subdir" / "file2.c.gcda")])
+    assert result.gcda_bytes == 6
+    assert result.orphaned_gcno_files == [str(temp_dir / "subdir" / "file2.c.gcno")]
+    assert result.orphaned_gcno_bytes == 3
+    assert "Would delete 2 obsolete coverage data files (0.0 KB) and 1 obsolete coverage notes files (0.0 KB)" in capsys.readouterr().out
+    for name in files:
+        assert (temp_dir / name).exists(), "dry run shall not delete anything"
+
+    wipe_coverage_files(temp_dir)
+    assert "Deleted 2 obsolete coverage data files" in capsys.readouterr().out
+    remaining = sorted(path.relative_to(temp_dir).as_posix() for path in temp_dir.rglob("*") if path.is_file())
+    assert remaining == ["file1.c.gcno", "file1.c.obj", "subdir/deeper/file3.c.gcno", "subdir/deeper/file3.c.obj"]
+
+
+def test_delete_files_in_batches(temp_dir):
+    files = [temp_dir / f"file{index}.gcda" for index in range(10)]
+    for file in files:
+        file.touch()
+    assert delete_files([str(file) for file in files] + [str(temp_dir / "missing.gcda")], batch_size=3) == 10
+    assert not any(file.exists() for file in files)
+
+
+def test_load_object_index_from_compile_commands(temp_dir):
+    compile_commands = [
+        {"directory": str(temp_dir), "command": "gcc -c -o CMakeFiles/comp.dir/src/a.c.obj src/a.c", "file": "src/a.c"},
+        {"directory": str(temp_dir), "arguments": ["gcc", "-c", "-oCMakeFiles/comp.dir/src/b.c.o", "src/b.c"], "file": "src/b.c"},
+        {"directory": str(temp_dir / "sub"), "command": "gcc -c src/c.c", "file": "src/c.c", "output": "c.c.obj"},
+        {"directory": str(temp_dir), "command": "gcc -E src/d.c", "file": "src/d.c"},
+    ]
+    (temp_dir / "compile_commands.json").write_text(json.dumps(compile_commands))
+
+    index = load_object_index(temp_dir)
+
+    assert index == {
+        os.path.normcase(str(temp_dir / "CMakeFiles/comp.dir/src/a.c")),
+        os.path.normcase(str(temp_dir / "CMakeFiles/comp.dir/src/b.c")),
+        os.path.normcase(str(temp_dir / "sub" / "c.c")),
+    }
+
+
+def test_load_object_index_of_a_component(temp_dir):
+    compile_commands = [
+        # Ninja: the commands run in the build directory
+        {"directory": str(temp_dir), "command": "gcc -c -o comp/CMakeFiles/comp.dir/src/a.c.o src/a.c", "file": "src/a.c"},
+        {"directory": str(temp_dir), "command": "gcc -c -o other/CMakeFiles/other.dir/src/b.c.o src/b.c", "file": "src/b.c"},
+        # Makefiles: the commands run in the build directory of the component
+        {"directory": str(temp_dir / "comp"), "command": "gcc -c -o CMakeFiles/comp.dir/src/c.c.o src/c.c", "file": "src/c.c"},
+        {"directory": str(temp_dir / "other"), "command": "gcc -c -o CMakeFiles/other.dir/src/d.c.o src/d.c", "file": "src/d.c"},
+    ]
+    (temp_dir / "compile_commands.json").write_text(json.dumps(compile_commands))
+
+    index = load_object_index(temp_dir, temp_dir / "comp")
+
+    assert index == {
+        os.path.normcase(str(temp_dir / "comp/CMakeFiles/comp.dir/src/a.c")),
+        os.path.normcase(str(temp_dir / "comp/CMakeFiles/comp.dir/src/c.c")),
+    }
+
+
+def test_wipe_gcno_files_next_to_any_object_file(temp_dir):
+    for file in ["a.c.gcno", "a.c.o", "b.c.gcno", "b.c.obj", "c.c.gcno"]:
+        (temp_dir / file).touch()
+
+    wipe_gcno_files(temp_dir)
+
+    assert sorted(path.name for path in temp_dir.iterdir()) == ["a.c.gcno", "a.c.o", "b.c.gcno", "b.c.obj"]
+
+
+def test_load_object_index_without_build_graph(temp_dir):
+    assert load_object_index(temp_dir) is None
+
+
+def test_wipe_coverage_files_not_in_object_index(temp_dir, capsys):
+    files = [
+        "comp.dir/a.c.gcno",
+        "comp.dir/a.c.gcda",
+        "comp.dir/a.c.o",
+        "comp.dir/removed.c.gcno",
+        "comp.dir/removed.c.gcda",
+        "comp.dir/removed.c.obj",
+    ]
+    for name in files:
+        os.makedirs((temp_dir / name).parent, exist_ok=True)
+        (temp_dir / name).write_text("12")
+    # removed.c is no longer part of the build although its stale object file still exists
+    object_index = {os.path.normcase(str(temp_dir / "comp.dir" / "a.c"))}
+
+    result = wipe_coverage_files(temp_dir, wipe_gcda=False, wipe_gcno=True, object_index=object_index, wipe_orphaned_gcda=True)
+
+    assert result.orphaned_gcno_files == [str(temp_dir / "comp.dir" / "removed.c.gcno")]
+    assert result.orphaned_gcda_files == [str(temp_dir / "comp.dir" / "removed.c.gcda")]
+    assert result.orphaned_gcda_bytes == 2
+    assert "Deleted 1 obsolete coverage notes files (0.0 KB) and 1 orphaned coverage data files (0.0 KB)" in capsys.readouterr().out
+    remaining = sorted(path.relative_to(temp_dir).as_posix() for path in temp_dir.rglob("*") if path.is_file())
+    assert remaining == ["comp.dir/a.c.gcda", "comp.dir/a.c.gcno", "comp.dir/a.c.o", "comp.dir/removed.c.obj"]
@@ -1,9 +1,11 @@
+import json
 import os
 import textwrap
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
+from py_app_dev.core.exceptions import UserNotificationException
 from utils import create_clean_test_dir
 
 from spl_core.kconfig.kconfig import (
@@ -11,9 +13,14 @@ from spl_core.kconfig.kconfig import (
     ConfigElement,
     ConfigElementType,
     ConfigurationData,
+    ConfigurationRenderer,
+    ContentHashStore,
+    GeneratedFile,
     HeaderWriter,
     JsonWriter,
     KConfig,
+    KConfigCache,
+    SplitHeaderWriter,
     TriState,
     main,
 )
@@ -78,6 +85,96 @@ def test_create_configuration_data_with_variables(tmp_path: Path) -> None:
     assert iut.config.elements[1].value == "Variable: John Smith, environment variable: MY_ENV_VAR_VALUE"
 
 
+def test_variables_are_resolved_independent_of_declaration_order(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+    config FULL_NAME
+        string "Uses a variable declared later which is itself not yet resolved"
+        default "${FIRST_NAME} ${LAST_NAME}"
+    config FIRST_NAME
+        string "Description"
+        default "${TITLE} John"
+    config LAST_NAME
+        string "Description"
+        default "Smith from ${ENV:MY_CITY}"
+    config TITLE
+        string "Description"
+        default "Dr."
+    config MY_INT
+        int "Description"
+        default 13
+    config WITH_INT
+        string "Description"
+        default "Number ${MY_INT}"
+    """
+    )
+    os.environ["MY_CITY"] = "Berlin"
+    iut = KConfig(feature_model_file)
+    assert [element.value for element in iut.config.elements] == [
+        "Dr. John Smith from Berlin",
+        "Dr. John",
+        "Smith from Berlin",
+        "Dr.",
+        13,
+        "Number 13",
+    ]
+    assert iut.referenced_env_vars == {"MY_CITY"}
+
+
+def test_variables_of_symbols_defined_in_several_places(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+    config NAME
+        string "Description"
+        default "x${B}"
+    config B
+        string "Description"
+        default "bee"
+    menu "More"
+    config NAME
+        string "Description"
+        default "x${B}"
+    endmenu
+    """
+    )
+    iut = KConfig(feature_model_file)
+    assert [(element.name, element.value) for element in iut.config.elements] == [("NAME", "xbee"), ("B", "bee"), ("NAME", "xbee")]
+
+
+def test_variables_with_cyclic_reference(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+    config FIRST
+        string "Description"
+        default "${SECOND}"
+    config SECOND
+        string "Description"
+        default "${THIRD}"
+    config THIRD
+        string "Description"
+        default "${SECOND}"
+    """
+    )
+    with pytest.raises(UserNotificationException, match="SECOND -> THIRD -> SECOND"):
+        KConfig(feature_model_file)
+
+
+def test_variables_with_unknown_reference(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+    config NAME
+        string "Description"
+        default "${UNKNOWN}"
+    """
+    )
+    with pytest.raises(UserNotificationException, match="'NAME' references unknown variable 'UNKNOWN'"):
+        KConfig(feature_model_file)
+
+
 def test_header_writer(tmp_path: Path, configuration_data: ConfigurationData) -> None:
     header_file = tmp_path / "my_file.h"
     writer = HeaderWriter(header_file)
@@ -137,6 +234,64 @@ def test_header_file_written_when_changed(tmp_path: Path) -> None:
     assert header_file.read_text() != "Modified content", "the file should have been updated because the content changed"
 
 
+def test_split_header_writer(tmp_path: Path, configuration_data: ConfigurationData) -> None:
+    out_dir = tmp_path / "config"
+    writer = SplitHeaderWriter(out_dir)
+    writer.write(configuration_data)
+    assert out_dir.joinpath("NAME.h").read_text() == '/** NAME */\n#define CONFIG_NAME "John Smith"\n'
+    assert out_dir.joinpath("STATUS_NOT_SET.h").read_text() == "/** STATUS_NOT_SET */\n/* CONFIG_STATUS_NOT_SET is not set */\n"
+    assert out_dir.joinpath("symbols.txt").read_text() == "MY_HEX\nMY_INT\nNAME\nSTATUS_NOT_SET\nSTATUS_SET\n"
+
+    timestamps = {file.name: file.stat().st_mtime_ns for file in out_dir.iterdir()}
+    configuration_data.elements[3].value = 14
+    del configuration_data.elements[0]
+    writer.write(configuration_data)
+    assert out_dir.joinpath("MY_INT.h").read_text() == "/** MY_INT */\n#define CONFIG_MY_INT 14\n"
+    assert not out_dir.joinpath("NAME.h").exists(), "headers of removed elements shall be deleted"
+    for name in ["STATUS_SET.h", "STATUS_NOT_SET.h", "MY_HEX.h"]:
+        assert out_dir.joinpath(name).stat().st_mtime_ns == timestamps[name], f"{name} shall not be written if its value did not change"
+
+
+def test_generated_file_is_replaced_atomically(tmp_path: Path) -> None:
+    file = tmp_path / "gen/file.txt"
+    GeneratedFile(file, "first").to_file()
+    with patch("os.replace", wraps=os.replace) as replace:
+        GeneratedFile(file, "second").to_file()
+        replace.assert_called_once()
+    assert file.read_text() == "second"
+    assert [path.name for path in file.parent.iterdir()] == ["file.txt"], "no temporary files shall be left"
+
+
+def test_hash_store_avoids_reading_unchanged_files(tmp_path: Path) -> None:
+    hash_store = ContentHashStore(tmp_path / "hashes.json")
+    file = tmp_path / "file.txt"
+    GeneratedFile(file, "content", skip_writing_if_unchanged=True, hash_store=hash_store).to_file()
+    hash_store.save()
+
+    hash_store = ContentHashStore(tmp_path / "hashes.json")
+    timestamp = file.stat().st_mtime_ns
+    with patch("pathlib.Path.read_text", side_effect=AssertionError("shall not be read")):
+        GeneratedFile(file, "content", skip_writing_if_unchanged=True, hash_store=hash_store).to_file()
+    assert file.stat().st_mtime_ns == timestamp
+
+    # A file modified by someone else is detected by its size and modification time
+    file.write_text("modified")
+    GeneratedFile(file, "content", skip_writing_if_unchanged=True, hash_store=hash_store).to_file()
+    assert file.read_text() == "content"
+
+
+def test_renderer_walks_elements_once_for_all_writers(tmp_path: Path, configuration_data: ConfigurationData) -> None:
+    hash_store = ContentHashStore(tmp_path / "hashes.json")
+    writers = [HeaderWriter(tmp_path / "autoconf.h", hash_store), JsonWriter(tmp_path / "autoconf.json", hash_store), CMakeWriter(tmp_path / "autoconf.cmake", hash_store)]
+    elements = MagicMock(wraps=configuration_data.elements)
+    elements.__iter__.side_effect = lambda: iter(configuration_data.elements)
+    ConfigurationRenderer(writers, hash_store).render(ConfigurationData(elements))
+    assert elements.__iter__.call_count == 1
+    for writer in writers:
+        assert writer.output_file.read_text() == writer.generate_content(configuration_data)
+    assert len(json.loads(hash_store.store_file.read_text())) == 3
+
+
 def test_json_writer(configuration_data: ConfigurationData) -> None:
     writer = JsonWriter(Path("my_file.json"))
     assert writer.generate_content(configuration_data) == textwrap.dedent(
@@ -535,3 +690,139 @@ def test_main():
     assert json_file.exists()
     assert cmake_file.exists()
     assert header_file.exists()
+
+
+def test_cached_configuration_data(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+        config NAME
+            string "Description"
+            default "Path: ${ENV:MY_CACHED_ENV_VAR}"
+        config STATUS
+            bool "Description"
+        config MY_HEX
+            hex "Description"
+            default 0x10
+        source "common.txt"
+        """
+    )
+    common_file = tmp_path / "common.txt"
+    common_file.write_text(
+        """
+        config COMMON_BOOL
+            bool "Description"
+            default y
+        """
+    )
+    user_config = tmp_path / "user.config"
+    user_config.write_text("CONFIG_STATUS=y\n")
+    cache_file = tmp_path / "out/cache.json"
+    os.environ["MY_CACHED_ENV_VAR"] = "first"
+
+    iut = KConfig(feature_model_file, user_config, cache_file=cache_file)
+    assert not iut.from_cache
+    assert cache_file.exists()
+
+    with patch("kconfiglib.Kconfig") as kconfig_mock:
+        cached = KConfig(feature_model_file, user_config, cache_file=cache_file)
+        kconfig_mock.assert_not_called()
+    assert cached.from_cache
+    assert cached.config == iut.config
+
+    # Changing a sourced file invalidates the cache
+    common_file.write_text(common_file.read_text().replace("default y", "default n"))
+    iut = KConfig(feature_model_file, user_config, cache_file=cache_file)
+    assert not iut.from_cache
+    assert iut.config.elements[-1] == ConfigElement(ConfigElementType.BOOL, "COMMON_BOOL", TriState.N)
+    assert KConfig(feature_model_file, user_config, cache_file=cache_file).from_cache
+
+    # Changing the user configuration invalidates the cache
+    user_config.write_text("CONFIG_STATUS=n\n")
+    assert not KConfig(feature_model_file, user_config, cache_file=cache_file).from_cache
+
+    # Changing a referenced environment variable invalidates the cache
+    os.environ["MY_CACHED_ENV_VAR"] = "second"
+    iut = KConfig(feature_model_file, user_config, cache_file=cache_file)
+    assert not iut.from_cache
+    assert iut.config.elements[0].value == "Path: second"
+
+    # Using another configuration file invalidates the cache
+    assert not KConfig(feature_model_file, cache_file=cache_file).from_cache
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+        config STATUS
+            bool "Description"
+            default y
+        """
+    )
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_text("{ not json")
+    assert KConfigCache(cache_file).load(feature_model_file, None) is None
+    iut = KConfig(feature_model_file, cache_file=cache_file)
+    assert not iut.from_cache
+    assert iut.config.elements == [ConfigElement(ConfigElementType.BOOL, "STATUS", TriState.Y)]
+
+
+def test_main_does_not_touch_outputs_when_cached(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+        config FIRST_BOOL
+            bool "You can select FIRST_BOOL"
+            default y
+        """
+    )
+    header_file = tmp_path / "gen/header.h"
+    json_file = tmp_path / "gen/features.json"
+    cache_file = tmp_path / "gen/cache.json"
+    args = [
+        "kconfig",
+        "--kconfig_model_file",
+        f"{feature_model_file}",
+        "--out_header_file",
+        f"{header_file}",
+        "--out_json_file",
+        f"{json_file}",
+        "--cache_file",
+        f"{cache_file}",
+    ]
+    with patch("sys.argv", args):
+        main()
+    timestamp = header_file.stat().st_mtime_ns
+    json_file.unlink()
+    with patch("sys.argv", args), patch("spl_core.kconfig.kconfig.HeaderWriter.add_element") as add_element:
+        main()
+        add_element.assert_not_called()
+    assert header_file.stat().st_mtime_ns == timestamp
+    assert json_file.exists(), "missing outputs shall be recreated from the cache"
+
+
+def test_load_other_config_file_into_parsed_model(tmp_path: Path) -> None:
+    feature_model_file = tmp_path / "kconfig.txt"
+    feature_model_file.write_text(
+        """
+        config FIRST_BOOL
+            bool "Description"
+        config NAME
+            string "Description"
+            default "Default"
+        """
+    )
+    first_config = tmp_path / "first.config"
+    first_config.write_text('CONFIG_FIRST_BOOL=y\nCONFIG_NAME="First"\n')
+    second_config = tmp_path / "second.config"
+    second_config.write_text("CONFIG_FIRST_BOOL=y\n")
+    iut = KConfig(feature_model_file, first_config)
+    with patch("kconfiglib.Kconfig") as kconfig_mock:
+        assert iut.load(second_config).elements == [
+            ConfigElement(ConfigElementType.BOOL, "FIRST_BOOL", TriState.Y),
+            ConfigElement(ConfigElementType.STRING, "NAME", "Default"),
+        ]
+        assert iut.load(first_config).elements[1].value == "First"
+        assert iut.load().elements[0].value == TriState.N
+        kconfig_mock.assert_not_called()
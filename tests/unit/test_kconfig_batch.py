@@ -0,0 +1,109 @@
+import json
+import os
+import textwrap
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import patch
+
+import kconfiglib
+import pytest
+
+from spl_core.common.variants import find_variants
+from spl_core.kconfig.batch import KConfigBatch, generate_variants, main
+
+
+@pytest.fixture
+def project_dir(tmp_path: Path) -> Path:
+    tmp_path.joinpath("KConfig").write_text(
+        textwrap.dedent(
+            """\
+            config USE_FEATURE
+                bool "Use feature"
+            config NAME
+                string "Name"
+                default "${ENV:VARIANT}"
+            """
+        )
+    )
+    for variant, config in [("VariantA", "CONFIG_USE_FEATURE=y\n"), ("Flavor/VariantB", None), ("VariantC", "CONFIG_NAME=\"Custom\"\n")]:
+        variant_dir = tmp_path.joinpath("variants", variant)
+        variant_dir.mkdir(parents=True)
+        variant_dir.joinpath("config.cmake").write_text("")
+        if config:
+            variant_dir.joinpath("config.txt").write_text(config)
+    return tmp_path
+
+
+def read_features(out_dir: Path, variant: str) -> Dict[str, Any]:
+    return json.loads(out_dir.joinpath(variant, "autoconf.json").read_text())["features"]
+
+
+def test_find_variants(project_dir: Path) -> None:
+    assert find_variants(project_dir / "variants") == ["Flavor/VariantB", "VariantA", "VariantC"]
+
+
+def test_model_is_parsed_once(project_dir: Path) -> None:
+    out_dir = project_dir / "out"
+    batch = KConfigBatch(project_dir / "KConfig", project_dir / "variants", out_dir)
+    with patch("kconfiglib.Kconfig", wraps=kconfiglib.Kconfig) as kconfig_mock:
+        for variant in find_variants(project_dir / "variants"):
+            batch.generate(variant)
+    assert kconfig_mock.call_count == 1
+    # the user selection of one variant shall not leak into the next one
+    assert read_features(out_dir, "VariantA") == {"USE_FEATURE": True, "NAME": "VariantA"}
+    assert read_features(out_dir, "Flavor/VariantB") == {"USE_FEATURE": False, "NAME": "Flavor/VariantB"}
+    assert read_features(out_dir, "VariantC") == {"USE_FEATURE": False, "NAME": "Custom"}
+    for file in ["autoconf.h", "autoconf.json", "autoconf.cmake"]:
+        assert out_dir.joinpath("VariantA", file).exists()
+
+
+def test_variant_environment(project_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    project_dir.joinpath("KConfig").write_text(
+        textwrap.dedent(
+            """\
+            config NAME
+                string "Name"
+                default "${ENV:FLAVOR}|${ENV:SUBSYSTEM}|${ENV:BUILD_KIT}|${ENV:BINARY_BASENAME}|${ENV:CMAKE_SOURCE_DIR}"
+            """
+        )
+    )
+    monkeypatch.setenv("VARIANT", "Caller")
+    monkeypatch.delenv("FLAVOR", raising=False)
+    environment = dict(os.environ)
+    out_dir = project_dir / "out"
+    batch = KConfigBatch(project_dir / "KConfig", project_dir / "variants", out_dir, build_kit="test")
+    batch.generate("Flavor/VariantB")
+    batch.generate("VariantA")
+
+    assert read_features(out_dir, "Flavor/VariantB") == {"NAME": f"Flavor|VariantB|test|Flavor_VariantB|{project_dir.as_posix()}"}
+    assert read_features(out_dir, "VariantA") == {"NAME": f"||test|VariantA|{project_dir.as_posix()}"}
+    assert dict(os.environ) == environment, "the environment of the caller is restored"
+
+
+def test_generate_variants_in_parallel(project_dir: Path) -> None:
+    out_dir = project_dir / "out"
+    variants = find_variants(project_dir / "variants")
+    assert generate_variants(project_dir / "KConfig", project_dir / "variants", out_dir, variants, jobs=2) == variants
+    assert read_features(out_dir, "VariantA") == {"USE_FEATURE": True, "NAME": "VariantA"}
+    assert read_features(out_dir, "VariantC") == {"USE_FEATURE": False, "NAME": "Custom"}
+
+
+def test_main(project_dir: Path) -> None:
+    out_dir = project_dir / "out"
+    with patch(
+        "sys.argv",
+        [
+            "batch",
+            "--kconfig_model_file",
+            f"{project_dir / 'KConfig'}",
+            "--variants_dir",
+            f"{project_dir / 'variants'}",
+            "--out_dir",
+            f"{out_dir}",
+            "--variants",
+            "VariantA",
+        ],
+    ):
+        main()
+    assert out_dir.joinpath("VariantA", "autoconf.h").exists()
+    assert not out_dir.joinpath("VariantC").exists()
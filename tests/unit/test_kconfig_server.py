@@ -0,0 +1,120 @@
+import os
+import sys
+import textwrap
+import threading
+import uuid
+from pathlib import Path
+from typing import Generator
+from unittest.mock import patch
+
+import kconfiglib
+import pytest
+
+from spl_core.kconfig.client import get_authkey_file, main, read_authkey, request
+from spl_core.kconfig.server import KConfigServer
+
+
+def create_address(tmp_path: Path) -> str:
+    if sys.platform == "win32":
+        return rf"\\.\pipe\spl_core_kconfig_test_{uuid.uuid4().hex}"
+    return (tmp_path / "kconfig.sock").as_posix()
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[KConfigServer, None, None]:
+    address = create_address(tmp_path)
+    monkeypatch.setenv("SPL_KCONFIG_SERVER_ADDRESS", address)
+    server = KConfigServer(address)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while request({"command": "ping"}) is None:
+        pass
+    yield server
+    request({"command": "stop"})
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def model_file(tmp_path: Path) -> Path:
+    model_file = tmp_path / "KConfig"
+    model_file.write_text(
+        textwrap.dedent(
+            """\
+            config USE_FEATURE
+                bool "Use feature"
+            config NAME
+                string "Name"
+                default "${ENV:VARIANT}"
+            """
+        )
+    )
+    return model_file
+
+
+def generate(model_file: Path, config_text: str, out_dir: Path) -> None:
+    config_file = out_dir / "config.txt"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    config_file.write_text(config_text)
+    main(["--kconfig_model_file", f"{model_file}", "--kconfig_config_file", f"{config_file}", "--out_header_file", f"{out_dir / 'autoconf.h'}"])
+
+
+def test_server_keeps_model_parsed(server: KConfigServer, model_file: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(SystemExit) as exit_info:
+        monkeypatch.setenv("VARIANT", "First")
+        generate(model_file, "CONFIG_USE_FEATURE=y\n", tmp_path / "first")
+    assert exit_info.value.code == 0
+    with patch("kconfiglib.Kconfig", wraps=kconfiglib.Kconfig) as kconfig_mock, pytest.raises(SystemExit) as exit_info:
+        monkeypatch.setenv("VARIANT", "Second")
+        generate(model_file, "", tmp_path / "second")
+        kconfig_mock.assert_not_called()
+    assert exit_info.value.code == 0
+    assert list(server.models) == [model_file]
+    assert "#define CONFIG_USE_FEATURE 1" in (tmp_path / "first/autoconf.h").read_text()
+    assert '#define CONFIG_NAME "First"' in (tmp_path / "first/autoconf.h").read_text()
+    assert "CONFIG_USE_FEATURE" not in (tmp_path / "second/autoconf.h").read_text()
+    assert '#define CONFIG_NAME "Second"' in (tmp_path / "second/autoconf.h").read_text()
+
+    # A changed model file is parsed again
+    model_file.write_text(model_file.read_text().replace('bool "Use feature"', 'bool "Use feature"\n    default y'))
+    with pytest.raises(SystemExit):
+        generate(model_file, "", tmp_path / "second")
+    assert "#define CONFIG_USE_FEATURE 1" in (tmp_path / "second/autoconf.h").read_text()
+
+
+def test_server_reports_errors(server: KConfigServer, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    model_file = tmp_path / "KConfig"
+    model_file.write_text('config NAME\n    string "Name"\n    default "${UNKNOWN}"\n')
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--kconfig_model_file", f"{model_file}", "--out_header_file", f"{tmp_path / 'autoconf.h'}"])
+    assert exit_info.value.code == 1
+    assert "references unknown variable 'UNKNOWN'" in capsys.readouterr().out
+
+
+def test_client_without_server(model_file: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SPL_KCONFIG_SERVER_ADDRESS", create_address(tmp_path))
+    monkeypatch.setenv("VARIANT", "Local")
+    generate(model_file, "CONFIG_USE_FEATURE=y\n", tmp_path / "out")
+    assert '#define CONFIG_NAME "Local"' in (tmp_path / "out/autoconf.h").read_text()
+
+
+def test_server_survives_invalid_request_context(server: KConfigServer, model_file: Path, tmp_path: Path) -> None:
+    cwd = os.getcwd()
+    env = dict(os.environ)
+    response = request({"command": "generate", "args": ["--kconfig_model_file", f"{model_file}"], "cwd": str(tmp_path / "missing"), "env": {"VARIANT": "Missing"}})
+    assert response and response["returncode"] == 1
+    assert os.getcwd() == cwd, "the working directory is restored"
+    assert dict(os.environ) == env, "the environment is restored"
+    assert request({"command": "ping"}) == {"returncode": 0, "output": ""}
+
+
+def test_server_uses_private_random_authkey(server: KConfigServer) -> None:
+    authkey_file = Path(get_authkey_file(server.address))
+    if sys.platform != "win32":
+        assert authkey_file.stat().st_mode & 0o777 == 0o600
+    authkey = read_authkey(server.address)
+    assert authkey and authkey != b"spl_core.kconfig"
+    if sys.platform != "win32":
+        authkey_file.chmod(0o644)
+        assert read_authkey(server.address) is None, "a key readable by other users is not trusted"
+        assert request({"command": "ping"}) is None
+        authkey_file.chmod(0o600)
@@ -1,11 +1,12 @@
 from pathlib import Path
 from typing import List
+from unittest.mock import patch
 
 import pytest
 from typer.testing import CliRunner
 
 from spl_core import __version__
-from spl_core.main import app
+from spl_core.main import app, commands, main
 
 runner = CliRunner()
 
@@ -46,3 +47,22 @@ def test_help() -> None:
     result = runner.invoke(app, ["--version"])
     assert result.exit_code == 0
     assert f"please {__version__}" in result.output
+
+
+@pytest.mark.parametrize("args", [["--version"], ["-v"]])
+def test_version_fast_path(args: List[str], capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["please", *args]), patch("spl_core.main.create_app") as create_app:
+        main()
+        create_app.assert_not_called()
+    assert capsys.readouterr().out == f"please {__version__}\n"
+
+
+def test_help_fast_path(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["please", "--help"]), patch("spl_core.main.create_app") as create_app:
+        main()
+        create_app.assert_not_called()
+    output = capsys.readouterr().out
+    assert "Usage: please" in output
+    for command in commands:
+        assert command in output, "all commands shall be listed in the fast help"
+    assert [command.help for command in app.registered_commands] == list(commands.values())
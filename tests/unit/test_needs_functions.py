@@ -0,0 +1,66 @@
+import re
+from typing import Any, Dict, List
+
+from spl_core.sphinx_builder.needs_functions import NeedsIndex, get_needs_index, tr_link
+
+
+def linear_tr_link(need: Dict[str, Any], needs: Dict[str, Dict[str, Any]], first_option_name: str, second_option_name: str) -> List[str]:
+    """The previous implementation of the kickstart conf.py, scanning all needs."""
+    links = []
+    first_option_value = need[first_option_name]
+    for need_target in needs.values():
+        if need_target["id"] == need["id"] or second_option_name not in need_target:
+            continue
+        second_option_value = need_target[second_option_name]
+        if second_option_value:
+            if first_option_value == second_option_value:
+                links.append(need_target["id"])
+            elif "*" in first_option_value and re.match(first_option_value, second_option_value):
+                links.append(need_target["id"])
+    return links
+
+
+def create_needs() -> Dict[str, Dict[str, Any]]:
+    needs = [
+        {"id": "T_1", "title": "GreeterTest.Hello", "case": ""},
+        {"id": "T_2", "title": "GreeterTest.*", "case": ""},
+        {"id": "TR_1", "title": "Result 1", "case": "GreeterTest.Hello"},
+        {"id": "TR_2", "title": "Result 2", "case": "GreeterTest.Bye"},
+        {"id": "TR_3", "title": "Result 3", "case": "OtherTest.Hello"},
+        {"id": "TR_4", "title": "Result 4", "case": "GreeterTest.Hello"},
+        {"id": "TR_5", "title": "Result 5", "case": "GreeterTest.*"},
+        {"id": "X_1", "title": "No case"},
+    ]
+    return {need["id"]: need for need in needs}
+
+
+def test_tr_link_matches_linear_implementation() -> None:
+    needs = create_needs()
+    for need in needs.values():
+        assert tr_link(None, need, needs, "title", "case") == linear_tr_link(need, needs, "title", "case"), need["id"]
+
+
+def test_tr_link() -> None:
+    needs = create_needs()
+    assert tr_link(None, needs["T_1"], needs, "title", "case") == ["TR_1", "TR_4"]
+    assert tr_link(None, needs["T_2"], needs, "title", "case") == ["TR_1", "TR_2", "TR_4", "TR_5"]
+    assert tr_link(None, needs["X_1"], needs, "case", "title") == ""
+    assert tr_link(None, needs["T_1"], needs, "case", "title") == []
+
+
+def test_needs_index_is_rebuilt_for_other_needs() -> None:
+    needs = create_needs()
+    index = get_needs_index(needs, "case")
+    assert get_needs_index(needs, "case") is index
+    assert get_needs_index(create_needs(), "case") is not index
+
+    needs["TR_6"] = {"id": "TR_6", "case": "GreeterTest.Hello"}
+    assert not index.is_valid_for(needs)
+    assert tr_link(None, needs["T_1"], needs, "title", "case") == ["TR_1", "TR_4", "TR_6"]
+
+
+def test_needs_index_caches_pattern_matches() -> None:
+    index = NeedsIndex(create_needs(), "case")
+    assert index.find("GreeterTest.By*") == ["TR_2"]
+    assert index.find("GreeterTest.By*") is index.find("GreeterTest.By*")
+    assert index.find("Unknown") == []
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from spl_core.common.command_line_executor import STDOUT
+from spl_core.common.retry_policy import RegexMatcher, RetryPolicy, RetryScheduler, SubstringMatcher
+
+
+def test_delay_grows_exponentially_up_to_max_delay():
+    policy = RetryPolicy(initial_delay=10, max_delay=60, backoff_factor=2, jitter=0)
+    assert [policy.get_delay(retry) for retry in range(1, 6)] == [10, 20, 40, 60, 60]
+
+
+def test_jitter_spreads_the_delay():
+    policy = RetryPolicy(initial_delay=10, jitter=0.5)
+    delays = {policy.get_delay(1) for _ in range(20)}
+    assert len(delays) > 1, "parallel jobs shall not retry in lockstep"
+    assert all(5 <= delay <= 10 for delay in delays)
+
+
+def test_matchers_on_streamed_lines():
+    policy = RetryPolicy(matchers=[SubstringMatcher("No valid license"), RegexMatcher(r"license server .* not reachable")])
+    sink = policy.create_sink()
+    for line in ["compiling main.c\n", "error: license server lic01 not reachable\n", "No valid license\n"]:
+        sink.write(line, STDOUT)
+    assert sink.matched_line == "error: license server lic01 not reachable", "the first matching line shall be kept"
+    assert policy.matches("a\nNo valid license\nb") == "No valid license"
+    assert policy.matches("compile error") is None
+
+
+def test_scheduler_stops_at_max_attempts():
+    scheduler = RetryScheduler(RetryPolicy(max_attempts=3, initial_delay=1, jitter=0))
+    assert scheduler.next_delay(1, "No valid license") == 1
+    assert scheduler.next_delay(1, "No valid license") == 2
+    assert scheduler.next_delay(1, "No valid license") is None
+    assert scheduler.report.to_dict() == {"attempts": 3, "retries": 2, "wait_time": 3, "retry_reasons": ["No valid license"] * 2, "gave_up": True}
+
+
+def test_scheduler_does_not_retry_other_failures_or_success():
+    scheduler = RetryScheduler(RetryPolicy())
+    assert scheduler.next_delay(2, None) is None
+    assert not scheduler.report.gave_up
+    assert RetryScheduler(RetryPolicy()).next_delay(0, "No valid license") is None
+
+
+def test_scheduler_respects_deadline():
+    scheduler = RetryScheduler(RetryPolicy(initial_delay=10, jitter=0, deadline=15))
+    with patch("time.monotonic", return_value=scheduler.start + 4):
+        assert scheduler.next_delay(1, "No valid license") == 10
+    with patch("time.monotonic", return_value=scheduler.start + 14):
+        assert scheduler.next_delay(1, "No valid license") is None, "the next retry would start after the deadline"
+    assert scheduler.report.gave_up
@@ -0,0 +1,176 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from spl_core.sphinx_builder.sphinx_builder import IncrementalSphinxBuild, build_targets, find_data_files, get_context_hash, main
+
+CONF_PY = """
+import json
+import os
+
+html_context = {"build_config": json.loads(open(os.environ["SPHINX_BUILD_CONFIGURATION_FILE"]).read())}
+
+
+def rstjinja(app, docname, source):
+    source[0] = app.builder.templates.render_string(source[0], app.config.html_context)
+
+
+def setup(app):
+    app.connect("source-read", rstjinja)
+"""
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    pytest.importorskip("sphinx")
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    source_dir.joinpath("conf.py").write_text(CONF_PY)
+    source_dir.joinpath("index.rst").write_text("Index\n=====\n\n.. toctree::\n\n   static\n   jinja\n   data\n")
+    source_dir.joinpath("static.rst").write_text("Static\n======\n\nNo templates here.\n")
+    source_dir.joinpath("jinja.rst").write_text("Jinja\n=====\n\nVariant {{ build_config.variant }}\n")
+    source_dir.joinpath("data.rst").write_text("Data\n====\n\n..\n   :file: results.xml\n")
+    source_dir.joinpath("results.xml").write_text("<testsuites/>")
+    config_file = tmp_path / "config.json"
+    config_file.write_text('{"variant": "A"}')
+    monkeypatch.setenv("SPHINX_BUILD_CONFIGURATION_FILE", str(config_file))
+    monkeypatch.delenv("AUTOCONF_JSON_FILE", raising=False)
+    monkeypatch.delenv("VARIANT", raising=False)
+    return source_dir
+
+
+def doctree_times(build: IncrementalSphinxBuild) -> Dict[str, int]:
+    return {doctree.stem: doctree.stat().st_mtime_ns for doctree in build.doctree_dir.glob("*.doctree")}
+
+
+def read_documents(build: IncrementalSphinxBuild) -> List[str]:
+    before = doctree_times(build)
+    assert build.run() == 0
+    return sorted(name for name, mtime in doctree_times(build).items() if before.get(name) != mtime)
+
+
+def test_incremental_build(project: Path, tmp_path: Path) -> None:
+    build = IncrementalSphinxBuild(project, tmp_path / "html")
+
+    assert read_documents(build) == ["data", "index", "jinja", "static"]
+    assert read_documents(build) == [], "nothing changed"
+
+    tmp_path.joinpath("config.json").write_text('{"variant": "B"}')
+    assert read_documents(build) == ["jinja"], "only the documents using the context are read again"
+    assert "Variant B" in (tmp_path / "html" / "jinja.html").read_text()
+
+    time.sleep(0.01)
+    (project / "results.xml").write_text("<testsuites></testsuites>")
+    assert read_documents(build) == ["data"], "the data file is a dependency of the document"
+
+    assert IncrementalSphinxBuild(project, tmp_path / "html", fresh=True).run() == 0
+    assert read_documents(build) == []
+
+
+NEEDS_CONF_PY = """
+from spl_core.sphinx_builder.needs_functions import tr_link
+
+extensions = ["sphinx_needs", "sphinxcontrib.test_reports"]
+tr_report_template = "report_template.txt"
+needs_types = [dict(directive="test", title="Test Case", prefix="T_", color="#DCB239", style="node")]
+needs_extra_links = [{"option": "results", "incoming": "is resulted from", "outgoing": "results"}]
+needs_functions = [tr_link]
+needs_global_options = {"results": "[[tr_link('title', 'case')]]"}
+"""
+
+JUNIT_XML = """<testsuites>
+<testsuite name="GreeterTest" tests="1" failures="0" errors="0" skipped="0" time="0"><testcase name="{case}" classname="GreeterTest" time="0"/></testsuite>
+</testsuites>
+"""
+
+
+def test_needs_queries_are_updated(tmp_path: Path) -> None:
+    pytest.importorskip("sphinx_needs")
+    pytest.importorskip("sphinxcontrib.test_reports")
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    source_dir.joinpath("conf.py").write_text(NEEDS_CONF_PY)
+    source_dir.joinpath("report_template.txt").write_text(".. {file_type}:: {title}\n   :id: {id}{links_string}\n   :tags: {tags}\n   :file: {file}\n   :auto_suites:\n   :auto_cases:\n")
+    source_dir.joinpath("index.rst").write_text("Index\n=====\n\n.. toctree::\n\n   unit_test_spec\n   unit_test_details\n   unit_test_results\n")
+    # Same documents as the component reports in common.cmake
+    source_dir.joinpath("unit_test_spec.rst").write_text(
+        "Unit Test Specification\n=======================\n\n.. test:: Hello\n   :id: T_HELLO\n\n.. needtable::\n   :filter: type == 'test'\n   :columns: id, title, results\n"
+    )
+    # The results of the need are linked by the dynamic function of the global options, there is no needs query
+    source_dir.joinpath("unit_test_details.rst").write_text("Unit Test Details\n=================\n\n.. test:: Hello\n   :id: T_HELLO_DETAILS\n")
+    source_dir.joinpath("unit_test_results.rst").write_text("Unit Test Results\n=================\n\n.. test-report:: Unit Test Results\n    :id: TEST_RESULT\n    :file: junit.xml\n")
+    source_dir.joinpath("junit.xml").write_text(JUNIT_XML.format(case="Bye"))
+    build = IncrementalSphinxBuild(source_dir, tmp_path / "html")
+
+    assert read_documents(build) == ["index", "unit_test_details", "unit_test_results", "unit_test_spec"]
+    assert "TEST_RESULT_" not in (tmp_path / "html" / "unit_test_spec.html").read_text()
+    assert "TEST_RESULT_" not in (tmp_path / "html" / "unit_test_details.html").read_text()
+
+    time.sleep(0.01)
+    source_dir.joinpath("junit.xml").write_text(JUNIT_XML.format(case="Hello"))
+    assert read_documents(build) == ["unit_test_details", "unit_test_results", "unit_test_spec"], "the needtable and the results links show the needs of the test results"
+    assert "TEST_RESULT_" in (tmp_path / "html" / "unit_test_spec.html").read_text()
+    assert "TEST_RESULT_" in (tmp_path / "html" / "unit_test_details.html").read_text()
+
+    assert read_documents(build) == []
+
+
+def test_parallel_build(project: Path, tmp_path: Path) -> None:
+    assert main([str(project), str(tmp_path / "html"), "-j", "2"]) == 0
+    assert (tmp_path / "html" / "jinja.html").exists()
+
+
+def test_build_targets(project: Path, tmp_path: Path) -> None:
+    targets = []
+    for variant in ["A", "B"]:
+        config_file = tmp_path / f"config_{variant}.json"
+        config_file.write_text(json.dumps({"variant": variant}))
+        targets.append({"config_file": str(config_file), "output_dir": str(tmp_path / variant)})
+    targets_file = tmp_path / "targets.json"
+    targets_file.write_text(json.dumps(targets))
+
+    assert main([str(project), "--targets", str(targets_file)]) == 0
+    assert "Variant A" in (tmp_path / "A" / "jinja.html").read_text()
+    assert "Variant B" in (tmp_path / "B" / "jinja.html").read_text()
+    assert os.environ["SPHINX_BUILD_CONFIGURATION_FILE"] == str(tmp_path / "config.json"), "the environment is restored"
+
+    build = IncrementalSphinxBuild(project, tmp_path / "B")
+    before = doctree_times(build)
+    assert build_targets(project, [(tmp_path / "config_B.json", tmp_path / "B")]) == 0
+    assert doctree_times(build) == before, "every target keeps its incremental environment"
+
+
+def test_get_context_hash(tmp_path: Path) -> None:
+    config_file = tmp_path / "config.json"
+    config_file.write_text("{}")
+    environ = {"SPHINX_BUILD_CONFIGURATION_FILE": str(config_file), "VARIANT": "A"}
+    context_hash = get_context_hash(environ)
+
+    assert get_context_hash(environ) == context_hash
+    assert get_context_hash({**environ, "VARIANT": "B"}) != context_hash
+    config_file.write_text('{"target": "reports"}')
+    assert get_context_hash(environ) != context_hash, "the content of the configuration file is part of the context"
+
+
+def test_find_data_files(tmp_path: Path) -> None:
+    document_dir = tmp_path / "doc"
+    document_dir.mkdir()
+    document_dir.joinpath("local.json").touch()
+    tmp_path.joinpath("root.json").touch()
+    junit_xml = tmp_path / "junit.xml"
+    junit_xml.touch()
+    source = f"""
+.. test-report:: Results
+    :id: RESULTS
+    :file: {junit_xml}
+
+.. datatemplate:json:: local.json
+.. datatemplate:json:: /root.json
+.. datatemplate:json:: missing.json
+"""
+
+    assert find_data_files(source, document_dir, tmp_path) == [junit_xml, document_dir / "local.json", tmp_path / "root.json"]
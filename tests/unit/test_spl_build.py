@@ -1,12 +1,19 @@
+import hashlib
 import json
 import os
+import subprocess
 import zipfile
 from pathlib import Path
+from typing import List, Optional
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from spl_core.test_utils.spl_build import SplBuild
+from spl_core.common.async_command_line_executor import Command
+from spl_core.common.command_line_executor import OutputSink
+from spl_core.common.retry_policy import RetryPolicy
+from spl_core.test_utils.artifacts import collect_artifact_files, compare_files_info
+from spl_core.test_utils.spl_build import CONFIGURE_INPUTS_MANIFEST, SplBuild, execute_parallel, hash_file
 
 
 @pytest.fixture
@@ -72,6 +79,141 @@ def test_execute_with_additional_args(mock_execute: MagicMock, spl_build: SplBui
     mock_execute.assert_called_once_with(["build.bat", "-buildKit", "defaultKit", "-variants", "my_var", "-target", "all", "-reconfigure", "-j", "4"])
 
 
+def test_execute_parallel() -> None:
+    """
+    Test that several builds are executed together and only the builds with license issues are retried.
+    """
+    builds = [SplBuild(variant, build_kit, retry_policy=RetryPolicy(initial_delay=0)) for variant, build_kit in [("var_a", "prod"), ("var_b", "prod"), ("var_c", "test")]]
+    outputs = {"var_a": [(0, "")], "var_b": [(1, "No valid license"), (0, "")], "var_c": [(2, "compile error")]}
+    executed: List[Command] = []
+
+    async def execute(command: Command, sinks: Optional[List[OutputSink]] = None) -> subprocess.CompletedProcess[str]:
+        executed.append(command)
+        returncode, stdout = outputs[command.cmd[4]].pop(0)
+        return subprocess.CompletedProcess(command.cmd, returncode, stdout)
+
+    with patch("spl_core.common.async_command_line_executor.AsyncCommandLineExecutor.execute", side_effect=execute):
+        result = execute_parallel(builds, target="all")
+
+    assert result == {builds[0]: 0, builds[1]: 0, builds[2]: 2}
+    assert [command.prefix for command in executed] == ["[var_a/prod] ", "[var_b/prod] ", "[var_c/test] ", "[var_b/prod] "]
+    assert executed[2].cmd == ["build.bat", "-buildKit", "test", "-variants", "var_c", "-target", "all", "-reconfigure", "-build"]
+    assert builds[1].retry_report.retries == 1
+
+
+@patch("time.sleep")
+@patch("spl_core.common.command_line_executor.CommandLineExecutor.execute")
+def test_execute_license_retry_gives_up(mock_execute: MagicMock, mock_sleep: MagicMock, spl_build: SplBuild) -> None:
+    """
+    Test that the license retries stop after the maximum number of attempts and are recorded in the build report.
+    """
+    spl_build.retry_policy = RetryPolicy(max_attempts=3, initial_delay=10, backoff_factor=2, jitter=0)
+    mock_execute.return_value = MagicMock(returncode=1, stdout="ERROR: No valid license found")
+
+    assert spl_build.execute(target="all") == 1
+
+    assert mock_execute.call_count == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [10, 20]
+    report = json.loads(spl_build.build_report_file.read_text())
+    assert report["returncode"] == 1
+    assert report["retry"] == {"attempts": 3, "retries": 2, "wait_time": 30, "retry_reasons": ["ERROR: No valid license found"] * 2, "gave_up": True}
+
+
+@pytest.fixture
+def spl_project(tmp_path: Path) -> Path:
+    files = [
+        "CMakeLists.txt",
+        "KConfig",
+        "tools/toolchains/gcc/toolchain.cmake",
+        "src/comp/CMakeLists.txt",
+        "src/comp/src/comp.c",
+        "variants/my_var/config.cmake",
+        "variants/my_var/config.txt",
+        "variants/Flavor/other_var/config.cmake",
+        "build/my_var/defaultKit/CMakeCache.txt",
+        "build/my_var/defaultKit/CMakeFiles/Makefile.cmake",
+    ]
+    for file in files:
+        tmp_path.joinpath(file).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(file).write_text(file)
+    return tmp_path
+
+
+def test_collect_configure_inputs(spl_project: Path) -> None:
+    """
+    Test that only the CMake files, the KConfig model and the files of the own variant are configure inputs.
+    """
+    spl_build = SplBuild(variant="my_var", build_kit="defaultKit", project_dir=spl_project)
+
+    assert list(spl_build.collect_configure_inputs().keys()) == [
+        "CMakeLists.txt",
+        "KConfig",
+        "src/comp/CMakeLists.txt",
+        "tools/toolchains/gcc/toolchain.cmake",
+        "variants/my_var/config.cmake",
+        "variants/my_var/config.txt",
+    ]
+
+
+def test_configure_inputs_are_only_hashed_if_changed(spl_project: Path) -> None:
+    """
+    Test that the manifest stores size and modification time, so only files with a changed status are hashed again.
+    """
+    spl_build = SplBuild(variant="my_var", build_kit="defaultKit", project_dir=spl_project)
+    spl_build.update_configure_inputs_manifest(success=True)
+    manifest = json.loads(spl_build.configure_inputs_manifest.read_text())
+    assert set(manifest["KConfig"]) == {"size", "mtime_ns", "sha256"}
+
+    with patch("spl_core.test_utils.spl_build.hash_file", wraps=hash_file) as hash_file_mock:
+        assert not spl_build.needs_reconfigure()
+        hash_file_mock.assert_not_called()
+
+        # Touching a file changes the modification time, but not the content
+        os.utime(spl_project / "KConfig", ns=(0, 0))
+        assert not spl_build.needs_reconfigure()
+        assert hash_file_mock.call_count == 1
+
+
+@patch("spl_core.common.command_line_executor.CommandLineExecutor.execute")
+def test_execute_reconfigures_only_if_configure_inputs_changed(mock_execute: MagicMock, spl_project: Path) -> None:
+    """
+    Test that -reconfigure is only passed if the configure inputs changed since the last successful build.
+    """
+    spl_build = SplBuild(variant="my_var", build_kit="defaultKit", project_dir=spl_project)
+    mock_execute.return_value = MagicMock(returncode=0)
+
+    def reconfigured() -> bool:
+        return "-reconfigure" in mock_execute.call_args.args[0]
+
+    spl_build.execute(target="all")
+    assert reconfigured(), "there was no successful build yet"
+    assert spl_project.joinpath("build/my_var/defaultKit", CONFIGURE_INPUTS_MANIFEST).exists()
+
+    spl_build.execute(target="all")
+    assert not reconfigured()
+
+    # Sources and other variants are no configure inputs
+    spl_project.joinpath("src/comp/src/comp.c").write_text("changed")
+    spl_project.joinpath("variants/Flavor/other_var/config.cmake").write_text("changed")
+    spl_build.execute(target="all")
+    assert not reconfigured()
+
+    spl_project.joinpath("variants/my_var/config.txt").write_text("CONFIG_CHANGED=y")
+    spl_build.execute(target="all")
+    assert reconfigured()
+
+    # A failed build shall reconfigure the next time
+    mock_execute.return_value = MagicMock(returncode=1, stdout="error")
+    spl_build.execute(target="all")
+    assert not reconfigured()
+    mock_execute.return_value = MagicMock(returncode=0)
+    spl_build.execute(target="all")
+    assert reconfigured()
+
+    spl_build.execute(target="all", reconfigure=True)
+    assert reconfigured(), "reconfigure can be forced"
+
+
 def test_create_artifacts_archive_inside_spl_build(spl_build: SplBuild) -> None:
     """
     Test the creation of artifacts archive and json for artifacts inside of the spl_build folder
@@ -98,10 +240,53 @@ def test_create_artifacts_archive_inside_spl_build(spl_build: SplBuild) -> None:
         file_list = zip_ref.namelist()
         assert file_list == expected_artifacts
 
-    assert dict(json.loads(archive_json.read_text())) == {'variant': 'my_var',
-                                                          'build_kit': 'defaultKit',
-                                                          'artifacts': expected_artifacts
-                                                          }
+    artifacts_json = dict(json.loads(archive_json.read_text()))
+    artifacts_files = artifacts_json.pop("files")
+    assert artifacts_json == {'variant': 'my_var',
+                              'build_kit': 'defaultKit',
+                              'artifacts': expected_artifacts
+                              }
+    assert list(artifacts_files.keys()) == expected_artifacts
+    assert artifacts_files["other_file.exe"] == {"size": file_2.stat().st_size, "mtime_ns": file_2.stat().st_mtime_ns, "sha256": hashlib.sha256(b"some_text").hexdigest()}
+
+
+def test_artifacts_are_collected_once_per_build(spl_build: SplBuild) -> None:
+    artifact = spl_build.build_dir.joinpath("out", "some_file.exe")
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    artifact.write_text("some_text")
+
+    with patch("spl_core.test_utils.spl_build.collect_artifact_files", wraps=collect_artifact_files) as collect:
+        spl_build.create_artifacts_archive([Path("out")])
+        spl_build.create_artifacts_json([Path("out")])
+        assert collect.call_count == 1
+
+        with patch("spl_core.common.command_line_executor.CommandLineExecutor.execute", return_value=MagicMock(returncode=0)):
+            spl_build.execute(target="all")
+        spl_build.create_artifacts_json([Path("out")])
+        assert collect.call_count == 2, "a build might change the artifacts"
+
+
+def test_artifacts_json_diff(spl_build: SplBuild) -> None:
+    out_dir = spl_build.build_dir.joinpath("out")
+    out_dir.mkdir(parents=True)
+    out_dir.joinpath("unchanged.exe").write_text("same")
+    out_dir.joinpath("changed.exe").write_text("old")
+    out_dir.joinpath("removed.exe").write_text("removed")
+    previous = json.loads(spl_build.create_artifacts_json([Path("out")]).read_text())["files"]
+
+    out_dir.joinpath("changed.exe").write_text("new")
+    out_dir.joinpath("removed.exe").unlink()
+    out_dir.joinpath("added.exe").write_text("added")
+    with patch("spl_core.common.command_line_executor.CommandLineExecutor.execute", return_value=MagicMock(returncode=0)):
+        spl_build.execute(target="all")
+    current = json.loads(spl_build.create_artifacts_json([Path("out")]).read_text())["files"]
+
+    diff = compare_files_info(previous, current)
+    assert diff["added"] == ["out/added.exe"]
+    assert diff["changed"] == ["out/changed.exe"]
+    assert diff["removed"] == ["out/removed.exe"]
+    assert diff["unchanged"] == ["out/unchanged.exe"]
+
 
 def test_create_artifacts_archive_outside_spl_build(spl_build: SplBuild, tmp_path: Path) -> None:
     """
@@ -125,7 +310,10 @@ def test_create_artifacts_archive_outside_spl_build(spl_build: SplBuild, tmp_pat
         file_list = zip_ref.namelist()
         assert file_list == expected_artifacts
 
-    assert dict(json.loads(archive_json.read_text())) == {'variant': 'my_var',
-                                                          'build_kit': 'defaultKit',
-                                                          'artifacts': expected_artifacts
-                                                          }
+    artifacts_json = dict(json.loads(archive_json.read_text()))
+    artifacts_files = artifacts_json.pop("files")
+    assert artifacts_json == {'variant': 'my_var',
+                              'build_kit': 'defaultKit',
+                              'artifacts': expected_artifacts
+                              }
+    assert list(artifacts_files.keys()) == expected_artifacts
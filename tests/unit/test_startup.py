@@ -0,0 +1,19 @@
+from typing import List
+
+import pytest
+from utils import import_times
+
+#: Generous budget for importing spl_core.main, which also holds on slow CI machines. The benchmark checks the tight budget.
+IMPORT_BUDGET_MS = 300
+HEAVY_MODULES = ["typer", "click", "rich", "loguru", "py_app_dev", "spl_core.kickstart.create"]
+
+
+@pytest.mark.parametrize("args", [["--version"], ["--help"], []])
+def test_fast_path_does_not_import_heavy_modules(args: List[str]) -> None:
+    times = import_times(args)
+    assert not [module for module in times if module.split(".")[0] in HEAVY_MODULES or module in HEAVY_MODULES]
+
+
+def test_fast_path_startup_budget() -> None:
+    import_ms = import_times(["--version"])["spl_core.main"] / 1000
+    assert import_ms < IMPORT_BUDGET_MS
@@ -0,0 +1,114 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import MagicMock, patch
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+
+from spl_core.test_utils import variant_discovery
+from spl_core.test_utils.variant_discovery import VariantTestConfig, discover_variants
+
+pytest_plugins = ["pytester"]
+
+
+def create_variants(variants_dir: Path, metadata: Dict[str, Dict[str, Any]]) -> None:
+    for variant in ["Flavor/A", "B"]:
+        variants_dir.joinpath(variant).mkdir(parents=True, exist_ok=True)
+        variants_dir.joinpath(variant, "config.cmake").touch()
+    for variant, content in metadata.items():
+        variants_dir.joinpath(variant, "variant_test.json").write_text(json.dumps(content))
+
+
+def test_discover_variants(tmp_path: Path) -> None:
+    create_variants(tmp_path, {"Flavor/A": {"component_paths": ["src/greeter"], "expected_build_artifacts": ["main.exe"], "expected_archive_artifacts": ["*.exe", "!tmp.exe"]}})
+
+    assert discover_variants(tmp_path) == [
+        VariantTestConfig("B"),
+        VariantTestConfig("Flavor/A", component_paths=[Path("src/greeter")], expected_build_artifacts=[Path("main.exe")], expected_archive_artifacts=["*.exe", "!tmp.exe"]),
+    ]
+
+
+@pytest.mark.parametrize("content, message", [("{", "invalid"), ('{"component_path": []}', "unknown keys \\['component_path'\\]")])
+def test_invalid_metadata(tmp_path: Path, content: str, message: str) -> None:
+    create_variants(tmp_path, {})
+    tmp_path.joinpath("B", "variant_test.json").write_text(content)
+
+    with pytest.raises(UserNotificationException, match=message):
+        discover_variants(tmp_path)
+
+
+def test_metadata_is_cached(tmp_path: Path) -> None:
+    create_variants(tmp_path, {"B": {"component_paths": ["src/b"]}})
+    stored: Dict[str, Any] = {}
+    cache = MagicMock()
+    cache.get.side_effect = lambda key, default: stored.get(key, default)
+    cache.set.side_effect = stored.__setitem__
+
+    first = discover_variants(tmp_path, cache)
+    with patch("spl_core.test_utils.variant_discovery.find_variants") as find_variants, patch("spl_core.test_utils.variant_discovery._load_metadata") as load_metadata:
+        assert discover_variants(tmp_path, cache) == first
+        find_variants.assert_not_called()
+        load_metadata.assert_not_called()
+    assert cache.set.call_count == 1, "the cache is only written if something changed"
+
+    # The changes below the variants directory do not change its modification time
+    variants_dir_mtime = tmp_path.stat().st_mtime_ns
+    metadata_file = tmp_path.joinpath("B", "variant_test.json")
+    metadata_file.write_text(json.dumps({"component_paths": ["src/c"]}))
+    # The timestamp resolution of the file system might be too coarse to notice the change
+    os.utime(metadata_file, ns=(metadata_file.stat().st_atime_ns, metadata_file.stat().st_mtime_ns + 1_000_000_000))
+    assert discover_variants(tmp_path, cache) == [VariantTestConfig("B", component_paths=[Path("src/c")]), VariantTestConfig("Flavor/A")]
+
+    tmp_path.joinpath("Flavor", "NewSub").mkdir()
+    tmp_path.joinpath("Flavor", "NewSub", "config.cmake").touch()
+    assert [variant_config.variant for variant_config in discover_variants(tmp_path, cache)] == ["B", "Flavor/A", "Flavor/NewSub"]
+
+    tmp_path.joinpath("Flavor", "A", "config.cmake").unlink()
+    assert [variant_config.variant for variant_config in discover_variants(tmp_path, cache)] == ["B", "Flavor/NewSub"]
+    assert tmp_path.stat().st_mtime_ns == variants_dir_mtime
+
+
+def test_plugin(pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch) -> None:
+    create_variants(pytester.path / "variants", {"B": {"component_paths": ["src/b"], "expected_build_artifacts": ["b.exe"]}})
+    pytester.makepyfile(
+        test_variants="""
+        from pathlib import Path
+
+        from spl_core.test_utils.base_variant_test_runner import BaseVariantTestRunner
+        from spl_core.test_utils.variant_discovery import VariantTestRunner
+
+
+        class Test_Variants(VariantTestRunner):
+            def test_build(self):
+                assert self.variant == "B"
+                assert self.component_paths == [Path("src/b")]
+                assert self.expected_build_artifacts == [Path("b.exe")]
+                assert self.expected_archive_artifacts == [Path("b.exe")]
+
+            def test_unittests(self):
+                assert self.expected_test_artifacts == [Path("reports/coverage/index.html")]
+
+            test_reports = None
+
+
+        class Test_Flavor__A(BaseVariantTestRunner):
+            component_paths = []
+            expected_build_artifacts = []
+            test_build = None
+            test_reports = None
+
+            def test_unittests(self):
+                assert self.variant == "Flavor/A"
+        """
+    )
+
+    discover = MagicMock(wraps=variant_discovery.discover_variants)
+    monkeypatch.setattr(variant_discovery, "discover_variants", discover)
+
+    result = pytester.runpytest("-p", "spl_core.test_utils.variant_discovery", "-v")
+
+    result.assert_outcomes(passed=3, deselected=2)
+    assert discover.call_count == 1, "the variants are discovered once per session"
+    result.stdout.fnmatch_lines(["*Test_Variants::test_build?B? PASSED*", "*Test_Variants::test_unittests?B? PASSED*", "*Test_Flavor__A::test_unittests PASSED*"])
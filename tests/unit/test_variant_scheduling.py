@@ -0,0 +1,182 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+import spl_core
+from spl_core.test_utils.variant_scheduling import JobBudget, format_durations, get_parallel_builds
+
+pytest_plugins = ["pytester"]
+
+
+def test_job_budget(tmp_path: Path) -> None:
+    budget = JobBudget(tmp_path / "budget", slots=2, poll_interval=0.01)
+    running = []
+    max_running = []
+
+    def build() -> None:
+        with budget.acquire() as slot:
+            running.append(slot)
+            max_running.append(len(running))
+            time.sleep(0.05)
+            running.remove(slot)
+
+    threads = [threading.Thread(target=build) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(max_running) == 2
+    with budget.acquire() as first, budget.acquire() as second:
+        assert {first, second} == {0, 1}, "all slots are released"
+
+
+def test_job_budget_slot_of_crashed_process_is_released(tmp_path: Path) -> None:
+    crash = f"""
+import os
+from pathlib import Path
+from spl_core.test_utils.variant_scheduling import JobBudget
+
+with JobBudget(Path({str(tmp_path)!r}), slots=1).acquire():
+    os._exit(1)
+"""
+    env = {**os.environ, "PYTHONPATH": str(Path(spl_core.__file__).parent.parent)}
+    assert subprocess.run([sys.executable, "-c", crash], env=env).returncode == 1
+    assert list(tmp_path.iterdir()) == [tmp_path / "slot_0.lock"]
+
+    with JobBudget(tmp_path, slots=1, poll_interval=10).acquire() as slot:
+        assert slot == 0
+
+
+def test_job_budget_slot_is_released_on_error(tmp_path: Path) -> None:
+    budget = JobBudget(tmp_path, slots=1)
+    with pytest.raises(RuntimeError), budget.acquire():
+        raise RuntimeError("build failed")
+    with budget.acquire() as slot:
+        assert slot == 0
+
+
+@pytest.mark.parametrize(
+    "jobs, workers, expected",
+    [
+        (16, 8, (4, 4)),
+        (16, 2, (2, 8)),
+        (2, 8, (1, 2)),
+        (16, 1, (1, 16)),
+    ],
+)
+def test_get_parallel_builds(jobs: int, workers: int, expected: Tuple[int, int]) -> None:
+    assert get_parallel_builds(jobs, workers) == expected
+
+
+def test_format_durations() -> None:
+    durations = {"A": {"test_build": 10.0, "test_reports": 5.04}, "Flavor/B": {"test_build": 20.0}}
+
+    assert format_durations(durations, {"A": 1.5, "Flavor/B": 0.01}) == [
+        "Flavor/B: 20.0s (test_build 20.0s)",
+        "A: 15.0s (test_build 10.0s, test_reports 5.0s, waited 1.5s for the job budget)",
+    ]
+
+
+def test_plugin(pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytester.makepyfile(
+        test__Variants="""
+        import os
+        import tempfile
+        from pathlib import Path
+        from spl_core.test_utils.base_variant_test_runner import BaseVariantTestRunner
+
+
+        class Test_Flavor__A(BaseVariantTestRunner):
+            component_paths = []
+            expected_build_artifacts = []
+
+            def test_build(self):
+                assert os.environ["CMAKE_BUILD_PARALLEL_LEVEL"] == "6"
+                assert list(Path(tempfile.gettempdir()).glob("spl-job-budget-*/slot_0.lock"))
+
+            test_unittests = None
+            test_reports = None
+
+
+        def test_other(request):
+            assert not [marker for marker in request.node.iter_markers("xdist_group")]
+            assert "CMAKE_BUILD_PARALLEL_LEVEL" not in os.environ
+        """
+    )
+    monkeypatch.delenv("CMAKE_BUILD_PARALLEL_LEVEL", raising=False)
+    temp_dir = pytester.mkdir("tmp")
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+
+    result = pytester.runpytest("-p", "spl_core.test_utils.variant_scheduling", "--spl-jobs", "6", "-p", "no:cacheprovider")
+
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*variant test durations*", "Flavor/A: *s (test_build *s)"])
+    assert list(temp_dir.iterdir()) == [], "the job budget directory is removed"
+
+
+def test_plugin_with_discovered_variants(pytester: pytest.Pytester) -> None:
+    pytester.path.joinpath("variants", "Flavor", "B").mkdir(parents=True)
+    pytester.path.joinpath("variants", "Flavor", "B", "config.cmake").touch()
+    pytester.makepyfile(
+        test_variants="""
+        from spl_core.test_utils.variant_discovery import VariantTestRunner
+
+
+        class Test_Variants(VariantTestRunner):
+            def test_build(self, request):
+                assert [marker.kwargs["name"] for marker in request.node.iter_markers("xdist_group")] == ["Flavor/B"]
+
+            test_unittests = None
+            test_reports = None
+        """
+    )
+
+    result = pytester.runpytest("-p", "spl_core.test_utils.variant_scheduling", "-p", "spl_core.test_utils.variant_discovery")
+
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["*variant test durations*", "Flavor/B: *s (test_build?Flavor/B? *s)"])
+
+
+def test_plugin_runs_the_tests_of_a_variant_on_one_worker(pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("xdist")
+    pytester.makepyfile(
+        test__Variants="""
+        import os
+        from pathlib import Path
+        from spl_core.test_utils.base_variant_test_runner import BaseVariantTestRunner
+
+
+        def record(name):
+            Path(name).write_text(os.environ["PYTEST_XDIST_WORKER"])
+
+
+        class Test_Flavor__A(BaseVariantTestRunner):
+            component_paths = []
+            expected_build_artifacts = []
+
+            def test_build(self):
+                record("build")
+
+            def test_unittests(self):
+                record("unittests")
+
+            def test_reports(self):
+                record("reports")
+        """
+    )
+    monkeypatch.setenv("PYTHONPATH", str(Path(spl_core.__file__).parent.parent))
+
+    result = pytester.runpytest_subprocess("-p", "spl_core.test_utils.variant_scheduling", "-n", "2", "--dist", "loadgroup", "-v", "-p", "no:randomly")
+
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(["*test_build@Flavor/A*"])
+    workers = {pytester.path.joinpath(name).read_text() for name in ["build", "unittests", "reports"]}
+    assert len(workers) == 1, "all tests of the variant run on the same worker"
@@ -1,22 +1,70 @@
 import dataclasses
+import json
 import os
 import random
+import re
 import shutil
 import string
 import subprocess
+import sys
 from contextlib import ContextDecorator
 from pathlib import Path
 from time import perf_counter
-from typing import Collection, Dict, List, Optional
+from typing import Any, Collection, Dict, List, Optional, Tuple
 
 from spl_core.common.command_line_executor import CommandLineExecutor
 from spl_core.kickstart.create import KickstartProject, ProjectBuilder
 
 
+@dataclasses.dataclass
+class TracefileCoverage:
+    #: Line number -> execution count
+    lines: Dict[int, int] = dataclasses.field(default_factory=dict)
+    #: (line number, branch index) -> execution count
+    branches: Dict[Tuple[int, int], int] = dataclasses.field(default_factory=dict)
+    #: (function name, line number) -> execution count
+    functions: Dict[Tuple[str, int], int] = dataclasses.field(default_factory=dict)
+
+
+def load_tracefile(tracefile: Path) -> Dict[str, TracefileCoverage]:
+    """The counts of a gcovr JSON tracefile per source file, without the excluded lines, branches and functions."""
+
+    def is_excluded(entry: Dict[str, Any]) -> bool:
+        return bool(entry.get("gcovr/excluded") or entry.get("gcovr/noncode"))
+
+    coverage: Dict[str, TracefileCoverage] = {}
+    for file_entry in json.loads(tracefile.read_text(encoding="utf-8"))["files"]:
+        counts = coverage.setdefault(file_entry["file"], TracefileCoverage())
+        for line in file_entry["lines"]:
+            if is_excluded(line):
+                continue
+            line_number = int(line["line_number"])
+            counts.lines[line_number] = counts.lines.get(line_number, 0) + int(line["count"])
+            for index, branch in enumerate(line.get("branches", [])):
+                if not is_excluded(branch):
+                    counts.branches[line_number, index] = counts.branches.get((line_number, index), 0) + int(branch["count"])
+        for function in file_entry.get("functions", []):
+            if not is_excluded(function):
+                key = (function.get("demangled_name") or function["name"], int(function["lineno"]))
+                counts.functions[key] = counts.functions.get(key, 0) + int(function["execution_count"])
+    return coverage
+
+
 def this_repository_root_dir() -> Path:
     return Path(__file__).parent.parent.absolute()
 
 
+def import_times(args: List[str]) -> Dict[str, int]:
+    """Runs 'please' with the given arguments and returns the cumulative import time in us by module."""
+    code = f"import sys; sys.argv = ['please', *{args!r}]; import spl_core.main; spl_core.main.main()"
+    env = {**os.environ, "PYTHONPATH": str(this_repository_root_dir() / "src")}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for match in re.finditer(r"^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$", result.stderr, re.MULTILINE):
+        times[match.group(3)] = int(match.group(1))
+    return times
+
+
 class ExecutionTime(ContextDecorator):
     def __init__(self, message: Optional[str] = None):
         self.name = message